@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: /search over a 100k-link downloads list.
+
+Reports the one-off cost of indexing a snapshot, the cost of indexing the next
+(delta) snapshot that shares most strings, and the latency of typical queries.
+
+Usage (from backend/): python -m benchmarks.bench_search
+"""
+import asyncio
+import time
+
+from benchmarks.bench_serialization import build_packages
+from src.domain.snapshot import Snapshot
+from src.domain.store import PackageStore
+from src.infrastructure.search_index import SearchIndex
+
+QUERIES = ("Package 9999", "part007", "host3.example.com", "file/42/", "rar", "zz-no-match")
+
+
+async def run(link_count: int) -> None:
+    packages = build_packages(link_count)
+    snapshot = Snapshot(kind="downloads", store=PackageStore.from_packages(packages))
+    index = SearchIndex()
+
+    start = time.perf_counter()
+    await index.view(snapshot)
+    print(f"index {link_count} links: {(time.perf_counter() - start) * 1000:.0f}ms (first snapshot)")
+
+    # Next refresh: same strings plus a few new ones
+    packages[0].name = "Package renamed"
+    following = Snapshot(kind="downloads", store=PackageStore.from_packages(packages))
+    start = time.perf_counter()
+    await index.view(following)
+    print(f"index {link_count} links: {(time.perf_counter() - start) * 1000:.0f}ms (next snapshot)")
+
+    for query in QUERIES:
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            total, _ = await index.search([following], query, limit=50)
+            best = min(best, time.perf_counter() - start)
+        print(f"  {query!r:>22}: {best * 1000:7.2f}ms  ({total} packages)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(100_000))
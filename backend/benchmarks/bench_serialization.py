@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: serialization cost of the /downloads list endpoint.
+
+Compares the previous path (pydantic models re-validated and dumped through the
+response_model, as FastAPI does) with the fast path (plain dicts from the columnar
+store + fastjson) and with a cached snapshot (pre-encoded bytes reused).
+
+Usage (from backend/): python -m benchmarks.bench_serialization
+"""
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from src.domain.models import DownloadStatus, Link, Package
+from src.domain.snapshot import Snapshot
+from src.domain.store import PackageStore
+
+LINKS_PER_PACKAGE = 10
+
+
+def build_packages(link_count: int) -> list[Package]:
+    packages = []
+    for p in range(link_count // LINKS_PER_PACKAGE):
+        links = [
+            Link(
+                uuid=str(p * LINKS_PER_PACKAGE + i),
+                name=f"archive.part{i:03d}.rar",
+                url=f"https://host{p % 7}.example.com/file/{p}/{i}",
+                host=f"host{p % 7}.example.com",
+                bytes_total=104857600,
+                bytes_loaded=52428800,
+                status=DownloadStatus.RUNNING,
+                speed=1048576,
+                eta=50,
+            )
+            for i in range(LINKS_PER_PACKAGE)
+        ]
+        packages.append(Package(uuid=str(p), name=f"Package {p}", links=links, child_count=len(links)))
+    return packages
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    adapter = TypeAdapter(list[Package])
+    print(f"{'links':>8} {'response_model':>15} {'fast path':>10} {'cached':>10}")
+    for link_count in (1_000, 10_000, 100_000):
+        packages = build_packages(link_count)
+        store = PackageStore.from_packages(packages)
+
+        def before(packages=packages):
+            # Re-validate and serialize as the response_model path does
+            validated = adapter.validate_python(packages)
+            json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+        def fast(store=store):
+            Snapshot(kind="downloads", store=store).encoded()
+
+        snapshot = Snapshot(kind="downloads", store=store)
+        snapshot.encoded()
+
+        print(
+            f"{link_count:>8} {timed(before) * 1000:>13.1f}ms {timed(fast) * 1000:>8.1f}ms "
+            f"{timed(snapshot.encoded) * 1e6:>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
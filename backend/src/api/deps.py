@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import Generator
 from typing import Annotated
 
@@ -19,7 +20,54 @@ from src.infrastructure.settings_manager import settings_manager
 _jd_api = None
 _last_settings_hash = None
 
+# Shared LocalJDownloaderAPI instances (each owning a connection pool), keyed by JD URL
+_local_apis: dict[str, LocalJDownloaderAPI] = {}
+
+def get_local_jd_api(base_url: str | None = None) -> LocalJDownloaderAPI:
+    """Return the shared LocalJDownloaderAPI for the given (or currently configured) JD URL."""
+    if base_url is None:
+        base_url = settings_manager.load_settings().api_url
+
+    api = _local_apis.get(base_url)
+    if api is None:
+        # The URL changed: retire the pools of the previous URL(s)
+        for old_url in list(_local_apis):
+            _retire(_local_apis.pop(old_url))
+        api = LocalJDownloaderAPI(base_url=base_url)
+        _local_apis[base_url] = api
+    return api
+
+# Close tasks of replaced APIs, with the API each one closes
+_retiring: dict[asyncio.Task, LocalJDownloaderAPI] = {}
+
+def _retire(api: LocalJDownloaderAPI) -> None:
+    """Close a replaced API's pool once requests still using it had time to finish."""
+    async def close_later() -> None:
+        await asyncio.sleep(settings.JD_HTTP_TIMEOUT)
+        await api.aclose()
+
+    try:
+        task = asyncio.get_running_loop().create_task(close_later())
+    except RuntimeError:
+        # No event loop (e.g. at import): the pool was never opened in one either
+        return
+    _retiring[task] = api
+    task.add_done_callback(lambda done: _retiring.pop(done, None))
+
+async def close_jd_apis() -> None:
+    """Close all shared JD connection pools (called from the app lifespan on shutdown)."""
+    for task, api in list(_retiring.items()):
+        task.cancel()
+        await api.aclose()
+    for api in list(_local_apis.values()):
+        await api.aclose()
+    _local_apis.clear()
+
 def get_jd_api() -> Generator[JDownloaderAPI, None, None]:
+    yield resolve_jd_api()
+
+def resolve_jd_api() -> JDownloaderAPI:
+    """Return the API for the current settings (also used outside of request handling)."""
     global _jd_api, _last_settings_hash
     
     current_settings = settings_manager.load_settings()
@@ -31,22 +79,45 @@ def get_jd_api() -> Generator[JDownloaderAPI, None, None]:
         if current_settings.use_mock:
             _jd_api = MockJDownloaderAPI()
         else:
-            _jd_api = LocalJDownloaderAPI(base_url=current_settings.api_url)
+            _jd_api = get_local_jd_api(current_settings.api_url)
             
-    yield _jd_api
+    return _jd_api
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+# JWT "scope" of /stream tickets; such tokens are accepted nowhere else
+STREAM_SCOPE = "stream"
+
+def decode_token(token: str | None, scope: str | None = None) -> TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
         token_data = TokenData(username=username)
     except (JWTError, ValidationError):
         raise credentials_exception
     return token_data
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    return decode_token(token)
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login", auto_error=False)
+
+async def get_stream_user(
+    header_token: Annotated[str | None, Depends(optional_oauth2_scheme)],
+    ticket: str | None = None,
+) -> TokenData:
+    """
+    Like get_current_user, but also accepts a ?ticket= from /stream/ticket (EventSource
+    cannot send headers). Tickets are short-lived and only valid for the stream, so one
+    that ends up in an access log or the browser history cannot be used as a login.
+    """
+    if header_token:
+        return decode_token(header_token)
+    return decode_token(ticket, scope=STREAM_SCOPE)
@@ -0,0 +1,27 @@
+import hashlib
+from uuid import uuid4
+
+from fastapi import Request, Response
+
+# Versions restart with the process, so tags from a previous run must never match
+_BOOT_ID = uuid4().hex
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag from the parts that make up a resource's content version."""
+    digest = hashlib.blake2b(repr((_BOOT_ID, *parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+def not_modified(etag: str, headers: dict[str, str] | None = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
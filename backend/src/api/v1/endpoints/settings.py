@@ -30,6 +30,8 @@ async def test_connnection(settings: JDSettings, token: str = Depends(oauth2_sch
         return {"status": "ok", "message": "Connection successful"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await api.aclose()
 
 @router.get("/help")
 async def get_help_text(
@@ -1,21 +1,38 @@
 import json
 import os
-import asyncio
+import time
 from datetime import timedelta
 from pathlib import Path
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
+from opentelemetry import trace
 from pydantic import BaseModel
 from src.api import deps
-from src.core import security
+from src.api.etag import is_not_modified, make_etag, not_modified
+from src.core import fastjson, metrics, security
 from src.core.config import settings
-from src.domain.models import Package, Token, User
+from src.core.log import get_logger
+from src.core.telemetry import child_span
+from src.domain.batch import BatchRequest
+from src.domain.models import DownloadStatus, Package, Token, User
+from src.domain.query import SORT_KEYS, PackageQuery
+from src.domain.snapshot import DOWNLOADS, LINKGRABBER, LIST_KINDS, Snapshot
+from src.domain.store import PACKAGE_FIELDS
+from src.infrastructure.api_interface import AddLinksError, add_failed
+from src.infrastructure.batch import run_batch
+from src.infrastructure.confirm import confirm_packages
+from src.infrastructure.jobs import Job, job_manager
+from src.infrastructure.link_index import duplicate_index, filter_duplicates
 from src.infrastructure.mock_jd_api import MockJDownloaderAPI
 from src.infrastructure.settings_manager import settings_manager
+from src.infrastructure.snapshot_service import snapshot_service
+
+logger = get_logger("api")
+tracer = trace.get_tracer(__name__)
 
 
 # Helper for data path
@@ -32,6 +49,92 @@ def get_dlc_buffer_dir() -> Path:
         d.mkdir(parents=True, exist_ok=True)
     return d
 
+def get_buffer_signature() -> tuple:
+    """Cheap content version of the link and DLC buffers (file stats only, nothing is parsed)."""
+    buffer_file = get_buffer_file()
+    link_sig = None
+    if buffer_file.exists():
+        st = buffer_file.stat()
+        link_sig = (st.st_mtime_ns, st.st_size)
+
+    dlc_sig = []
+    try:
+        for entry in os.scandir(get_dlc_buffer_dir()):
+            if entry.name.endswith(".dlc"):
+                st = entry.stat()
+                dlc_sig.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        pass
+    return link_sig, tuple(sorted(dlc_sig))
+
+def count_buffered_links() -> int:
+    # Check Buffer (now contains package objects)
+    buffer_file = get_buffer_file()
+    buffer_count = 0
+    if buffer_file.exists():
+        try:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
+                buffer_data = json.load(f)
+                # Count total links across all packages
+                for entry in buffer_data:
+                    if isinstance(entry, dict):
+                        buffer_count += len(entry.get("links", []))
+                    else:
+                        buffer_count += 1  # Legacy format: single link
+        except:
+            pass
+
+    # Check DLC Buffer
+    dlc_buffer_dir = get_dlc_buffer_dir()
+    
+    if dlc_buffer_dir.exists():
+        try:
+             files = [f for f in os.listdir(dlc_buffer_dir) if f.endswith(".dlc")]
+             buffer_count += len(files)
+        except:
+             pass
+    return buffer_count
+
+def build_system_status(jd_status: dict) -> dict:
+    return {
+        "jd_online": jd_status["jd_online"],
+        "buffer_count": count_buffered_links(),
+        "myjd_connection": jd_status["myjd_connection"]
+    }
+
+def read_buffer_details() -> dict:
+    buffer_file = get_buffer_file()
+    dlc_buffer_dir = get_dlc_buffer_dir()
+    
+    # Get link packages
+    packages = []
+    if buffer_file.exists():
+        try:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
+                packages = json.load(f)
+        except:
+            pass
+    
+    # Get DLC files
+    dlc_files = []
+    if dlc_buffer_dir.exists():
+        try:
+            for filename in os.listdir(dlc_buffer_dir):
+                if filename.endswith(".dlc"):
+                    file_path = dlc_buffer_dir / filename
+                    dlc_files.append({
+                        "filename": filename,
+                        "size": os.path.getsize(file_path),
+                        "timestamp": os.path.getmtime(file_path)
+                    })
+        except:
+            pass
+    
+    return {
+        "packages": packages,
+        "dlc_files": dlc_files
+    }
+
 from src.api.v1.endpoints import settings as settings_endpoint
 
 router = APIRouter()
@@ -110,42 +213,333 @@ async def get_api_docs(
     except Exception as e:
         return {"text": f"# Error\nFailed to load documentation: {e}"}
 
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """Validate a comma-separated `fields=` projection against the package fields."""
+    if fields is None:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in PACKAGE_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none)'}. Allowed: {', '.join(PACKAGE_FIELDS)}",
+        )
+    return selected
+
+def parse_list_query(
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    sort: str | None = None,
+    status: str | None = None,
+    host: str | None = None,
+    name: str | None = None,
+    min_size: Annotated[int | None, Query(ge=0)] = None,
+    max_size: Annotated[int | None, Query(ge=0)] = None,
+) -> PackageQuery | None:
+    """
+    Paging/sorting/filtering parameters of the list endpoints (None if none were given).
+
+    `sort` is one of SORT_KEYS, prefixed with "-" for descending (e.g. "-size" for the
+    largest first, "eta" for the soonest); `status` is a comma-separated list of link states.
+    """
+    descending = False
+    if sort is not None:
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        if sort not in SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}. Allowed: {', '.join(SORT_KEYS)}")
+
+    statuses = None
+    if status is not None:
+        statuses = frozenset(s.strip().upper() for s in status.split(",") if s.strip())
+        unknown = statuses - {s.value for s in DownloadStatus}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+
+    query = PackageQuery(
+        offset=offset, limit=limit, sort=sort, descending=descending, statuses=statuses,
+        host=host, name=name, min_size=min_size, max_size=max_size,
+    )
+    return None if query == PackageQuery() else query
+
+def snapshot_response(
+    request: Request,
+    snapshot: Snapshot,
+    fields: tuple[str, ...] | None = None,
+    include_links: bool = True,
+    query: PackageQuery | None = None,
+) -> Response:
+    """
+    Fast path for the large list endpoints: the snapshot's pre-encoded JSON is returned as-is,
+    skipping FastAPI's response_model re-validation of data built from trusted JD rows.
+    Unchanged snapshots are answered with 304 Not Modified without serializing anything.
+    """
+    # Packages and links of a response always come from the same fan-out
+    headers = {
+        "ETag": make_etag(snapshot.tag, fields, include_links, query.key if query else None),
+        "X-Snapshot": snapshot.tag,
+        "X-Snapshot-Taken-At": f"{snapshot.taken_at:.3f}",
+    }
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers["ETag"], headers)
+    if query is None:
+        content = snapshot.encoded(fields=fields, include_links=include_links)
+    else:
+        content, total = snapshot.query(query, fields=fields, include_links=include_links)
+        headers["X-Total-Count"] = str(total)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+async def list_response(
+    request: Request,
+    api: MockJDownloaderAPI,
+    kind: str,
+    fields: str | None,
+    include_links: bool,
+    query: PackageQuery | None,
+) -> Response:
+    selected = parse_fields(fields)
+    include_links = include_links and (selected is None or "links" in selected)
+    # Link filters need link rows even if the response leaves them out
+    fetch_links = include_links or (query is not None and query.needs_links)
+    snapshot = await snapshot_service.get(api, kind, include_links=fetch_links)
+    return snapshot_response(request, snapshot, selected, include_links, query)
+
 @router.get("/downloads", response_model=list[Package])
 async def get_downloads(
+    request: Request,
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    query: Annotated[PackageQuery | None, Depends(parse_list_query)],
+    fields: str | None = None,
+    include_links: bool = True,
 ):
-    return await api.get_packages()
+    """
+    `fields` (comma-separated package keys) and `include_links=false` trim the response;
+    package-level views are served without querying JD for links at all.
+    `offset`/`limit`/`sort`/filters select a page; X-Total-Count holds the number of matches.
+    """
+    return await list_response(request, api, DOWNLOADS, fields, include_links, query)
 
 @router.get("/linkgrabber", response_model=list[Package])
 async def get_linkgrabber(
+    request: Request,
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    query: Annotated[PackageQuery | None, Depends(parse_list_query)],
+    fields: str | None = None,
+    include_links: bool = True,
 ):
-    return await api.get_linkgrabber_packages()
+    """Same projection, paging, sorting and filter parameters as /downloads."""
+    return await list_response(request, api, LINKGRABBER, fields, include_links, query)
 
-@router.post("/linkgrabber/confirm-all")
-async def confirm_all_linkgrabber(
+@router.get("/search")
+async def search_packages(
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    q: Annotated[str, Query(min_length=1)],
+    kind: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+):
+    """
+    Ranked search over package names, link names, urls and hosts of both lists (or one `kind`).
+    Every whitespace-separated term must match; results carry only the matching links.
+    """
+    if kind is not None and kind not in LIST_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {kind}. Allowed: {', '.join(LIST_KINDS)}")
+    snapshots = []
+    for k in (kind,) if kind else LIST_KINDS:
+        try:
+            snapshots.append(await snapshot_service.get(api, k))
+        except Exception as e:
+            logger.warning("Search list unavailable", list=k, error=str(e), exc_info=True)
+    total, results = await snapshot_service.search_index.search(snapshots, q, limit)
+    return {"query": q, "total": total, "results": results}
+
+@router.get("/stats")
+async def get_stats(
+    request: Request,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    kind: str | None = None,
+):
+    """
+    Totals plus per-status, per-host and per-package rollups (links, bytes, throughput)
+    of both lists, or of one `kind`. Computed once per snapshot version.
+    """
+    if kind is not None and kind not in LIST_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {kind}. Allowed: {', '.join(LIST_KINDS)}")
+    snapshots = [await snapshot_service.get(api, k) for k in ((kind,) if kind else LIST_KINDS)]
+
+    etag = make_etag("stats", *(s.tag for s in snapshots))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if kind:
+        content = snapshots[0].encoded_stats()
+    else:
+        content = b"{" + b",".join(b'"' + s.kind.encode() + b'":' + s.encoded_stats() for s in snapshots) + b"}"
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+@router.get("/stats/history")
+async def get_stats_history(
     current_user: Annotated[User, Depends(deps.get_current_user)],
+    series: str = "global",
+    window: Annotated[float, Query(gt=0)] = 3600,
+    resolution: Annotated[int | None, Query(ge=1)] = None,
+):
+    """
+    Throughput history of one series ("global", "host:<host>" or "package:<uuid>") over the
+    last `window` seconds, from the finest tier that covers it (or at least `resolution` seconds
+    per point). Points are [time, average speed, bytes_loaded]; `series` lists what is recorded.
+    """
+    history = snapshot_service.history
+    if series not in history:
+        raise HTTPException(status_code=404, detail=f"Unknown series: {series}")
+    until = time.time()
+    step, points = history.query(series, until - window, until, resolution)
+    return {"series": series, "step": step, "points": points, "available": history.keys()}
+
+def _sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+def _full_list_event(snapshot: Snapshot) -> bytes:
+    # Splice the cached list encoding in instead of re-serializing it
+    head = fastjson.dumps({"kind": snapshot.kind, "version": snapshot.version})
+    return _sse("packages", head[:-1] + b',"packages":' + snapshot.encoded() + b"}")
+
+@router.post("/stream/ticket")
+async def create_stream_ticket(current_user: Annotated[User, Depends(deps.get_current_user)]):
+    """Short-lived ticket for opening /stream?ticket=..., so the login token never goes in a URL."""
+    ticket = security.create_access_token(
+        data={"sub": current_user.username, "scope": deps.STREAM_SCOPE},
+        expires_delta=timedelta(seconds=settings.STREAM_TICKET_EXPIRE_SECONDS),
+    )
+    return {"ticket": ticket, "expires_in": settings.STREAM_TICKET_EXPIRE_SECONDS}
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    current_user: Annotated[User, Depends(deps.get_stream_user)],
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
-    # Manual implementation to ensure directory is set
-    pkgs = await api.get_linkgrabber_packages()
-    ids = [p.uuid for p in pkgs]
-    
-    if not ids:
-        return {"status": "confirmed", "count": 0}
+    """
+    Server-Sent Events feed of queue changes, replacing the dashboard's polling.
 
-    # Check for default path setting
+    Sends the full lists once (`packages`), then only per-package `delta` events
+    (upserts / removed uuids / new order) as the shared snapshot refresher sees them,
+    plus `status` and `buffer` events when those change. Deltas that pile up while a
+    client is slow are coalesced; past STREAM_MAX_PENDING_PACKAGES a list is resent in full.
+    """
+    async def events():
+        for kind in (DOWNLOADS, LINKGRABBER):
+            try:
+                await snapshot_service.get(api, kind)
+            except Exception as e:
+                logger.warning("Stream initial fetch failed", list=kind, error=str(e), exc_info=True)
+        jd_status = await snapshot_service.get_jd_status(api)
+
+        # Subscribe before the first send so no refresh falls between the two
+        subscription = snapshot_service.subscribe()
+        try:
+            buffer_signature = None
+            resync: set[str] = set()
+            deltas: list[dict] = []
+            status_changed = True
+            last_sent = time.monotonic()
+
+            while not await request.is_disconnected():
+                chunks = []
+                for kind in (DOWNLOADS, LINKGRABBER):
+                    if kind not in resync and kind in subscription.versions:
+                        continue
+                    snapshot = snapshot_service.peek(kind)
+                    if snapshot is not None:
+                        subscription.versions[kind] = snapshot.version
+                        chunks.append(_full_list_event(snapshot))
+                for delta in deltas:
+                    chunks.append(_sse("delta", fastjson.dumps(delta)))
+
+                signature = get_buffer_signature()
+                if signature != buffer_signature:
+                    buffer_signature = signature
+                    status_changed = True
+                    chunks.append(_sse("buffer", fastjson.dumps(read_buffer_details())))
+                if status_changed:
+                    chunks.append(_sse("status", fastjson.dumps(build_system_status(jd_status))))
+
+                if chunks:
+                    yield b"".join(chunks)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= settings.STREAM_KEEPALIVE_INTERVAL:
+                    yield b": keepalive\n\n"
+                    last_sent = time.monotonic()
+
+                resync, deltas, new_status = await subscription.drain(timeout=snapshot_service.refresh_interval)
+                status_changed = new_status is not None and new_status != jd_status
+                if status_changed:
+                    jd_status = new_status
+        finally:
+            snapshot_service.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def default_download_directory() -> str | None:
     current_settings = settings_manager.load_settings()
     if current_settings.use_default_download_path and current_settings.default_download_path:
-        print(f"[Router] Applying default download path: {current_settings.default_download_path}")
-        await api.set_download_directory(ids, current_settings.default_download_path)
-        # Give JD a moment to apply the change before moving
-        await asyncio.sleep(0.2)
+        return current_settings.default_download_path
+    return None
+
+def job_accepted(job: Job) -> JSONResponse:
+    """202 Accepted with the submitted job, whose status is then polled at /jobs/{id}."""
+    return JSONResponse(job.to_dict(), status_code=202, headers={"Location": f"{settings.API_V1_STR}/jobs/{job.id}"})
+
+def package_chunks(package_ids: list[str]) -> list[list[str]]:
+    size = settings.JD_PACKAGE_CHUNK_SIZE
+    if size <= 0 or len(package_ids) <= size:
+        return [package_ids]
+    return [package_ids[i:i + size] for i in range(0, len(package_ids), size)]
+
+async def confirm_all(api: MockJDownloaderAPI, job: Job | None = None) -> dict:
+    snapshot = await snapshot_service.get(api, LINKGRABBER, include_links=False)
+    ids = list(snapshot.store.pkg_uuid)
+
+    if not ids:
+        return {"status": "confirmed", "count": 0, "steps": []}
 
-    await api.confirm_all_linkgrabber()
-    return {"status": "confirmed", "count": len(ids)}
+    directory = default_download_directory()
+    if directory:
+        logger.info("Applying default download path", path=directory)
+    # Progress is counted in packages, advanced by every confirmed chunk
+    steps = []
+    done = 0
+    for chunk in package_chunks(ids):
+        if job is not None:
+            job.report(done, len(ids))
+        steps.extend(await confirm_packages(api, chunk, directory))
+        done += len(chunk)
+    if job is not None:
+        job.report(done, len(ids))
+    snapshot_service.invalidate(LINKGRABBER, DOWNLOADS)
+    return {"status": "confirmed", "count": len(ids), "steps": steps}
+
+@router.post("/linkgrabber/confirm-all")
+async def confirm_all_linkgrabber(
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    background: bool = False,
+):
+    """
+    Move every LinkGrabber package to the download list, applying the default download path
+    first if enabled. Package ids come from the (package-level) snapshot, and each step is
+    confirmed by a query of just these packages; `steps` reports how long each one took.
+    With background=true a job is submitted instead (202, poll /jobs/{id}).
+    """
+    if background:
+        return job_accepted(job_manager.submit("confirm-all", lambda job: confirm_all(api, job)))
+    return await confirm_all(api)
 
 @router.post("/linkgrabber/move")
 async def move_to_dl(
@@ -153,27 +547,55 @@ async def move_to_dl(
     current_user: Annotated[User, Depends(deps.get_current_user)],
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
-    # Check for default path setting
-    current_settings = settings_manager.load_settings()
-    if current_settings.use_default_download_path and current_settings.default_download_path:
-        print(f"[Router] Applying default download path to selected: {current_settings.default_download_path}")
-        await api.set_download_directory(package_ids, current_settings.default_download_path)
-        await asyncio.sleep(0.2)
-        
-    await api.move_to_dl(package_ids)
-    return {"status": "moved"}
+    directory = default_download_directory()
+    if directory:
+        logger.info("Applying default download path to selected", path=directory)
+    steps = await confirm_packages(api, package_ids, directory)
+    snapshot_service.invalidate(LINKGRABBER, DOWNLOADS)
+    return {"status": "moved", "steps": steps}
 
 @router.post("/downloads/links", response_model=str)
 async def add_links(
     links: list[str],
+    response: Response,
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    allow_duplicates: bool = False,
+    background: bool = False,
 ):
+    """
+    Add links to the LinkGrabber (or the offline buffer if JD is unreachable). Links JD or
+    the buffer already has are dropped unless allow_duplicates=true; their number is
+    returned in X-Duplicate-Links, and "duplicate" if nothing new was left to add.
+    """
+    if not allow_duplicates:
+        links, duplicates = await filter_duplicates(api, links, get_buffer_file())
+        response.headers["X-Duplicate-Links"] = str(len(duplicates))
+        if not links:
+            return "duplicate"
+    if background:
+        return job_accepted(job_manager.submit("add-links", lambda job: add_or_buffer_links(api, links, job)))
+    return await add_or_buffer_links(api, links)
+
+async def add_or_buffer_links(api: MockJDownloaderAPI, links: list[str], job: Job | None = None) -> str:
     try:
-        pkg_id = await api.add_links(links)
+        pkg_id = await api.add_links(links, progress=None if job is None else job.report)
+        if not add_failed(pkg_id):
+            duplicate_index.remember(links)
+        snapshot_service.invalidate(LINKGRABBER)
         return str(pkg_id)
-    except Exception:
-        # Buffer if connection failed
+    except Exception as e:
+        logger.warning("Adding links failed", links=len(links), error=str(e), exc_info=True)
+        # Buffer if connection failed (only the chunks JD did not get)
+        if isinstance(e, AddLinksError):
+            sent = e.sent(links)
+            if sent:
+                duplicate_index.remember(sent)
+                snapshot_service.invalidate(LINKGRABBER)
+            if not e.pending:
+                # JD refused the links or may have them already: sending them again would not help
+                return f"error: {e}"
+            links = e.pending
         buffer_file = get_buffer_file()
         if not buffer_file.parent.exists():
              buffer_file.parent.mkdir(parents=True, exist_ok=True)
@@ -181,13 +603,13 @@ async def add_links(
         buffer_data = []
         if buffer_file.exists():
             try:
-                with open(buffer_file) as f:
+                with child_span(tracer, "buffer.read"), open(buffer_file) as f:
                     buffer_data = json.load(f)
             except:
                 pass
         
         buffer_data.extend(links)
-        with open(buffer_file, "w") as f:
+        with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
             json.dump(buffer_data, f)
             
         return "buffered-offline"
@@ -198,25 +620,43 @@ async def start_downloads(
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
     resp = await api.start_downloads()
+    snapshot_service.invalidate(DOWNLOADS)
     return {"status": "started", "jd_response": resp}
 
+async def remove_packages(api: MockJDownloaderAPI, kind: str, package_ids: list[str], job: Job | None = None) -> dict:
+    remove = api.remove_download_packages if kind == DOWNLOADS else api.remove_linkgrabber_packages
+    done = 0
+    for chunk in package_chunks(package_ids):
+        if job is not None:
+            job.report(done, len(package_ids))
+        await remove(chunk)
+        done += len(chunk)
+    if job is not None:
+        job.report(done, len(package_ids))
+    snapshot_service.invalidate(kind)
+    return {"status": "deleted"}
+
 @router.post("/linkgrabber/delete")
 async def delete_linkgrabber_packages(
     package_ids: list[str],
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    background: bool = False,
 ):
-    await api.remove_linkgrabber_packages(package_ids)
-    return {"status": "deleted"}
+    if background:
+        return job_accepted(job_manager.submit("delete", lambda job: remove_packages(api, LINKGRABBER, package_ids, job)))
+    return await remove_packages(api, LINKGRABBER, package_ids)
 
 @router.post("/downloads/delete")
 async def delete_download_packages(
     package_ids: list[str],
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    background: bool = False,
 ):
-    await api.remove_download_packages(package_ids)
-    return {"status": "deleted"}
+    if background:
+        return job_accepted(job_manager.submit("delete", lambda job: remove_packages(api, DOWNLOADS, package_ids, job)))
+    return await remove_packages(api, DOWNLOADS, package_ids)
 
 @router.post("/linkgrabber/set-directory")
 async def set_linkgrabber_directory(
@@ -229,6 +669,7 @@ async def set_linkgrabber_directory(
     directory = payload.get("directory", "")
     if package_ids and directory:
         await api.set_download_directory(package_ids, directory)
+        snapshot_service.invalidate(LINKGRABBER)
     return {"status": "updated"}
 
 @router.post("/downloads/stop")
@@ -237,8 +678,55 @@ async def stop_downloads(
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
     await api.stop_downloads()
+    snapshot_service.invalidate(DOWNLOADS)
     return {"status": "stopped"}
 
+@router.post("/batch")
+async def run_batch_operations(
+    payload: BatchRequest,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+):
+    """
+    Run an ordered list of package operations as one pipeline. Consecutive operations of
+    the same type (and target) are merged into a single JD call; one result per operation.
+    Links of add operations that JD or the offline buffer already has are dropped (their
+    number is in `duplicates`) unless allow_duplicates is set.
+    """
+    buffer_file = None if payload.allow_duplicates else get_buffer_file()
+    results, changed = await run_batch(api, payload.operations, payload.stop_on_error, default_download_directory(), buffer_file)
+    if changed:
+        snapshot_service.invalidate(*changed)
+    return {"results": results, "calls": results[-1]["call"] + 1}
+
+@router.get("/jobs")
+async def list_jobs(
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+):
+    """Queued, running and recently finished background jobs, newest first."""
+    return [job.to_dict() for job in job_manager.list()]
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+):
+    """Cancel a queued or running job. JD calls already made are not undone."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 from fastapi import File, UploadFile
 
 
@@ -246,16 +734,28 @@ from fastapi import File, UploadFile
 async def add_container_file(
     current_user: Annotated[User, Depends(deps.get_current_user)],
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    background: bool = False,
 ):
     content = await file.read()
-    
+    if background:
+        # The upload is read within the request; only the JD call runs in the job
+        return job_accepted(job_manager.submit("add-file", lambda job: add_container(api, file.filename, content, job)))
+    return await add_container(api, file.filename, content)
+
+async def add_container(api: MockJDownloaderAPI, filename: str, content: bytes, job: Job | None = None) -> dict:
+    # A container goes to JD in one call, so progress is counted in files
+    if job is not None:
+        job.report(0, 1)
     try:
         result = await api.add_dlc(content)
+        snapshot_service.invalidate(LINKGRABBER)
+        if job is not None:
+            job.report(1)
         if result != "ok":
              # Some API error not conn related
              raise HTTPException(status_code=400, detail=result)
-        return {"status": "added", "filename": file.filename}
+        return {"status": "added", "filename": filename}
 
     except Exception:
          # Buffer if connection failed (or other error but we assume conn for now essentially)
@@ -264,13 +764,13 @@ async def add_container_file(
              
          import time
          # Use timestamp to avoid collision
-         safe_name = f"{int(time.time())}_{file.filename}"
+         safe_name = f"{int(time.time())}_{filename}"
          file_path = buffer_dir / safe_name
          
-         with open(file_path, "wb") as f:
+         with child_span(tracer, "buffer.write"), open(file_path, "wb") as f:
              f.write(content)
              
-         return {"status": "buffered", "filename": file.filename}
+         return {"status": "buffered", "filename": filename}
 
 @router.get("/linkgrabber/buffer")
 async def get_link_buffer(
@@ -282,24 +782,20 @@ async def get_link_buffer(
     links = []
     if buffer_file.exists():
         try:
-            with open(buffer_file) as f:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
                 links = json.load(f)
                 count = len(links)
         except:
             pass
     return {"count": count, "links": links}
 
-@router.post("/linkgrabber/buffer/replay")
-async def replay_link_buffer(
-    current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
-):
+async def replay_buffer(api: MockJDownloaderAPI, job: Job | None = None, allow_duplicates: bool = False) -> dict:
     buffer_file = get_buffer_file()
 
     links = []
     if buffer_file.exists():
         try:
-            with open(buffer_file) as f:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
                 links = json.load(f)
         except:
             pass
@@ -312,83 +808,87 @@ async def replay_link_buffer(
         # Check help first to fail fast on connection
         await api.get_help() 
         
+        # Progress is counted in links, advanced by every chunk JD accepts
+        total = sum(len(entry.get("links", [])) if isinstance(entry, dict) else 1 for entry in links)
+        done = 0
+
+        def progress_from(base: int):
+            if job is None:
+                return None
+            return lambda accepted, _total: job.report(base + accepted, total)
+
         count = 0
         for entry in links:
+             if job is not None:
+                 job.report(done, total)
              # Handle package objects
              if isinstance(entry, dict):
                  pkg_links = entry.get("links", [])
                  pkg_name = entry.get("package", "CNL Package")
+                 base, done = done, done + len(pkg_links)
+                 if pkg_links and not allow_duplicates:
+                     # Links a previous (partly failed) replay already got into JD are not sent again
+                     pkg_links, _ = await filter_duplicates(api, pkg_links, via="replay")
                  if pkg_links:
-                     await api.add_links(pkg_links, package_name=pkg_name)
+                     result = await api.add_links(pkg_links, package_name=pkg_name, progress=progress_from(base))
+                     if not add_failed(result):
+                         duplicate_index.remember(pkg_links)
                      count += 1
+                     metrics.REPLAYED.labels("packages", "manual").inc()
+                     metrics.REPLAYED.labels("links", "manual").inc(len(pkg_links))
              else:
                  # Legacy string link
-                 if entry:
-                     await api.add_links([entry])
+                 entry_links = [entry] if entry else []
+                 done += 1
+                 if entry_links and not allow_duplicates:
+                     entry_links, _ = await filter_duplicates(api, entry_links, via="replay")
+                 if entry_links:
+                     result = await api.add_links(entry_links)
+                     if not add_failed(result):
+                         duplicate_index.remember(entry_links)
                      count += 1
+                     metrics.REPLAYED.labels("packages", "manual").inc()
+                     metrics.REPLAYED.labels("links", "manual").inc()
 
-        with open(buffer_file, "w") as f:
+        snapshot_service.invalidate(LINKGRABBER)
+        with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
             json.dump([], f)
+        if job is not None:
+            job.report(total, total)
         return {"status": "replayed", "count": count}
 
     except Exception as e:
+        metrics.REPLAY_FAILURES.labels("packages", "manual").inc()
         raise HTTPException(status_code=500, detail=f"Connection Failed: {e!s}")
 
+@router.post("/linkgrabber/buffer/replay")
+async def replay_link_buffer(
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    background: bool = False,
+    allow_duplicates: bool = False,
+):
+    if background:
+        return job_accepted(job_manager.submit("buffer-replay", lambda job: replay_buffer(api, job, allow_duplicates)))
+    return await replay_buffer(api, allow_duplicates=allow_duplicates)
+
 @router.get("/system/status")
 async def get_system_status(
+    request: Request,
     response: Response,
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
 ):
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     
-    # Check JD Connection
-    jd_online = False
-    myjd_status = {"online": False, "status": "Unknown"}
-    try:
-        # Simple check, help or version
-        await api.get_help()
-        jd_online = True
-    except Exception:
-        jd_online = False
-
-    if jd_online:
-        try:
-            # Get detailed MyJD Status
-            myjd_status = await api.get_myjd_connection_status()
-        except:
-             myjd_status = {"online": False, "status": "Unknown (Error)"}
-
-    # Check Buffer (now contains package objects)
-    buffer_file = get_buffer_file()
-    buffer_count = 0
-    if buffer_file.exists():
-        try:
-            with open(buffer_file) as f:
-                buffer_data = json.load(f)
-                # Count total links across all packages
-                for entry in buffer_data:
-                    if isinstance(entry, dict):
-                        buffer_count += len(entry.get("links", []))
-                    else:
-                        buffer_count += 1  # Legacy format: single link
-        except:
-            pass
+    # Check JD Connection (cached and shared across all status polls)
+    jd_status = await snapshot_service.get_jd_status(api)
 
-    # Check DLC Buffer
-    dlc_buffer_dir = get_dlc_buffer_dir()
-    
-    if dlc_buffer_dir.exists():
-        try:
-             files = [f for f in os.listdir(dlc_buffer_dir) if f.endswith(".dlc")]
-             buffer_count += len(files)
-        except:
-             pass
+    etag = make_etag(jd_status, get_buffer_signature())
+    response.headers["ETag"] = etag
+    if is_not_modified(request, etag):
+        return not_modified(etag, {"Cache-Control": response.headers["Cache-Control"]})
 
-    return {
-        "jd_online": jd_online,
-        "buffer_count": buffer_count,
-        "myjd_connection": myjd_status
-    }
+    return build_system_status(jd_status)
 
 @router.post("/system/restart")
 async def restart_system(
@@ -396,6 +896,7 @@ async def restart_system(
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
     await api.restart_jd()
+    snapshot_service.invalidate()
     return {"status": "restarting"}
 
 @router.post("/system/shutdown")
@@ -404,51 +905,31 @@ async def shutdown_system(
     api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
 ):
     await api.shutdown_jd()
+    snapshot_service.invalidate()
     return {"status": "shutting_down"}
 
 @router.post("/system/buffer/replay")
 async def system_buffer_replay(
     current_user: Annotated[User, Depends(deps.get_current_user)],
-    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)]
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    background: bool = False,
+    allow_duplicates: bool = False,
 ):
-    return await replay_link_buffer(current_user, api)
+    return await replay_link_buffer(current_user, api, background, allow_duplicates)
 
 @router.get("/buffer/details")
 async def get_buffer_details(
+    request: Request,
+    response: Response,
     current_user: Annotated[User, Depends(deps.get_current_user)],
 ):
     """Get detailed buffer contents including packages and DLC files."""
-    buffer_file = get_buffer_file()
-    dlc_buffer_dir = get_dlc_buffer_dir()
-    
-    # Get link packages
-    packages = []
-    if buffer_file.exists():
-        try:
-            with open(buffer_file) as f:
-                packages = json.load(f)
-        except:
-            pass
-    
-    # Get DLC files
-    dlc_files = []
-    if dlc_buffer_dir.exists():
-        try:
-            for filename in os.listdir(dlc_buffer_dir):
-                if filename.endswith(".dlc"):
-                    file_path = dlc_buffer_dir / filename
-                    dlc_files.append({
-                        "filename": filename,
-                        "size": os.path.getsize(file_path),
-                        "timestamp": os.path.getmtime(file_path)
-                    })
-        except:
-            pass
-    
-    return {
-        "packages": packages,
-        "dlc_files": dlc_files
-    }
+    etag = make_etag(get_buffer_signature())
+    response.headers["ETag"] = etag
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    return read_buffer_details()
 
 @router.delete("/buffer/package/{index}")
 async def delete_buffer_package(
@@ -462,7 +943,7 @@ async def delete_buffer_package(
         raise HTTPException(status_code=404, detail="Buffer file not found")
     
     try:
-        with open(buffer_file) as f:
+        with child_span(tracer, "buffer.read"), open(buffer_file) as f:
             packages = json.load(f)
         
         if index < 0 or index >= len(packages):
@@ -470,7 +951,7 @@ async def delete_buffer_package(
         
         deleted = packages.pop(index)
         
-        with open(buffer_file, "w") as f:
+        with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
             json.dump(packages, f)
         
         return {"status": "deleted", "deleted": deleted}
@@ -511,10 +992,10 @@ async def clear_buffer(
     # Clear link buffer
     if buffer_file.exists():
         try:
-            with open(buffer_file) as f:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
                 packages = json.load(f)
                 deleted_packages = len(packages)
-            with open(buffer_file, "w") as f:
+            with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
                 json.dump([], f)
         except:
             pass
@@ -555,6 +1036,8 @@ async def cnl_proxy_check():
 @router.post("/cnl/flash/add")
 async def cnl_proxy_add(
     current_user: Annotated[User, Depends(deps.get_current_user)],
+    api: Annotated[MockJDownloaderAPI, Depends(deps.get_jd_api)],
+    allow_duplicates: bool = False,
     crypted: str = Form(...),
     jk: str = Form(...),
     passwords: str = Form(None),
@@ -563,7 +1046,8 @@ async def cnl_proxy_add(
 ):
     """
     CNL add endpoint for browser extension.
-    Accepts the same parameters as the local CNL receiver and buffers the links.
+    Accepts the same parameters as the local CNL receiver and buffers the links
+    (except those JD or the buffer already has, unless allow_duplicates=true).
     """
     # Extract key from JK
     key_match = re.search(r"return ['\"]([0-9a-fA-F]+)['\"]", jk)
@@ -581,13 +1065,20 @@ async def cnl_proxy_add(
     
     if not links:
         raise HTTPException(status_code=400, detail="No links found")
-    
-    # Buffer the links
+
     buffer_file = get_buffer_file()
+    duplicates = []
+    if not allow_duplicates:
+        links, duplicates = await filter_duplicates(api, links, buffer_file, via="cnl")
+        if not links:
+            metrics.CNL_PACKAGES.labels("proxy", "duplicate").inc()
+            return {"status": "duplicate", "links_added": 0, "duplicates": len(duplicates), "package": package or source or "CNL Package"}
+
+    # Buffer the links
     buffer_data = []
     if buffer_file.exists():
         try:
-            with open(buffer_file) as f:
+            with child_span(tracer, "buffer.read"), open(buffer_file) as f:
                 buffer_data = json.load(f)
         except:
             pass
@@ -599,10 +1090,12 @@ async def cnl_proxy_add(
     }
     buffer_data.append(package_entry)
     
-    with open(buffer_file, "w") as f:
+    with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
         json.dump(buffer_data, f)
+    metrics.CNL_PACKAGES.labels("proxy", "buffered").inc()
+    metrics.CNL_LINKS.labels("proxy").inc(len(links))
     
-    return {"status": "success", "links_added": len(links), "package": package_entry["package"]}
+    return {"status": "success", "links_added": len(links), "duplicates": len(duplicates), "package": package_entry["package"]}
 
 @router.get("/extension/edge.crx")
 async def get_edge_extension():
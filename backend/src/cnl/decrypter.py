@@ -4,6 +4,10 @@ import binascii
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+from src.core.log import get_logger
+
+logger = get_logger("cnl")
+
 
 class CNLDecrypter:
     @staticmethod
@@ -27,7 +31,7 @@ class CNLDecrypter:
             decrypted_text = decrypted_padded.decode('utf-8', errors='ignore')
             return decrypted_text.strip()
         except Exception as e:
-            print(f"Decryption failed: {e}")
+            logger.warning("CNL decryption failed", error=str(e))
             return ""
 
     @staticmethod
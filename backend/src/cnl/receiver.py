@@ -1,14 +1,19 @@
 import json
-import logging
 
 from fastapi import FastAPI, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
+from opentelemetry import trace
+
+from src.core import metrics
+from src.core.log import get_logger
+from src.core.telemetry import child_span
+from src.infrastructure.api_interface import AddLinksError, add_failed
 
 from .decrypter import CNLDecrypter
 
-# Setup Logging
-logger = logging.getLogger("CNLReceiver")
-logging.basicConfig(level=logging.INFO)
+# Setup Logging (handlers and levels are configured by src.core.log)
+logger = get_logger("cnl")
+tracer = trace.get_tracer(__name__)
 
 app = FastAPI(title="JDownloader CNL Receiver")
 
@@ -68,15 +73,13 @@ async def add_crypted(
     source: str | None = Form(None),
     package: str | None = Form(None)  # Package name for grouping
 ):
-    print(f"DEBUG: Received CNL payload from {source}, package: {package}")
-    logger.info(f"Received CNL payload. Source: {source}, Package: {package}")
+    logger.info("Received CNL payload", source=source, package=package)
     
     # 1. Extract Key from JK (Javascript Key)
     # Simple regex extraction for standard "return 'HEX'" pattern
     import re
     key_match = re.search(r"return ['\"]([0-9a-fA-F]+)['\"]", jk)
     if not key_match:
-        print("DEBUG: Could not extract key from JK")
         logger.error("Could not extract key from JK")
         return Response(content="failed", status_code=400)
     
@@ -85,21 +88,27 @@ async def add_crypted(
     # 2. Decrypt
     decrypted_text = CNLDecrypter.decrypt(crypted, key)
     if not decrypted_text:
-        print("DEBUG: Decryption failed")
         logger.error("Decryption failed")
         return Response(content="failed", status_code=400)
         
     links = CNLDecrypter.extract_links(decrypted_text)
-    print(f"DEBUG: Decrypted {len(links)} links for package '{package}'")
-    logger.info(f"Decrypted {len(links)} links.")
+    logger.info("Decrypted CNL links", package=package, links=len(links))
+    metrics.CNL_LINKS.labels("receiver").inc(len(links))
     
     # 3. Try Direct Add or Buffer
     # If JD is online, add directly to avoid "Offline Queue" persistence
-    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
-    # Use settings_manager to get correct JD URL
-    from src.infrastructure.settings_manager import settings_manager
-    current = settings_manager.load_settings()
-    api = LocalJDownloaderAPI(current.api_url)
+    # The API the rest of the app uses (the shared pooled client for the configured JD URL)
+    from src.api.deps import resolve_jd_api
+    from src.domain.snapshot import LINKGRABBER
+    from src.infrastructure.link_index import duplicate_index, filter_duplicates
+    from src.infrastructure.snapshot_service import snapshot_service
+    api = resolve_jd_api()
+
+    # Links JD or the buffer already has are dropped (CNL senders have no way to override this)
+    links, _ = await filter_duplicates(api, links, BUFFER_FILE, via="cnl")
+    if not links:
+        metrics.CNL_PACKAGES.labels("receiver", "duplicate").inc()
+        return Response(content="success", media_type="text/plain")
     
     added_directly = False
     try:
@@ -114,24 +123,38 @@ async def add_crypted(
         pkg_name = package or source or "CNL Package"
         
         # Try direct add
-        logger.info(f"Attempting direct add to JD for package: {pkg_name}")
+        logger.info("Attempting direct add to JD", package=pkg_name)
         res = await api.add_links(links, package_name=pkg_name)
         
-        if "ok" in res or "success" in res:
+        if not add_failed(res):
             added_directly = True
-            logger.info("Direct add successful.")
+            duplicate_index.remember(links)
+            snapshot_service.invalidate(LINKGRABBER)
+            metrics.CNL_PACKAGES.labels("receiver", "added").inc()
+            logger.info("Direct add successful", package=pkg_name)
         else:
-            logger.warning(f"Direct add returned non-success: {res}")
+            logger.warning("Direct add returned non-success", result=res)
             
+    except AddLinksError as e:
+        logger.warning(
+            "Direct add failed (JD likely offline)", error=str(e), pending=len(e.pending),
+            uncertain=len(e.uncertain), rejected=len(e.rejected),
+        )
+        sent = e.sent(links)
+        if sent:
+            # Some chunks made it (or may have): only the ones JD did not get are buffered
+            duplicate_index.remember(sent)
+            snapshot_service.invalidate(LINKGRABBER)
+        links = e.pending
     except Exception as e:
-        logger.warning(f"Direct add failed (JD likely offline): {e}")
+        logger.warning("Direct add failed (JD likely offline)", error=str(e))
 
-    if not added_directly:
+    if not added_directly and links:
         # Buffer Links (as structured package) if direct add failed
         buffer_data = []
         if BUFFER_FILE.exists():
             try:
-                with open(BUFFER_FILE) as f:
+                with child_span(tracer, "buffer.read"), open(BUFFER_FILE) as f:
                     buffer_data = json.load(f)
             except:
                 buffer_data = []
@@ -145,13 +168,13 @@ async def add_crypted(
         buffer_data.append(package_entry)
         
         try:
-            with open(BUFFER_FILE, "w") as f:
+            with child_span(tracer, "buffer.write"), open(BUFFER_FILE, "w") as f:
                 json.dump(buffer_data, f)
-            print("DEBUG: Links buffered (Offline Mode)")
         except Exception as e:
-            print(f"DEBUG: Failed to write to buffer: {e}")
+            logger.error("Failed to write to buffer", error=str(e))
             
-        logger.info("Links buffered.")
+        logger.info("Links buffered", links=len(links))
+        metrics.CNL_PACKAGES.labels("receiver", "buffered").inc()
     
     # 4. Trigger Cross-Origin Success (Pixel/Iframe response)
     # JD usually just returns success.
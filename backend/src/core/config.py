@@ -17,7 +17,73 @@ class Settings(BaseSettings):
     # JDownloader Configuration
     USE_MOCK_API: bool = False
     JD_API_URL: str = "http://127.0.0.1:3128"
+
+    # JDownloader HTTP connection pool (shared by API requests, CNL receiver and replay loop)
+    JD_HTTP_MAX_CONNECTIONS: int = 20
+    JD_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    JD_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    JD_HTTP_TIMEOUT: float = 10.0  # seconds
+    JD_HTTP_CONNECT_TIMEOUT: float = 5.0  # seconds
+    JD_HTTP2: bool = False  # requires the optional 'http2' extra
+
+    # Server-side snapshot cache of the downloads/LinkGrabber lists
+    JD_SNAPSHOT_REFRESH_INTERVAL: float = 2.0  # seconds between background refreshes
+    JD_SNAPSHOT_MAX_STALENESS: float = 5.0  # never serve a snapshot older than this
+    JD_SNAPSHOT_IDLE_TIMEOUT: float = 60.0  # stop refreshing a list nobody read for this long
+
+    # Incremental link sync: force a full queryLinks every N refreshes
+    JD_SYNC_FULL_RESYNC_EVERY: int = 30
+
+    # Paged list queries (JD startAt/maxResults); 0 disables paging
+    JD_QUERY_PAGE_SIZE: int = 1000
+    JD_QUERY_MAX_CONCURRENT_PAGES: int = 4
+
+    # Endpoint dialect discovery: how often the JD version is re-checked (a change re-reads /help)
+    JD_DIALECT_RECHECK_INTERVAL: float = 300.0  # seconds
+
+    # Adding links: large lists are sent in chunks (same package name), a few at a time
+    JD_ADD_LINKS_CHUNK_SIZE: int = 1000
+    JD_ADD_LINKS_MAX_CONCURRENT: int = 4
+    JD_ADD_LINKS_RETRIES: int = 2  # per chunk, on connection errors (the request never reached JD)
+    JD_ADD_LINKS_RETRY_DELAY: float = 0.5  # seconds, doubled on each retry
+
+    # Duplicate links (already in JD or the offline buffer) are dropped before adding, unless
+    # a request passes allow_duplicates=true
+    DUPLICATE_LINKS_FILTER: bool = True
+    # Links just added count as duplicates until a list snapshot shows them, or for this long
+    DUPLICATE_SUBMITTED_MAX_AGE: float = 300.0  # seconds
+
+    # Confirm/move pipeline: how long to wait for JD to reflect each step before going on
+    JD_CONFIRM_TIMEOUT: float = 5.0  # seconds
+
+    # Confirm-all and bulk deletes go to JD in chunks of this many packages (progress is
+    # reported after each); 0 sends them in one call
+    JD_PACKAGE_CHUNK_SIZE: int = 500
+
+    # Throughput history (/stats/history): downloads are sampled at least this often, even
+    # with no dashboard open (0 = only when read); at most this many series are kept
+    STATS_HISTORY_INTERVAL: float = 10.0  # seconds
+    STATS_HISTORY_MAX_SERIES: int = 200
+
+    # Smoothed ETAs: half-life (seconds) of the moving average of link speeds
+    ETA_HALF_LIFE: float = 30.0
+    # Seconds a link may report no speed before its smoothed ETA is dropped
+    ETA_IDLE_TIMEOUT: float = 60.0
+
+    # Search index (/search): distinct strings kept before the index is rebuilt from scratch
+    SEARCH_INDEX_MAX_STRINGS: int = 1_000_000
+
+    # Live change stream (/stream): pending packages per client before falling back to a full resync
+    STREAM_MAX_PENDING_PACKAGES: int = 1000
+    STREAM_KEEPALIVE_INTERVAL: float = 15.0  # seconds
+    # Lifetime of the single-purpose ticket that authorizes opening /stream
+    STREAM_TICKET_EXPIRE_SECONDS: int = 60
     
+    # Background jobs (/jobs): concurrent workers and how long finished jobs stay queryable
+    JOBS_MAX_CONCURRENT: int = 2
+    JOBS_RETENTION: float = 3600.0  # seconds
+    JOBS_MAX_FINISHED: int = 200
+
     # CORS
     BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
 
@@ -32,6 +98,16 @@ class Settings(BaseSettings):
 
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # per subsystem (api, cnl, jd, jobs, replay, snapshot), e.g. "jd=DEBUG,cnl=WARNING"
+    LOG_FORMAT: str = "console"  # or "json"
+    LOG_MAX_VALUE_LENGTH: int = 512  # longer values (e.g. JD response bodies) are truncated
+    LOG_QUEUE_SIZE: int = 10_000  # records waiting for the writer thread; more are dropped
+
+    # Tracing: "none", "console" or "otlp" (OTLP/HTTP, requires the optional 'otlp' extra)
+    OTEL_TRACES_EXPORTER: str = "none"
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    OTEL_TRACES_SAMPLE_RATIO: float = 1.0  # share of new traces recorded; child spans follow their parent
+    OTEL_SERVICE_NAME: str = "jd-manager"
     
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
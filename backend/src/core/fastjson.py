@@ -0,0 +1,15 @@
+"""JSON encoding helpers that use orjson when it is installed (optional 'speedups' extra)."""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize plain (already JSON-compatible) data to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
@@ -0,0 +1,137 @@
+"""Structured logging: structlog events, rendered and written by a background thread."""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+import structlog
+
+from src.core.config import settings
+
+# Subsystem loggers; each level can be set on its own with LOG_LEVELS ("jd=DEBUG,cnl=WARNING")
+SUBSYSTEMS = ("api", "cnl", "jd", "jobs", "replay", "snapshot")
+
+
+def get_logger(subsystem: str) -> structlog.stdlib.BoundLogger:
+    return structlog.stdlib.get_logger(subsystem)
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """'jd=DEBUG, cnl=warning' -> {'jd': 'DEBUG', 'cnl': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def truncate_values(max_length: int):
+    """Processor cutting long string/bytes values (JD response bodies, link lists) to `max_length`."""
+    def processor(logger, method_name, event_dict):
+        for key, value in event_dict.items():
+            if isinstance(value, (str, bytes)) and len(value) > max_length:
+                event_dict[key] = f"{value[:max_length]!s}... ({len(value) - max_length} more)"
+        return event_dict
+    return processor
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread untouched (rendering happens there, not in the
+    caller) and drops them when the queue is full instead of blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    levels: dict[str, str] | None = None,
+    fmt: str = "console",
+    max_value_length: int = 512,
+    queue_size: int = 10_000,
+) -> DroppingQueueHandler:
+    """
+    Route structlog and stdlib logging through one bounded queue to a writer thread.
+
+    Level filtering happens before an event is built, so disabled debug calls cost a
+    method call; formatting, truncation and I/O happen on the listener thread.
+    """
+    global _listener
+    shared = [
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
+    structlog.configure(
+        processors=[structlog.stdlib.filter_by_level, *shared, structlog.stdlib.ProcessorFormatter.wrap_for_formatter],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    if fmt == "json":
+        renderers = [structlog.processors.format_exc_info, structlog.processors.JSONRenderer()]
+    else:
+        renderers = [structlog.dev.ConsoleRenderer(colors=False)]
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=shared,
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            truncate_values(max_value_length),
+            *renderers,
+        ],
+    )
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    # httpx logs every JD request at info level: only its warnings unless asked for
+    for name, subsystem_level in {"httpx": "WARNING", **(levels or {})}.items():
+        logging.getLogger(name).setLevel(subsystem_level)
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging() -> DroppingQueueHandler:
+    """configure_logging() from the LOG_* settings."""
+    handler = configure_logging(
+        settings.LOG_LEVEL,
+        parse_levels(settings.LOG_LEVELS),
+        settings.LOG_FORMAT,
+        settings.LOG_MAX_VALUE_LENGTH,
+        settings.LOG_QUEUE_SIZE,
+    )
+    atexit.register(shutdown_logging)
+    return handler
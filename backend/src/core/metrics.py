@@ -0,0 +1,73 @@
+"""Prometheus metrics of the backend and its JD interaction (exposed on /metrics)."""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Local JD calls answer in milliseconds; big list queries and timeouts take seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# JD API
+JD_REQUESTS = Counter(
+    "jdm_jd_requests_total", "Calls to the local JD API by endpoint and HTTP status ('error' if no response)",
+    ["endpoint", "status"],
+)
+JD_REQUEST_ERRORS = Counter(
+    "jdm_jd_request_errors_total", "JD API calls that failed without a response, by exception type",
+    ["endpoint", "error"],
+)
+JD_REQUEST_LATENCY = Histogram(
+    "jdm_jd_request_duration_seconds", "Time until JD answered (response headers)",
+    ["endpoint"], buckets=LATENCY_BUCKETS,
+)
+
+# Snapshot cache
+SNAPSHOT_REFRESH_LATENCY = Histogram(
+    "jdm_snapshot_refresh_duration_seconds", "Duration of a package list refresh from JD",
+    ["kind"], buckets=LATENCY_BUCKETS,
+)
+SNAPSHOT_REFRESH_FAILURES = Counter(
+    "jdm_snapshot_refresh_failures_total", "Package list refreshes that failed", ["kind"],
+)
+
+# Offline buffer and replay
+BUFFER_DEPTH = Gauge(
+    "jdm_buffer_depth", "Items waiting in the offline buffer (packages, links, dlc files)", ["item"],
+)
+REPLAYED = Counter(
+    "jdm_replayed_total", "Buffered items handed to JD by replays (packages, links, dlc files)",
+    ["item", "trigger"],
+)
+REPLAY_FAILURES = Counter(
+    "jdm_replay_failures_total", "Buffered items whose replay failed", ["item", "trigger"],
+)
+
+# Click'n'Load ingestion
+CNL_PACKAGES = Counter(
+    "jdm_cnl_packages_total", "Click'n'Load packages received, by entry point and outcome (added, buffered, duplicate)",
+    ["via", "outcome"],
+)
+CNL_LINKS = Counter(
+    "jdm_cnl_links_total", "Links decrypted from Click'n'Load packages", ["via"],
+)
+
+# Duplicate links dropped before reaching JD, by entry point (api, cnl, replay)
+DUPLICATE_LINKS = Counter(
+    "jdm_duplicate_links_total", "Links not sent to JD because it or the buffer already had them", ["via"],
+)
+
+# Background jobs
+JOBS = Counter(
+    "jdm_jobs_total", "Background jobs that finished, by kind and final status", ["kind", "status"],
+)
+
+# HTTP API
+HTTP_REQUESTS = Counter(
+    "jdm_http_requests_total", "Requests served, by route template and status", ["method", "route", "status"],
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    "jdm_http_request_duration_seconds", "Time until the response started, by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,87 @@
+"""Tracing setup: sampled spans, exported in batches off the request path."""
+import functools
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractContextManager, nullcontext
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from src.core.config import settings
+from src.core.log import get_logger
+
+logger = get_logger("api")
+
+EXPORTERS = ("none", "console", "otlp")
+
+
+def build_exporter(name: str, endpoint: str) -> SpanExporter | None:
+    """The span exporter for OTEL_TRACES_EXPORTER, or None to record nothing."""
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("Tracing disabled: OTLP exporter not installed", exporter=name, extra="otlp")
+            return None
+        return OTLPSpanExporter(endpoint=endpoint)
+    if name != "none":
+        logger.warning("Tracing disabled: unknown exporter", exporter=name, expected=EXPORTERS)
+    return None
+
+
+def build_tracer_provider(
+    exporter: SpanExporter | None,
+    sample_ratio: float = 1.0,
+    service_name: str = "jd-manager",
+) -> TracerProvider:
+    """
+    A provider that samples `sample_ratio` of new traces (requests continuing a remote
+    trace follow the caller's decision) and exports finished spans from a background
+    thread in batches. Without an exporter, no span is sampled at all.
+    """
+    sampler = ParentBased(TraceIdRatioBased(sample_ratio if exporter is not None else 0.0))
+    provider = TracerProvider(sampler=sampler, resource=Resource.create({SERVICE_NAME: service_name}))
+    if exporter is not None:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+def setup_tracing() -> TracerProvider:
+    """Install the global tracer provider configured by the OTEL_* settings."""
+    provider = build_tracer_provider(
+        build_exporter(settings.OTEL_TRACES_EXPORTER.lower(), settings.OTEL_EXPORTER_OTLP_ENDPOINT),
+        sample_ratio=settings.OTEL_TRACES_SAMPLE_RATIO,
+        service_name=settings.OTEL_SERVICE_NAME,
+    )
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def child_span(
+    tracer: trace.Tracer,
+    name: str,
+    attributes: dict | None = None,
+    kind: trace.SpanKind = trace.SpanKind.INTERNAL,
+) -> AbstractContextManager:
+    """
+    A span below the current one, or nothing outside a recorded trace: helpers that also run
+    from background loops or untraced endpoints (/metrics) don't start traces of their own.
+    """
+    if not trace.get_current_span().is_recording():
+        return nullcontext()
+    return tracer.start_as_current_span(name, kind=kind, attributes=attributes)
+
+
+def traced(tracer: trace.Tracer, name: str) -> Callable:
+    """Decorator: run a coroutine function inside a child_span."""
+    def decorate(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with child_span(tracer, name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,109 @@
+"""Batched package operations: validation models and merging of consecutive operations."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+from src.domain.snapshot import DOWNLOADS, LINKGRABBER
+
+OPERATIONS = ("remove", "move", "set-directory", "start", "stop", "add")
+
+# Package lists an operation changes (and whose snapshots must be refreshed afterwards)
+AFFECTED_LISTS = {
+    "move": (LINKGRABBER, DOWNLOADS),
+    "set-directory": (LINKGRABBER,),
+    "start": (DOWNLOADS,),
+    "stop": (DOWNLOADS,),
+    "add": (LINKGRABBER,),
+}
+
+
+class BatchOperation(BaseModel):
+    """
+    One step of a /batch request.
+
+    remove: `package_ids` from the `kind` list; move: LinkGrabber `package_ids` to downloads;
+    set-directory: `directory` of LinkGrabber `package_ids`; start/stop: all downloads;
+    add: `links` to the LinkGrabber, optionally as `package_name`.
+    """
+    op: Literal["remove", "move", "set-directory", "start", "stop", "add"]
+    kind: Literal["downloads", "linkgrabber"] = LINKGRABBER
+    package_ids: list[str] = []
+    directory: str | None = None
+    links: list[str] = []
+    package_name: str | None = None
+
+    @model_validator(mode="after")
+    def check_arguments(self) -> BatchOperation:
+        if self.op in ("remove", "move", "set-directory") and not self.package_ids:
+            raise ValueError(f"'{self.op}' needs package_ids")
+        if self.op == "set-directory" and not self.directory:
+            raise ValueError("'set-directory' needs a directory")
+        if self.op == "add" and not self.links:
+            raise ValueError("'add' needs links")
+        return self
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(min_length=1, max_length=500)
+    # Skip the remaining operations after the first failed JD call
+    stop_on_error: bool = True
+    # Send links of "add" operations even if JD or the offline buffer already has them
+    allow_duplicates: bool = False
+
+
+@dataclass
+class BatchGroup:
+    """Consecutive operations that are sent to JD as a single call."""
+    op: str
+    key: tuple
+    indices: list[int] = field(default_factory=list)
+    package_ids: list[str] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)
+
+    @property
+    def kind(self) -> str:
+        return self.key[0]
+
+    @property
+    def directory(self) -> str | None:
+        return self.key[1]
+
+    @property
+    def package_name(self) -> str | None:
+        return self.key[2]
+
+
+def _merge_key(operation: BatchOperation) -> tuple:
+    # Operations merge only when one JD call can express both (same list, directory or package name)
+    if operation.op == "remove":
+        return (operation.kind, None, None)
+    if operation.op == "set-directory":
+        return (LINKGRABBER, operation.directory, None)
+    if operation.op == "add":
+        return (LINKGRABBER, None, operation.package_name)
+    return (LINKGRABBER if operation.op == "move" else DOWNLOADS, None, None)
+
+
+def plan_batch(operations: list[BatchOperation]) -> list[BatchGroup]:
+    """
+    Merge runs of consecutive, compatible operations into groups, keeping the order.
+
+    Package ids and links are de-duplicated within a group; repeated start/stop collapse
+    into one call. Operations of different types are never reordered across each other.
+    """
+    groups: list[BatchGroup] = []
+    for index, operation in enumerate(operations):
+        key = _merge_key(operation)
+        if not groups or groups[-1].op != operation.op or groups[-1].key != key:
+            groups.append(BatchGroup(op=operation.op, key=key))
+        group = groups[-1]
+        group.indices.append(index)
+        group.package_ids.extend(operation.package_ids)
+        group.links.extend(operation.links)
+    for group in groups:
+        group.package_ids = list(dict.fromkeys(group.package_ids))
+        group.links = list(dict.fromkeys(group.links))
+    return groups
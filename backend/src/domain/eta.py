@@ -0,0 +1,127 @@
+"""Smoothed download ETAs from an exponentially weighted moving average of link speeds."""
+import math
+from collections.abc import Sequence
+
+from src.domain.store import NO_ETA, PackageStore
+
+# Smoothed speeds below this (bytes/s) count as idle and are forgotten
+MIN_SPEED = 1.0
+
+
+class SpeedAverages:
+    """
+    Time-weighted EWMA of speeds keyed by uuid, across refreshes.
+
+    Only keys that are or recently were moving carry state. A key whose reported speed
+    has stayed 0 for `idle_timeout` seconds is forgotten, so a stalled download loses its
+    ETA instead of showing one that grows for as long as the average takes to decay.
+    """
+
+    def __init__(self, half_life: float = 30.0, idle_timeout: float = 60.0):
+        self.half_life = half_life
+        self.idle_timeout = idle_timeout
+        self.speeds: dict[str, float] = {}
+        # key -> time its reported speed dropped to 0
+        self._idle_since: dict[str, float] = {}
+        self._updated_at: float | None = None
+
+    def reset(self) -> None:
+        self.speeds.clear()
+        self._idle_since.clear()
+        self._updated_at = None
+
+    def _alpha(self, t: float) -> float:
+        if self._updated_at is None or self.half_life <= 0:
+            return 1.0
+        dt = max(0.0, t - self._updated_at)
+        return 1.0 - 0.5 ** (dt / self.half_life)
+
+    def advance(self, keys: Sequence[str], speeds: Sequence[int], t: float) -> list[float]:
+        """Advance the averages to `speeds` (taken at time `t`); returns the smoothed speed per position."""
+        alpha = self._alpha(t)
+        previous, idle_since = self.speeds, self._idle_since
+        current: dict[str, float] = {}
+        idle: dict[str, float] = {}
+        smoothed = [0.0] * len(keys)
+        for i, (key, speed) in enumerate(zip(keys, speeds)):
+            ewma = previous.get(key)
+            if ewma is None:
+                if not speed:
+                    continue
+                # First sighting: nothing to smooth against yet
+                ewma = float(speed)
+            else:
+                ewma += alpha * (speed - ewma)
+                if not speed:
+                    since = idle_since.get(key, t)
+                    if t - since >= self.idle_timeout:
+                        continue
+                    idle[key] = since
+            if ewma >= MIN_SPEED:
+                current[key] = smoothed[i] = ewma
+        self.speeds, self._idle_since = current, idle
+        self._updated_at = t
+        return smoothed
+
+
+class EtaEstimator:
+    """
+    Keeps a time-weighted EWMA of every downloading link's speed across refreshes.
+
+    With `half_life` seconds, a change in speed is half reflected after that time no matter
+    how often snapshots arrive, so ETAs stop jumping with momentary speed. Package speed is
+    the sum of its links' smoothed speeds; the queue ETA is the remaining bytes of all
+    downloading packages over their combined smoothed speed. Package-level views, which
+    have no link rows, smooth the package speeds JD reports instead.
+    """
+
+    def __init__(self, half_life: float = 30.0, idle_timeout: float = 60.0):
+        self.half_life = half_life
+        self._links = SpeedAverages(half_life, idle_timeout)
+        self._packages = SpeedAverages(half_life, idle_timeout)
+
+    def reset(self) -> None:
+        self._links.reset()
+        self._packages.reset()
+
+    @property
+    def active(self) -> bool:
+        """Whether any link has a smoothed speed (and so an ETA that changes with time alone)."""
+        return bool(self._links.speeds)
+
+    def update(self, store: PackageStore, t: float) -> None:
+        """
+        Advance the averages to the speeds in `store` (taken at time `t`) and write the
+        smoothed link, package and queue ETAs into it. Only links that are or were
+        downloading carry state; idle links cost a dict lookup and get no ETA.
+        """
+        smoothed = self._links.advance(store.uuid, store.speed, t)
+        package_speeds = [0.0] * len(store)
+        for p in range(len(store)):
+            start, end = store.link_range(p)
+            for i in range(start, end):
+                if smoothed[i]:
+                    package_speeds[p] += smoothed[i]
+                    remaining = max(0, store.bytes_total[i] - store.bytes_loaded[i])
+                    store.eta[i] = math.ceil(remaining / smoothed[i])
+                else:
+                    store.eta[i] = NO_ETA
+        self._write_package_etas(store, package_speeds)
+
+    def update_packages(self, store: PackageStore, t: float) -> None:
+        """Like update(), for a package-level view: package and queue ETAs from the package speeds."""
+        self._write_package_etas(store, self._packages.advance(store.pkg_uuid, store.pkg_speed, t))
+
+    @staticmethod
+    def _write_package_etas(store: PackageStore, package_speeds: list[float]) -> None:
+        queue_remaining = 0
+        queue_speed = 0.0
+        for p, package_speed in enumerate(package_speeds):
+            remaining = max(0, store.pkg_total_bytes[p] - store.pkg_loaded_bytes[p])
+            if package_speed and remaining:
+                store.pkg_eta[p] = math.ceil(remaining / package_speed)
+                queue_remaining += remaining
+                queue_speed += package_speed
+            else:
+                store.pkg_eta[p] = NO_ETA
+        store.queue_eta = math.ceil(queue_remaining / queue_speed) if queue_speed else None
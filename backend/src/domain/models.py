@@ -32,6 +32,7 @@ class Package(BaseModel):
     child_count: int = 0
     speed: int = 0  # Aggregated speed from all links (bytes per second)
     status_text: str | None = None # Raw status text from JD API
+    eta: int | None = None # seconds, from the server-side smoothed speed
 
 class User(BaseModel):
     username: str
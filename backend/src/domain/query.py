@@ -0,0 +1,158 @@
+import heapq
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.domain.models import DownloadStatus
+from src.domain.store import NO_ETA, STATUS_CODES, PackageStore
+
+# Below this share of the (filtered) list, a top-N heap is used instead of a full sort
+TOP_N_RATIO = 0.125
+
+
+def _speeds(store: PackageStore) -> list[int]:
+    return [store.package_speed(i) for i in range(len(store))]
+
+
+def _remaining(store: PackageStore) -> list[int]:
+    return [max(0, total - loaded) for total, loaded in zip(store.pkg_total_bytes, store.pkg_loaded_bytes)]
+
+
+def _progress(store: PackageStore) -> list[float]:
+    return [loaded / total if total else 0.0 for total, loaded in zip(store.pkg_total_bytes, store.pkg_loaded_bytes)]
+
+
+def _eta(store: PackageStore) -> list[float | None]:
+    # The smoothed estimate where there is one, else remaining bytes at the current speed; idle packages have none
+    return [
+        eta if eta != NO_ETA else remaining / speed if speed > 0 and remaining > 0 else None
+        for eta, remaining, speed in zip(store.pkg_eta, _remaining(store), _speeds(store))
+    ]
+
+
+# sort key -> per-package sort values (None = unknown, always sorted last)
+SORT_KEYS: dict[str, Callable[[PackageStore], list]] = {
+    "name": lambda store: [name.casefold() for name in store.pkg_name],
+    "size": lambda store: list(store.pkg_total_bytes),
+    "loaded": lambda store: list(store.pkg_loaded_bytes),
+    "remaining": _remaining,
+    "progress": _progress,
+    "speed": _speeds,
+    "eta": _eta,
+    "links": lambda store: list(store.pkg_child_count),
+}
+
+
+@dataclass(frozen=True)
+class PackageQuery:
+    """
+    Paging, sorting and filtering of one package list.
+
+    `sort` is a SORT_KEYS name; filters are combined with AND. `statuses` and `host`
+    match packages that have at least one link with that status / on that host.
+    """
+    offset: int = 0
+    limit: int | None = None
+    sort: str | None = None
+    descending: bool = False
+    statuses: frozenset[str] | None = None
+    host: str | None = None
+    name: str | None = None
+    min_size: int | None = None
+    max_size: int | None = None
+
+    @property
+    def key(self) -> tuple:
+        """Hashable identity of the query (for ETags and result caches)."""
+        return (
+            self.offset, self.limit, self.sort, self.descending,
+            tuple(sorted(self.statuses)) if self.statuses is not None else None,
+            self.host, self.name, self.min_size, self.max_size,
+        )
+
+    @property
+    def needs_links(self) -> bool:
+        """True if the query reads link rows (a package-level view cannot answer it)."""
+        return self.statuses is not None or self.host is not None
+
+    def _predicate(self, store: PackageStore) -> Callable[[int], bool] | None:
+        checks = []
+        if self.name is not None:
+            needle = self.name.casefold()
+            checks.append(lambda i: needle in store.pkg_name[i].casefold())
+        if self.min_size is not None:
+            checks.append(lambda i: store.pkg_total_bytes[i] >= self.min_size)
+        if self.max_size is not None:
+            checks.append(lambda i: store.pkg_total_bytes[i] <= self.max_size)
+        if self.statuses is not None:
+            codes = {STATUS_CODES[DownloadStatus(s)] for s in self.statuses}
+            checks.append(lambda i: any(c in codes for c in store.status[slice(*store.link_range(i))]))
+        if self.host is not None:
+            host_id = store.pool.find(self.host.lower())
+            checks.append(lambda i: host_id is not None and host_id in store.host[slice(*store.link_range(i))])
+        if not checks:
+            return None
+        return lambda i: all(check(i) for check in checks)
+
+    def select(self, store: PackageStore, cache: dict) -> tuple[list[int], int]:
+        """
+        Return (package indices of the requested page, number of packages matching the filters).
+
+        `cache` belongs to the snapshot holding `store`: sort values and full sort orders are
+        computed at most once per snapshot. Small pages of an unsorted-yet key use a top-N heap.
+        """
+        predicate = self._predicate(store)
+        candidates = range(len(store)) if predicate is None else [i for i in range(len(store)) if predicate(i)]
+        total = len(candidates)
+        end = total if self.limit is None else min(total, self.offset + self.limit)
+        if self.offset >= end:
+            return [], total
+        if self.sort is None:
+            return list(candidates[self.offset:end]), total
+
+        order = cache.get(("order", self.sort, self.descending))
+        if order is None:
+            values = sort_values(store, self.sort, cache)
+            key = _sort_key(values, self.descending)
+            if end < total * TOP_N_RATIO:
+                # Equivalent to sorted(...)[:end], in O(n log end)
+                pick = heapq.nlargest if self.descending else heapq.nsmallest
+                return pick(end, candidates, key=key)[self.offset:end], total
+            order = sort_order(store, self.sort, self.descending, cache)
+
+        if predicate is None:
+            return order[self.offset:end], total
+        page = []
+        seen = 0
+        for i in order:
+            if predicate(i):
+                if seen >= self.offset:
+                    page.append(i)
+                    if len(page) == end - self.offset:
+                        break
+                seen += 1
+        return page, total
+
+
+def _sort_key(values: list, descending: bool) -> Callable[[int], tuple]:
+    # Unknown values sort last in both directions
+    if descending:
+        return lambda i: (values[i] is not None, values[i] if values[i] is not None else 0)
+    return lambda i: (values[i] is None, values[i] if values[i] is not None else 0)
+
+
+def sort_values(store: PackageStore, sort: str, cache: dict) -> list:
+    values = cache.get(("values", sort))
+    if values is None:
+        values = cache[("values", sort)] = SORT_KEYS[sort](store)
+    return values
+
+
+def sort_order(store: PackageStore, sort: str, descending: bool, cache: dict) -> list[int]:
+    """Full, stable sort order of all packages by `sort`, cached per snapshot."""
+    order = cache.get(("order", sort, descending))
+    if order is None:
+        values = sort_values(store, sort, cache)
+        order = cache[("order", sort, descending)] = sorted(
+            range(len(store)), key=_sort_key(values, descending), reverse=descending,
+        )
+    return order
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import itertools
+import time
+from dataclasses import dataclass, field
+
+from src.core.fastjson import dumps
+from src.domain.models import Package
+from src.domain.query import PackageQuery, sort_order
+from src.domain.stats import compute_stats
+from src.domain.store import PackageStore
+
+# Package lists exposed by JDownloader
+DOWNLOADS = "downloads"
+LINKGRABBER = "linkgrabber"
+LIST_KINDS = (DOWNLOADS, LINKGRABBER)
+
+# Distinct query pages kept encoded per snapshot (polling clients repeat the same few queries)
+MAX_CACHED_PAGES = 32
+
+# Cached encodings are keyed by "all", "stats" or a (fields, include_links) projection
+EncodingKey = str | tuple[tuple[str, ...] | None, bool]
+
+# Process-wide, monotonically increasing snapshot version
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A consistent view of one package list, built from a single package/link fan-out."""
+    kind: str
+    store: PackageStore
+    # False for package-level views built without querying links
+    include_links: bool = True
+    version: int = field(default_factory=lambda: next(_versions))
+    taken_at: float = field(default_factory=time.time)
+    _encoded: dict[EncodingKey, bytes] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Sort values/orders computed for PackageQuery, and a few encoded query pages
+    _query_cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _pages: dict[tuple, tuple[bytes, int]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @property
+    def tag(self) -> str:
+        return f"{self.kind}:{self.version}"
+
+    @property
+    def packages(self) -> list[Package]:
+        """All packages as pydantic models (built on every access, prefer the store for partial reads)."""
+        return self.store.to_packages()
+
+    def encoded(self, fields: tuple[str, ...] | None = None, include_links: bool = True) -> bytes:
+        """
+        The package list as JSON bytes, encoded once per snapshot and projection and then reused.
+
+        `fields` selects the package keys to return; links are only encoded if requested and present.
+        """
+        include_links = include_links and self.include_links
+        key: EncodingKey = "all" if fields is None and include_links else (fields, include_links)
+        data = self._encoded.get(key)
+        if data is None:
+            data = self._encoded[key] = dumps(self.store.to_dicts(include_links=include_links, fields=fields))
+        return data
+
+    def query(
+        self, query: PackageQuery, fields: tuple[str, ...] | None = None, include_links: bool = True,
+    ) -> tuple[bytes, int]:
+        """One page of the list as JSON bytes, plus the number of packages matching the filters."""
+        include_links = include_links and self.include_links
+        key = (query.key, fields, include_links)
+        cached = self._pages.get(key)
+        if cached is None:
+            indices, total = query.select(self.store, self._query_cache)
+            cached = (dumps(self.store.to_dicts(indices, include_links=include_links, fields=fields)), total)
+            if len(self._pages) < MAX_CACHED_PAGES:
+                self._pages[key] = cached
+        return cached
+
+    def stats(self) -> dict:
+        """Rollups of the list (see compute_stats), computed once per snapshot."""
+        data = self._query_cache.get("stats")
+        if data is None:
+            data = self._query_cache["stats"] = compute_stats(self.store)
+        return data
+
+    def encoded_stats(self) -> bytes:
+        data = self._encoded.get("stats")
+        if data is None:
+            data = self._encoded["stats"] = dumps(self.stats())
+        return data
+
+    def warm(self, previous: Snapshot) -> None:
+        """Precompute the sort orders that were used on the previous snapshot of this list."""
+        for entry in list(previous._query_cache):
+            if isinstance(entry, tuple) and entry[0] == "order":
+                sort_order(self.store, entry[1], entry[2], self._query_cache)
+
+    @classmethod
+    def from_packages(cls, kind: str, packages: list[Package], include_links: bool = True) -> Snapshot:
+        return cls(kind=kind, store=PackageStore.from_packages(packages), include_links=include_links)
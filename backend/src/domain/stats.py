@@ -0,0 +1,82 @@
+"""Aggregated statistics (rollups) of a package list, computed in one pass over the link columns."""
+from __future__ import annotations
+
+from src.domain.store import NO_ETA, STATUS_VALUES, PackageStore
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment (optional 'speedups' extra)
+    np = None
+
+# Figures of every rollup group, in output order
+METRICS = ("links", "active_links", "bytes_total", "bytes_loaded", "bytes_remaining", "speed")
+
+
+def _rollup_numpy(store: PackageStore) -> tuple[list, dict, dict, list]:
+    def column(values) -> np.ndarray:
+        return np.frombuffer(values, dtype=f"i{values.itemsize}").astype(np.int64)
+
+    if not store.link_count:
+        return _rollup_python(store)
+    bytes_total = column(store.bytes_total)
+    bytes_loaded = column(store.bytes_loaded)
+    speed = column(store.speed)
+    values = (
+        np.ones_like(speed), (speed > 0).astype(np.int64),
+        bytes_total, bytes_loaded, np.maximum(bytes_total - bytes_loaded, 0), speed,
+    )
+
+    def by(keys: np.ndarray, size: int) -> list[tuple]:
+        # Weighted bincounts are float64: exact for sums below 2**53 (8 PiB)
+        sums = [np.bincount(keys, weights=v, minlength=size).round().astype(np.int64).tolist() for v in values]
+        return list(zip(*sums))
+
+    totals = [int(v.sum()) for v in values]
+    by_status = by(column(store.status), len(STATUS_VALUES))
+    host_ids, host_keys = np.unique(column(store.host), return_inverse=True)
+    by_host = by(host_keys.reshape(-1), len(host_ids))
+    by_package = by(column(store.package), len(store))
+    return totals, dict(enumerate(by_status)), dict(zip(host_ids.tolist(), by_host)), by_package
+
+
+def _rollup_python(store: PackageStore) -> tuple[list, dict, dict, list]:
+    size = len(METRICS)
+    totals = [0] * size
+    by_status: dict[int, list[int]] = {}
+    by_host: dict[int, list[int]] = {}
+    by_package = [[0] * size for _ in range(len(store))]
+    for status, host, package, total, loaded, speed in zip(
+        store.status, store.host, store.package, store.bytes_total, store.bytes_loaded, store.speed,
+    ):
+        row = (1, 1 if speed > 0 else 0, total, loaded, max(0, total - loaded), speed)
+        for acc in (totals, by_status.setdefault(status, [0] * size),
+                    by_host.setdefault(host, [0] * size), by_package[package]):
+            for k in range(size):
+                acc[k] += row[k]
+    return totals, by_status, by_host, by_package
+
+
+def compute_stats(store: PackageStore) -> dict:
+    """
+    Global, per-status, per-host and per-package rollups of links, bytes and throughput.
+
+    Uses numpy group-by sums over the array columns when numpy is installed, otherwise a
+    single Python pass; both produce the same result.
+    """
+    totals, by_status, by_host, by_package = (_rollup_numpy if np is not None else _rollup_python)(store)
+    pool = store.pool
+    return {
+        "totals": {"packages": len(store), **dict(zip(METRICS, totals)), "eta": store.queue_eta},
+        "by_status": {STATUS_VALUES[code]: dict(zip(METRICS, g)) for code, g in sorted(by_status.items()) if g[0]},
+        "by_host": {
+            (pool.get(host_id) or ""): dict(zip(METRICS, g))
+            for host_id, g in sorted(by_host.items(), key=lambda item: -item[1][2]) if g[0]
+        },
+        "by_package": [
+            {
+                "uuid": store.pkg_uuid[i], "name": store.pkg_name[i], **dict(zip(METRICS, g)),
+                "eta": None if store.pkg_eta[i] == NO_ETA else store.pkg_eta[i],
+            }
+            for i, g in enumerate(by_package)
+        ],
+    }
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import copy
+from array import array
+from collections.abc import Iterable
+
+from src.domain.models import DownloadStatus, Link, Package
+
+STATUSES = list(DownloadStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+STATUS_VALUES = [status.value for status in STATUSES]
+
+NO_ETA = -1
+NO_STRING = -1
+
+# Top-level keys of a package dict, i.e. what a `fields=` projection may select
+PACKAGE_FIELDS = tuple(Package.model_fields)
+
+
+class StringPool:
+    """Interns repeated strings (hosts, names, urls, save paths) as small integer ids."""
+
+    def __init__(self):
+        self.strings: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def intern(self, value: str | None) -> int:
+        if value is None:
+            return NO_STRING
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(value)
+            self._ids[value] = sid
+        return sid
+
+    def find(self, value: str) -> int | None:
+        """Id of an already interned string, without interning it."""
+        return self._ids.get(value)
+
+    def get(self, sid: int) -> str | None:
+        return None if sid == NO_STRING else self.strings[sid]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class PackageStore:
+    """
+    Array-backed representation of one package list.
+
+    Links are stored in fixed columns (one array per field) and grouped contiguously by
+    package, so package i owns links link_start[i] .. link_start[i + 1]. Pydantic models
+    are only built at the API boundary, for the rows that are actually returned.
+    """
+
+    def __init__(self, pool: StringPool | None = None):
+        # Delta refreshes share the previous store's pool so unchanged link slices can be copied as-is
+        self.pool = pool if pool is not None else StringPool()
+
+        # Package columns
+        self.pkg_uuid: list[str] = []
+        self.pkg_name: list[str] = []
+        self.pkg_save_to = array("l")
+        self.pkg_total_bytes = array("q")
+        self.pkg_loaded_bytes = array("q")
+        self.pkg_child_count = array("l")
+        self.pkg_status_text = array("l")
+        # JD's aggregate speed, used for packages stored without links (package-level views)
+        self.pkg_speed = array("q")
+        # Smoothed estimates filled in by the ETA estimator (NO_ETA until then)
+        self.pkg_eta = array("q")
+        self.queue_eta: int | None = None
+        self.link_start = array("q")
+
+        # Link columns
+        self.uuid: list[str] = []
+        self.package = array("l")
+        self.name = array("l")
+        self.url = array("l")
+        self.host = array("l")
+        self.bytes_total = array("q")
+        self.bytes_loaded = array("q")
+        self.speed = array("q")
+        self.eta = array("q")
+        self.status = array("b")
+
+        self._index: dict[str, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.pkg_uuid)
+
+    @property
+    def link_count(self) -> int:
+        return len(self.uuid)
+
+    def copy_etas(self) -> PackageStore:
+        """
+        A store sharing this one's rows but with its own ETA columns, so estimates can be
+        rewritten without touching a store that is already published.
+        """
+        store = copy.copy(self)
+        store.eta = array("q", self.eta)
+        store.pkg_eta = array("q", self.pkg_eta)
+        return store
+
+    def same_etas(self, other: PackageStore) -> bool:
+        return self.eta == other.eta and self.pkg_eta == other.pkg_eta and self.queue_eta == other.queue_eta
+
+    def add_package(
+        self,
+        uuid: str,
+        name: str,
+        save_to: str | None = "/downloads",
+        total_bytes: int = 0,
+        loaded_bytes: int = 0,
+        child_count: int = 0,
+        status_text: str | None = None,
+        speed: int = 0,
+    ) -> int:
+        """Append a package; links added afterwards belong to it until the next package."""
+        self.pkg_uuid.append(uuid)
+        self.pkg_name.append(name)
+        self.pkg_save_to.append(self.pool.intern(save_to))
+        self.pkg_total_bytes.append(total_bytes)
+        self.pkg_loaded_bytes.append(loaded_bytes)
+        self.pkg_child_count.append(child_count)
+        self.pkg_status_text.append(self.pool.intern(status_text))
+        self.pkg_speed.append(speed)
+        self.pkg_eta.append(NO_ETA)
+        self.link_start.append(len(self.uuid))
+        self._index = None
+        return len(self.pkg_uuid) - 1
+
+    def add_link(
+        self,
+        uuid: str,
+        name: str,
+        url: str,
+        host: str,
+        bytes_total: int = 0,
+        bytes_loaded: int = 0,
+        status: DownloadStatus = DownloadStatus.STOPPED,
+        speed: int = 0,
+        eta: int | None = None,
+    ) -> None:
+        intern = self.pool.intern
+        self.uuid.append(uuid)
+        self.package.append(len(self.pkg_uuid) - 1)
+        self.name.append(intern(name))
+        self.url.append(intern(url))
+        self.host.append(intern(host))
+        self.bytes_total.append(bytes_total)
+        self.bytes_loaded.append(bytes_loaded)
+        self.status.append(STATUS_CODES[status])
+        self.speed.append(speed)
+        self.eta.append(NO_ETA if eta is None else eta)
+
+    def copy_links(self, source: PackageStore, package: int) -> None:
+        """Append the links of `package` in `source` to the current package (pools must be shared)."""
+        start, end = source.link_range(package)
+        if start == end:
+            return
+        self.uuid.extend(source.uuid[start:end])
+        self.package.extend(array("l", [len(self.pkg_uuid) - 1]) * (end - start))
+        for column in ("name", "url", "host", "bytes_total", "bytes_loaded", "status", "speed", "eta"):
+            getattr(self, column).extend(getattr(source, column)[start:end])
+
+    def link_range(self, package: int) -> tuple[int, int]:
+        start = self.link_start[package]
+        end = self.link_start[package + 1] if package + 1 < len(self.link_start) else len(self.uuid)
+        return start, end
+
+    def index_of(self, uuid: str) -> int | None:
+        if self._index is None:
+            self._index = {u: i for i, u in enumerate(self.pkg_uuid)}
+        return self._index.get(uuid)
+
+    def package_speed(self, package: int) -> int:
+        start, end = self.link_range(package)
+        return sum(self.speed[start:end]) if end > start else self.pkg_speed[package]
+
+    def to_link(self, i: int) -> Link:
+        pool = self.pool
+        eta = self.eta[i]
+        return Link.model_construct(
+            uuid=self.uuid[i],
+            name=pool.get(self.name[i]),
+            url=pool.get(self.url[i]),
+            host=pool.get(self.host[i]),
+            bytes_total=self.bytes_total[i],
+            bytes_loaded=self.bytes_loaded[i],
+            status=STATUSES[self.status[i]],
+            speed=self.speed[i],
+            eta=None if eta == NO_ETA else eta,
+        )
+
+    def to_package(self, i: int, include_links: bool = True) -> Package:
+        start, end = self.link_range(i)
+        return Package.model_construct(
+            uuid=self.pkg_uuid[i],
+            name=self.pkg_name[i],
+            save_to=self.pool.get(self.pkg_save_to[i]),
+            links=[self.to_link(j) for j in range(start, end)] if include_links else [],
+            total_bytes=self.pkg_total_bytes[i],
+            loaded_bytes=self.pkg_loaded_bytes[i],
+            child_count=self.pkg_child_count[i],
+            speed=sum(self.speed[start:end]) if end > start else self.pkg_speed[i],
+            status_text=self.pool.get(self.pkg_status_text[i]),
+            eta=None if self.pkg_eta[i] == NO_ETA else self.pkg_eta[i],
+        )
+
+    def link_dict(self, i: int) -> dict:
+        """Plain JSON-ready dict of a link (same shape as Link.model_dump(mode="json"))."""
+        pool = self.pool
+        eta = self.eta[i]
+        return {
+            "uuid": self.uuid[i],
+            "name": pool.get(self.name[i]),
+            "url": pool.get(self.url[i]),
+            "host": pool.get(self.host[i]),
+            "bytes_total": self.bytes_total[i],
+            "bytes_loaded": self.bytes_loaded[i],
+            "status": STATUS_VALUES[self.status[i]],
+            "speed": self.speed[i],
+            "eta": None if eta == NO_ETA else eta,
+        }
+
+    def link_dicts(self, start: int, end: int) -> list[dict]:
+        """link_dict() for a contiguous range, zipped over column slices for speed."""
+        strings = self.pool.strings
+        return [
+            {
+                "uuid": uuid,
+                "name": None if name == NO_STRING else strings[name],
+                "url": None if url == NO_STRING else strings[url],
+                "host": None if host == NO_STRING else strings[host],
+                "bytes_total": bytes_total,
+                "bytes_loaded": bytes_loaded,
+                "status": STATUS_VALUES[status],
+                "speed": speed,
+                "eta": None if eta == NO_ETA else eta,
+            }
+            for uuid, name, url, host, bytes_total, bytes_loaded, status, speed, eta in zip(
+                self.uuid[start:end], self.name[start:end], self.url[start:end], self.host[start:end],
+                self.bytes_total[start:end], self.bytes_loaded[start:end], self.status[start:end],
+                self.speed[start:end], self.eta[start:end],
+            )
+        ]
+
+    def package_dict(self, i: int, include_links: bool = True) -> dict:
+        """Plain JSON-ready dict of a package (same shape as Package.model_dump(mode="json"))."""
+        start, end = self.link_range(i)
+        return {
+            "uuid": self.pkg_uuid[i],
+            "name": self.pkg_name[i],
+            "save_to": self.pool.get(self.pkg_save_to[i]),
+            "links": self.link_dicts(start, end) if include_links else [],
+            "total_bytes": self.pkg_total_bytes[i],
+            "loaded_bytes": self.pkg_loaded_bytes[i],
+            "child_count": self.pkg_child_count[i],
+            "speed": sum(self.speed[start:end]) if end > start else self.pkg_speed[i],
+            "status_text": self.pool.get(self.pkg_status_text[i]),
+            "eta": None if self.pkg_eta[i] == NO_ETA else self.pkg_eta[i],
+        }
+
+    def to_dicts(
+        self,
+        indices: Iterable[int] | None = None,
+        include_links: bool = True,
+        fields: Iterable[str] | None = None,
+    ) -> list[dict]:
+        """Package dicts, optionally projected onto `fields` (a subset of PACKAGE_FIELDS)."""
+        if indices is None:
+            indices = range(len(self))
+        if fields is None:
+            return [self.package_dict(i, include_links) for i in indices]
+        fields = tuple(fields)
+        include_links = include_links and "links" in fields
+        return [{k: d[k] for k in fields} for d in (self.package_dict(i, include_links) for i in indices)]
+
+    def to_packages(self, indices: Iterable[int] | None = None, include_links: bool = True) -> list[Package]:
+        if indices is None:
+            indices = range(len(self))
+        return [self.to_package(i, include_links) for i in indices]
+
+    @classmethod
+    def from_packages(cls, packages: Iterable[Package]) -> PackageStore:
+        store = cls()
+        for p in packages:
+            store.add_package(
+                p.uuid, p.name, p.save_to, p.total_bytes, p.loaded_bytes, p.child_count, p.status_text, p.speed,
+            )
+            for link in p.links:
+                store.add_link(
+                    link.uuid, link.name, link.url, link.host, link.bytes_total, link.bytes_loaded,
+                    link.status, link.speed, link.eta,
+                )
+        return store
@@ -0,0 +1,129 @@
+"""Fixed-memory throughput history: tiered ring buffers with RRD-style consolidation."""
+from array import array
+from collections import OrderedDict
+
+# (step seconds, slots): 1 hour at 10 s, 1 day at 1 min, 1 week at 15 min
+DEFAULT_TIERS = ((10, 360), (60, 1440), (900, 672))
+
+
+class Tier:
+    """
+    One resolution of a series: `slots` buckets of `step` seconds in a ring.
+
+    Samples falling into the same bucket are consolidated: speed is averaged, bytes_loaded
+    keeps the last value. A slot is reused once its bucket is `slots` steps old.
+    """
+
+    def __init__(self, step: int, slots: int):
+        self.step = step
+        self.slots = slots
+        self.bucket = array("q", [-1]) * slots
+        self.speed_sum = array("d", [0.0]) * slots
+        self.samples = array("H", [0]) * slots
+        self.loaded = array("q", [0]) * slots
+
+    def record(self, t: float, speed: int, loaded: int) -> None:
+        bucket = int(t // self.step)
+        i = bucket % self.slots
+        if self.bucket[i] != bucket:
+            self.bucket[i] = bucket
+            self.speed_sum[i] = 0.0
+            self.samples[i] = 0
+        if self.samples[i] < 0xFFFF:
+            self.speed_sum[i] += speed
+            self.samples[i] += 1
+        self.loaded[i] = loaded
+
+    @property
+    def span(self) -> int:
+        return self.step * self.slots
+
+    def points(self, since: float, until: float) -> list[list]:
+        """[bucket start, average speed, last bytes_loaded] for the filled buckets in [since, until]."""
+        first, last = int(since // self.step), int(until // self.step)
+        points = []
+        for bucket in range(max(first, last - self.slots + 1), last + 1):
+            i = bucket % self.slots
+            if self.bucket[i] == bucket and self.samples[i]:
+                points.append([bucket * self.step, round(self.speed_sum[i] / self.samples[i]), self.loaded[i]])
+        return points
+
+
+class Series:
+    def __init__(self, tiers: tuple[tuple[int, int], ...]):
+        self.tiers = [Tier(step, slots) for step, slots in tiers]
+
+    def record(self, t: float, speed: int, loaded: int) -> None:
+        for tier in self.tiers:
+            tier.record(t, speed, loaded)
+
+    def tier_for(self, window: float, resolution: int | None = None) -> Tier:
+        """The finest tier that covers `window` seconds (and is at least `resolution` coarse)."""
+        for tier in self.tiers:
+            if tier.span >= window and (resolution is None or tier.step >= resolution):
+                return tier
+        return self.tiers[-1]
+
+
+class TimeSeriesStore:
+    """
+    Named throughput series ("global", "host:<host>", "package:<uuid>").
+
+    Memory is bounded by `max_series` times the fixed tier sizes; when a new series
+    would exceed the bound, the package series updated least recently is dropped. Host
+    series only go once no package series is left, and the global series is never dropped.
+    """
+
+    def __init__(self, tiers: tuple[tuple[int, int], ...] = DEFAULT_TIERS, max_series: int = 200):
+        self.tiers = tiers
+        self.max_series = max_series
+        self._series: OrderedDict[str, Series] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._series
+
+    def keys(self) -> list[str]:
+        return list(self._series)
+
+    def record(self, t: float, samples: dict[str, tuple[int, int]]) -> None:
+        """Record (speed, bytes_loaded) per series key at time `t`."""
+        for key, (speed, loaded) in samples.items():
+            series = self._series.get(key)
+            if series is None:
+                while len(self._series) >= self.max_series and self._evict():
+                    pass
+                series = self._series[key] = Series(self.tiers)
+            else:
+                self._series.move_to_end(key)
+            series.record(t, speed, loaded)
+
+    def _evict(self) -> bool:
+        """Drop the least recently updated package series (else host series); False if none is left."""
+        victim = next((key for key in self._series if key.startswith("package:")), None)
+        if victim is None:
+            victim = next((key for key in self._series if key != "global"), None)
+        if victim is None:
+            return False
+        del self._series[victim]
+        return True
+
+    def query(self, key: str, since: float, until: float, resolution: int | None = None) -> tuple[int, list[list]]:
+        """Return (step, points) of a series for [since, until]; KeyError if the series is unknown."""
+        series = self._series[key]
+        tier = series.tier_for(until - since, resolution)
+        return tier.step, tier.points(since, until)
+
+
+def samples_from_stats(stats: dict) -> dict[str, tuple[int, int]]:
+    """
+    History samples from a /stats rollup: the global totals, every host and the packages
+    that are currently downloading (idle packages just leave a gap).
+    """
+    samples = {
+        f"package:{package['uuid']}": (package["speed"], package["bytes_loaded"])
+        for package in stats["by_package"] if package["active_links"]
+    }
+    for host, group in stats["by_host"].items():
+        samples[f"host:{host}"] = (group["speed"], group["bytes_loaded"])
+    samples["global"] = (stats["totals"]["speed"], stats["totals"]["bytes_loaded"])
+    return samples
@@ -1,6 +1,40 @@
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
 
 from src.domain.models import Package
+from src.domain.snapshot import DOWNLOADS, Snapshot
+
+
+class AddLinksError(Exception):
+    """
+    Some or all links did not certainly make it into JD.
+
+    `pending` are the links JD did not get (it was unreachable): safe to buffer and send
+    again. `uncertain` are links whose request may have reached JD (e.g. a read timeout or a
+    server error), so they are not sent again; `rejected` are links JD refused.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        pending: list[str],
+        uncertain: Iterable[str] = (),
+        rejected: Iterable[str] = (),
+    ):
+        super().__init__(message)
+        self.pending = pending
+        self.uncertain = list(uncertain)
+        self.rejected = list(rejected)
+
+    def sent(self, links: Iterable[str]) -> list[str]:
+        """The `links` JD got or may have got: neither pending nor rejected."""
+        failed = {*self.pending, *self.rejected}
+        return [link for link in links if link not in failed]
+
+
+def add_failed(result: object) -> bool:
+    """Whether an add result reports an error (as "error: ...") instead of raising one."""
+    return isinstance(result, str) and result.startswith("error")
 
 
 class JDownloaderAPI(ABC):
@@ -14,9 +48,31 @@ class JDownloaderAPI(ABC):
         """Retrieve list of packages from LinkGrabber."""
         pass
 
+    async def get_snapshot(self, kind: str, include_links: bool = True) -> Snapshot:
+        """
+        Retrieve one package list ("downloads" or "linkgrabber") as a versioned snapshot.
+
+        With include_links=False implementations may skip fetching links (package-level views).
+        """
+        if kind == DOWNLOADS:
+            return Snapshot.from_packages(kind, await self.get_packages())
+        return Snapshot.from_packages(kind, await self.get_linkgrabber_packages())
+
+    async def get_linkgrabber_save_to(self, package_ids: list[str]) -> dict[str, str | None] | None:
+        """
+        Download directory of each of `package_ids` that is still in the LinkGrabber (moved or
+        removed packages are absent). None if the implementation has no cheap targeted query.
+        """
+        return None
+
     @abstractmethod
-    async def add_links(self, links: list[str]) -> str:
-        """Add links and return a package/link ID."""
+    async def add_links(
+        self,
+        links: list[str],
+        package_name: str | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> str:
+        """Add links and return a package/link ID. `progress(accepted, total)` reports large adds."""
         pass
 
     @abstractmethod
@@ -30,8 +86,24 @@ class JDownloaderAPI(ABC):
         pass
 
     @abstractmethod
-    async def set_download_directory(self, package_ids: list[str], directory: str) -> None:
-        pass
+    async def set_download_directory(self, package_ids: list[str], directory: str) -> bool:
+        """Set the download directory of LinkGrabber packages; False if JD refused."""
+
+    @abstractmethod
+    async def move_to_dl(self, package_ids: list[str]) -> bool:
+        """Move LinkGrabber packages to the download list; False if JD refused."""
+
+    @abstractmethod
+    async def remove_linkgrabber_packages(self, package_ids: list[str]) -> None:
+        """Remove packages (and their links) from the LinkGrabber."""
+
+    @abstractmethod
+    async def remove_download_packages(self, package_ids: list[str]) -> None:
+        """Remove packages (and their links) from the download list."""
+
+    @abstractmethod
+    async def get_help(self) -> str:
+        """JD's /help text (also a cheap reachability check)."""
 
     @abstractmethod
     async def add_dlc(self, file_content: bytes) -> str:
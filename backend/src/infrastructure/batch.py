@@ -0,0 +1,103 @@
+"""Runs a planned batch of package operations against JD, one call per merged group."""
+from pathlib import Path
+
+from src.core.log import get_logger
+from src.domain.batch import AFFECTED_LISTS, BatchGroup, BatchOperation, plan_batch
+from src.domain.snapshot import DOWNLOADS
+from src.infrastructure.api_interface import JDownloaderAPI, add_failed
+from src.infrastructure.confirm import Confirmation
+from src.infrastructure.link_index import duplicate_index, filter_duplicates
+
+logger = get_logger("api")
+
+
+async def _run_group(
+    api: JDownloaderAPI,
+    group: BatchGroup,
+    directories: set[str],
+    default_directory: str | None,
+    buffer_file: Path | None,
+) -> dict:
+    """
+    Run one merged group; returns what its result reports besides the status: the confirmed
+    steps of directory changes and moves, the number of duplicate links an add dropped.
+    """
+    if group.op == "remove":
+        if group.kind == DOWNLOADS:
+            await api.remove_download_packages(group.package_ids)
+        else:
+            await api.remove_linkgrabber_packages(group.package_ids)
+    elif group.op == "set-directory":
+        # Confirmed before the next group runs, so a following move picks up the new directory
+        confirmation = Confirmation(api, group.package_ids)
+        await confirmation.set_directory(group.directory)
+        if confirmation.rejected("set-directory"):
+            raise RuntimeError("JD rejected the download directory")
+        directories.update(group.package_ids)
+        return {"steps": confirmation.steps}
+    elif group.op == "move":
+        # Like /linkgrabber/move: the default path applies unless this batch set a directory
+        confirmation = Confirmation(api, group.package_ids)
+        pending = [pid for pid in group.package_ids if pid not in directories]
+        if default_directory and pending:
+            await confirmation.set_directory(default_directory, pending)
+        await confirmation.move()
+        if confirmation.rejected("move"):
+            raise RuntimeError("JD rejected the move to the download list")
+        return {"steps": confirmation.steps}
+    elif group.op == "start":
+        await api.start_downloads()
+    elif group.op == "stop":
+        await api.stop_downloads()
+    elif group.op == "add":
+        # Like /downloads/links: links JD or the offline buffer already has are dropped
+        links, duplicates = group.links, []
+        if buffer_file is not None:
+            links, duplicates = await filter_duplicates(api, links, buffer_file, via="batch")
+        if links:
+            if group.package_name:
+                result = await api.add_links(links, package_name=group.package_name)
+            else:
+                result = await api.add_links(links)
+            if add_failed(result):
+                raise RuntimeError(result)
+            duplicate_index.remember(links)
+        return {"duplicates": len(duplicates)}
+    return {}
+
+
+async def run_batch(
+    api: JDownloaderAPI,
+    operations: list[BatchOperation],
+    stop_on_error: bool = True,
+    default_directory: str | None = None,
+    buffer_file: Path | None = None,
+) -> tuple[list[dict], set[str]]:
+    """
+    Execute `operations` in order, merging consecutive compatible ones into single JD calls.
+
+    Returns (one result per operation, lists that were changed). A result holds the
+    operation's index, its `call` (index of the JD call it was merged into) and a status:
+    "ok", "error" (with the message) or "skipped" after an earlier error with stop_on_error.
+    Given the offline `buffer_file`, links JD or the buffer already has are left out of adds.
+    """
+    results: list[dict | None] = [None] * len(operations)
+    changed: set[str] = set()
+    directories: set[str] = set()
+    failed = False
+    for call, group in enumerate(plan_batch(operations)):
+        outcome: dict = {"status": "skipped"}
+        if not (failed and stop_on_error):
+            try:
+                outcome = {"status": "ok", **await _run_group(api, group, directories, default_directory, buffer_file)}
+            except Exception as e:
+                failed = True
+                outcome = {"status": "error", "error": str(e)}
+                logger.warning(
+                    "Batch call failed", op=group.op, operations=len(group.indices), error=str(e), exc_info=True
+                )
+            # A failed call may still have changed something
+            changed.update((group.kind,) if group.op == "remove" else AFFECTED_LISTS[group.op])
+        for index in group.indices:
+            results[index] = {"index": index, "op": group.op, "call": call, **outcome}
+    return results, changed
@@ -0,0 +1,136 @@
+import asyncio
+
+from src.domain.snapshot import LIST_KINDS, Snapshot
+from src.domain.store import PackageStore
+
+# Link columns compared when diffing two stores that share a string pool
+_LINK_COLUMNS = ("name", "url", "host", "bytes_total", "bytes_loaded", "status", "speed", "eta")
+
+
+def _signature(store: PackageStore, i: int) -> tuple:
+    start, end = store.link_range(i)
+    return (
+        store.pkg_name[i], store.pkg_save_to[i], store.pkg_total_bytes[i], store.pkg_loaded_bytes[i],
+        store.pkg_child_count[i], store.pkg_status_text[i], store.pkg_speed[i], store.pkg_eta[i],
+        tuple(store.uuid[start:end]),
+        *(getattr(store, column)[start:end].tobytes() for column in _LINK_COLUMNS),
+    )
+
+
+def diff_snapshots(previous: Snapshot, current: Snapshot) -> tuple[dict[str, dict], list[str], list[str] | None]:
+    """
+    Package-level diff between two snapshots of the same list.
+
+    Returns (upserts: uuid -> package dict, removed uuids, new package order or None if unchanged).
+    Stores sharing a string pool (delta refreshes) are compared on raw column bytes; otherwise
+    the packages' plain dicts are compared.
+    """
+    old, new = previous.store, current.store
+    same_pool = old.pool is new.pool
+    upserts = {}
+    for i, uuid in enumerate(new.pkg_uuid):
+        j = old.index_of(uuid)
+        data = None
+        if j is not None:
+            if same_pool:
+                if _signature(old, j) == _signature(new, i):
+                    continue
+            else:
+                data = new.package_dict(i)
+                if old.package_dict(j) == data:
+                    continue
+        upserts[uuid] = data if data is not None else new.package_dict(i)
+
+    removed = [uuid for uuid in old.pkg_uuid if new.index_of(uuid) is None]
+    order = None if old.pkg_uuid == new.pkg_uuid else list(new.pkg_uuid)
+    return upserts, removed, order
+
+
+class Subscription:
+    """
+    Per-connection mailbox of pending changes.
+
+    Changes are coalesced while the client is busy (later package states replace earlier
+    ones, status keeps only the latest value), so a slow client never builds up a queue.
+    If too many packages are pending, the delta is replaced by a full resync of that list.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        # Snapshot version of each list the client currently has
+        self.versions: dict[str, int] = {}
+        self._deltas: dict[str, dict] = {}
+        self._resync: set[str] = set()
+        self._status: dict | None = None
+        self._wakeup = asyncio.Event()
+
+    def push_delta(self, kind: str, base: int, version: int, upserts: dict[str, dict], removed: list[str], order: list[str] | None) -> None:
+        pending = self._deltas.get(kind)
+        if kind in self._resync:
+            # A full list will be sent anyway
+            pass
+        elif pending is None:
+            self._deltas[kind] = {
+                "base": base, "version": version, "upserts": dict(upserts), "removed": set(removed), "order": order,
+            }
+        elif pending["version"] != base:
+            self.request_resync(kind)
+        else:
+            pending["version"] = version
+            for uuid in removed:
+                pending["upserts"].pop(uuid, None)
+                pending["removed"].add(uuid)
+            for uuid, data in upserts.items():
+                pending["removed"].discard(uuid)
+                pending["upserts"][uuid] = data
+            if order is not None:
+                pending["order"] = order
+        if len(self._deltas.get(kind, {}).get("upserts", ())) > self.max_pending:
+            self.request_resync(kind)
+        self._wakeup.set()
+
+    def push_status(self, status: dict) -> None:
+        self._status = status
+        self._wakeup.set()
+
+    def request_resync(self, kind: str) -> None:
+        self._deltas.pop(kind, None)
+        self._resync.add(kind)
+        self._wakeup.set()
+
+    async def drain(self, timeout: float) -> tuple[set[str], list[dict], dict | None]:
+        """
+        Wait up to `timeout` for changes and take them.
+
+        Returns (lists needing a full resync, package deltas to send, latest status or None).
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except TimeoutError:
+            pass
+        self._wakeup.clear()
+
+        resync, self._resync = self._resync, set()
+        deltas = []
+        for kind in LIST_KINDS:
+            pending = self._deltas.pop(kind, None)
+            if pending is None or kind in resync:
+                continue
+            have = self.versions.get(kind)
+            if pending["version"] <= (have or 0):
+                continue  # already covered by what the client has
+            if pending["base"] != have:
+                resync.add(kind)
+                continue
+            self.versions[kind] = pending["version"]
+            deltas.append({
+                "kind": kind,
+                "base": pending["base"],
+                "version": pending["version"],
+                "upserts": list(pending["upserts"].values()),
+                "removed": sorted(pending["removed"]),
+                "order": pending["order"],
+            })
+
+        status, self._status = self._status, None
+        return resync, deltas, status
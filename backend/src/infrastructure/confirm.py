@@ -0,0 +1,135 @@
+"""Moving LinkGrabber packages to the download list as a sequence of confirmed steps."""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from src.core.config import settings
+from src.core.log import get_logger
+from src.infrastructure.api_interface import JDownloaderAPI
+
+logger = get_logger("api")
+
+# Re-query delays while waiting for JD to reflect a step: short at first, then backing off
+POLL_FIRST_DELAY = 0.02  # seconds
+POLL_MAX_DELAY = 0.5  # seconds
+
+
+async def wait_until(check: Callable[[], Awaitable[bool]], timeout: float, immediate: bool = True) -> bool:
+    """
+    Run `check` until it returns True or `timeout` seconds have passed.
+
+    The first check runs immediately (unless the caller just checked), so a step JD has
+    already applied costs one query and no waiting; only when it hasn't are further checks
+    spaced out with exponential backoff.
+    """
+    deadline = time.monotonic() + timeout
+    delay = POLL_FIRST_DELAY
+    if not immediate:
+        await asyncio.sleep(min(delay, timeout))
+        delay *= 2
+    while True:
+        try:
+            if await check():
+                return True
+        except Exception as e:
+            logger.debug("Confirm check failed", error=str(e), exc_info=True)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+
+def _same_directory(a: str | None, b: str) -> bool:
+    return a is not None and a.rstrip("/\\") == b.rstrip("/\\")
+
+
+class Confirmation:
+    """
+    The steps of one confirmed sequence on a set of LinkGrabber packages, recorded in order
+    as {"step", "ok", "ms"}. Each step that changes JD is followed by a targeted query of
+    just these packages confirming it took effect, so the next step never starts early.
+    Verification is left out when the API has no targeted query (get_linkgrabber_save_to
+    returns None).
+    """
+
+    def __init__(self, api: JDownloaderAPI, package_ids: list[str], timeout: float | None = None):
+        self.api = api
+        self.package_ids = package_ids
+        self.timeout = settings.JD_CONFIRM_TIMEOUT if timeout is None else timeout
+        self.steps: list[dict] = []
+        self._verifiable = True
+
+    def rejected(self, name: str) -> bool:
+        """Whether JD refused the `name` step (as opposed to it not being confirmed in time)."""
+        return any(step["step"] == name and not step["ok"] for step in self.steps)
+
+    def _record(self, name: str, started: float, ok: bool) -> bool:
+        self.steps.append({"step": name, "ok": ok, "ms": round((time.perf_counter() - started) * 1000, 1)})
+        return ok
+
+    async def _verify(self, name: str, package_ids: list[str], applied: Callable[[dict[str, str | None]], bool]) -> bool:
+        if not self._verifiable:
+            return True
+
+        async def check() -> bool:
+            return applied(await self.api.get_linkgrabber_save_to(package_ids))
+
+        started = time.perf_counter()
+        try:
+            current = await self.api.get_linkgrabber_save_to(package_ids)
+        except Exception as e:
+            logger.debug("Confirm check failed", error=str(e), exc_info=True)
+            return self._record(name, started, await wait_until(check, self.timeout, immediate=False))
+        if current is None:
+            self._verifiable = False
+            return True
+        return self._record(name, started, applied(current) or await wait_until(check, self.timeout, immediate=False))
+
+    async def set_directory(self, directory: str, package_ids: list[str] | None = None) -> bool:
+        """Set the download directory of `package_ids` (default: all packages) and confirm it."""
+        package_ids = self.package_ids if package_ids is None else package_ids
+        started = time.perf_counter()
+        if not self._record("set-directory", started, bool(await self.api.set_download_directory(package_ids, directory))):
+            logger.warning("Setting the download directory failed", directory=directory, packages=len(package_ids))
+            return False
+        if not await self._verify("verify-directory", package_ids, lambda current: all(
+            _same_directory(current[pid], directory) for pid in package_ids if pid in current
+        )):
+            logger.warning("Download directory not confirmed", directory=directory, packages=len(package_ids))
+            return False
+        return True
+
+    async def move(self) -> bool:
+        """Move the packages to the download list and confirm they left LinkGrabber."""
+        package_ids = self.package_ids
+        started = time.perf_counter()
+        if not self._record("move", started, bool(await self.api.move_to_dl(package_ids))):
+            logger.warning("Move to download list failed", packages=len(package_ids))
+            return False
+        if not await self._verify("verify-move", package_ids, lambda current: not any(
+            pid in current for pid in package_ids
+        )):
+            logger.warning("Move to download list not confirmed", packages=len(package_ids))
+            return False
+        return True
+
+
+async def confirm_packages(
+    api: JDownloaderAPI,
+    package_ids: list[str],
+    directory: str | None = None,
+    timeout: float | None = None,
+) -> list[dict]:
+    """
+    Optionally set the download `directory` of LinkGrabber packages, then move them to the
+    download list, confirming each step.
+
+    Returns the steps in order as {"step", "ok", "ms"}. A directory that could not be set or
+    confirmed is logged and the move still happens, as before.
+    """
+    confirmation = Confirmation(api, package_ids, timeout)
+    if directory:
+        await confirmation.set_directory(directory)
+    await confirmation.move()
+    return confirmation.steps
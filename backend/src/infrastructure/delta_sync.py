@@ -0,0 +1,59 @@
+from src.core.config import settings
+from src.domain.store import PackageStore
+
+# queryPackages fields whose change means a package's links must be re-queried. The
+# LinkGrabber's online check fills in link sizes (and names) without changing the link
+# count, progress or status; the package total (and often its name) changes with them.
+FINGERPRINT_FIELDS = ("bytesLoaded", "bytesTotal", "childCount", "name", "status", "speed")
+
+
+def fingerprint(pkg_row: dict) -> tuple:
+    return tuple(pkg_row.get(f) for f in FINGERPRINT_FIELDS)
+
+
+class DeltaSyncEngine:
+    """
+    Incremental link sync for one package list.
+
+    Keeps a fingerprint per package (from the cheap queryPackages call) and the last
+    built store, so only packages whose fingerprint changed need a scoped queryLinks;
+    the links of all other packages are carried over from the previous store.
+    Every `full_resync_every` syncs a full link query is planned to correct any drift.
+    """
+
+    def __init__(self, full_resync_every: int = settings.JD_SYNC_FULL_RESYNC_EVERY):
+        self.full_resync_every = full_resync_every
+        self._fingerprints: dict[str, tuple] = {}
+        self._syncs = 0
+        self._pkg_rows: list[dict] | None = None
+        self.store: PackageStore | None = None
+
+    @property
+    def primed(self) -> bool:
+        return self.store is not None
+
+    def reset(self) -> None:
+        self._fingerprints.clear()
+        self._syncs = 0
+        self._pkg_rows = None
+        self.store = None
+
+    def unchanged(self, pkg_rows: list[dict]) -> bool:
+        """True if the package rows are identical to the last committed sync."""
+        return self.primed and pkg_rows == self._pkg_rows
+
+    def plan(self, pkg_rows: list[dict]) -> list[str] | None:
+        """Return the uuids of packages whose links must be re-queried, or None for a full query."""
+        if not self.primed or self._syncs >= self.full_resync_every:
+            return None
+        return [
+            uuid for uuid, fp in ((str(p.get("uuid", "0")), fingerprint(p)) for p in pkg_rows)
+            if self._fingerprints.get(uuid) != fp
+        ]
+
+    def commit(self, pkg_rows: list[dict], store: PackageStore, scope: list[str] | None) -> None:
+        """Record the result of a sync (`scope` = packages whose links were queried, None = all)."""
+        self._syncs = 0 if scope is None else self._syncs + 1
+        self.store = store
+        self._pkg_rows = pkg_rows
+        self._fingerprints = {str(p.get("uuid", "0")): fingerprint(p) for p in pkg_rows}
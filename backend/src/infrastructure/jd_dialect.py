@@ -0,0 +1,105 @@
+"""Per-JD-instance discovery of which endpoint and payload shape ("dialect") each operation accepts."""
+import html
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# Menu entries of JD's /help page: namespaces, then their methods with parameter names
+_NAMESPACE = re.compile(r"<div class='menu-h1'><a [^>]*>Namespace&nbsp;(/[^<]*)</a>")
+_METHOD = re.compile(
+    r"<div class='menu-h3'>.*?<span  style=''>(\w+)</span>"
+    r"<span class='tooltiptext'>Parameter:&nbsp;(\d+)&nbsp;(?:\[([^\]]*)\])?"
+)
+
+
+def parse_help(text: str) -> dict[str, dict[int, tuple[str, ...]]]:
+    """
+    Endpoints listed on JD's /help page: {"/ns/method": {arity: (parameter names)}}.
+
+    Only the menu is read (the method details repeat it). Anything that isn't the HTML
+    documentation page yields an empty dict, i.e. "capabilities unknown".
+    """
+    endpoints: dict[str, dict[int, tuple[str, ...]]] = {}
+    namespace = None
+    for line in text.splitlines():
+        match = _NAMESPACE.search(line)
+        if match:
+            namespace = html.unescape(match.group(1)).rstrip("/")
+            continue
+        match = _METHOD.search(line)
+        if match and namespace is not None:
+            name, arity, params = match.groups()
+            names = tuple(p.strip() for p in html.unescape(params or "").split(",") if p.strip())
+            endpoints.setdefault(f"{namespace}/{name}", {})[int(arity)] = names
+    return endpoints
+
+
+@dataclass(frozen=True)
+class Dialect:
+    """One way to call an operation: the endpoint and how the arguments become the request."""
+    name: str
+    endpoint: str
+    build: Callable[..., dict]  # arguments -> httpx request kwargs (json=..., params=...)
+
+
+class DialectCache:
+    """
+    The dialect that last worked for each operation, for one JD instance and version.
+
+    Known endpoints from /help rule out dialects whose endpoint the instance lacks; the
+    remaining ones are tried in order until one succeeds, which is then used first. The
+    cache is dropped when the JD version changes, JD is restarted or a cached dialect fails.
+    """
+
+    def __init__(self, recheck_interval: float = 300.0):
+        self.recheck_interval = recheck_interval
+        self.version: str | None = None
+        self.endpoints: dict[str, dict[int, tuple[str, ...]]] = {}
+        self._chosen: dict[str, str] = {}
+        self._checked_at: float | None = None
+
+    def reset(self) -> None:
+        """Forget everything (JD restarted): the next call re-reads version and /help."""
+        self.version = None
+        self.endpoints = {}
+        self._chosen.clear()
+        self._checked_at = None
+
+    @property
+    def checked_once(self) -> bool:
+        return self._checked_at is not None
+
+    def needs_check(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._checked_at is None or now - self._checked_at >= self.recheck_interval
+
+    def checked(self, version: str | None, help_text: str | None = None, now: float | None = None) -> None:
+        """Record the instance's version (and /help, when it was fetched for a new version)."""
+        if version != self.version or not self.checked_once:
+            self._chosen.clear()
+            self.endpoints = parse_help(help_text) if help_text else {}
+        self.version = version
+        self._checked_at = time.monotonic() if now is None else now
+
+    def candidates(self, operation: str, dialects: list[Dialect]) -> list[Dialect]:
+        """Dialects to try, in order: the cached one first, then those the instance supports."""
+        chosen = self._chosen.get(operation)
+        for dialect in dialects:
+            if dialect.name == chosen:
+                return [dialect] + [d for d in dialects if d is not dialect and self.supports(d)]
+        supported = [d for d in dialects if self.supports(d)]
+        # A /help page that lists none of them is probably incomplete: try them all
+        return supported or list(dialects)
+
+    def supports(self, dialect: Dialect) -> bool:
+        return not self.endpoints or dialect.endpoint in self.endpoints
+
+    def chosen(self, operation: str) -> str | None:
+        return self._chosen.get(operation)
+
+    def remember(self, operation: str, dialect: Dialect) -> None:
+        self._chosen[operation] = dialect.name
+
+    def forget(self, operation: str) -> None:
+        self._chosen.pop(operation, None)
@@ -0,0 +1,153 @@
+"""Background jobs: long-running operations run off the request and are polled by id."""
+import asyncio
+import itertools
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from src.core import metrics
+from src.core.config import settings
+from src.core.log import get_logger
+
+logger = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Submission order; wall-clock timestamps can tie or step backwards
+_sequence = itertools.count()
+
+
+@dataclass
+class Job:
+    kind: str
+    id: str = field(default_factory=lambda: uuid4().hex)
+    status: str = QUEUED
+    # Progress in the job's own unit (links, buffer entries, ...); total None while unknown
+    done: int = 0
+    total: int | None = None
+    result: Any = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    seq: int = field(default_factory=lambda: next(_sequence), repr=False)
+    _task: asyncio.Task[None] | None = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def report(self, done: int, total: int | None = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs submitted jobs on at most `max_workers` at a time; the rest wait in submission order.
+
+    Finished jobs stay queryable for `retention` seconds, and only the newest `max_finished`
+    of them are kept, so the registry stays bounded however many jobs are submitted.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.JOBS_MAX_CONCURRENT,
+        retention: float = settings.JOBS_RETENTION,
+        max_finished: int = settings.JOBS_MAX_FINISHED,
+    ):
+        self.retention = retention
+        self.max_finished = max_finished
+        self._slots = asyncio.Semaphore(max(1, max_workers))
+        self._jobs: dict[str, Job] = {}
+
+    def submit(self, kind: str, run: Callable[[Job], Awaitable[Any]]) -> Job:
+        """Start `run(job)` in the background; its return value becomes the job's result."""
+        self._prune()
+        job = Job(kind=kind)
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job, run))
+        # Also runs for a job cancelled while still queued, before _run ever started
+        job._task.add_done_callback(lambda task: self._finish(job, task))
+        logger.info("Job submitted", job=job.id, kind=kind)
+        return job
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await run(job)
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            # HTTPException-style errors carry their message in `detail`
+            job.error = str(getattr(e, "detail", None) or e)
+            logger.warning("Job failed", job=job.id, kind=job.kind, error=job.error, exc_info=True)
+
+    def _finish(self, job: Job, task: asyncio.Task[None]) -> None:
+        if task.cancelled():
+            job.status = CANCELLED
+        job.finished_at = time.time()
+        job._task = None
+        metrics.JOBS.labels(job.kind, job.status).inc()
+        logger.info("Job finished", job=job.id, kind=job.kind, status=job.status)
+
+    def get(self, job_id: str) -> Job | None:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        """All known jobs, newest first."""
+        self._prune()
+        return sorted(self._jobs.values(), key=lambda job: job.seq, reverse=True)
+
+    def cancel(self, job_id: str) -> Job | None:
+        """Cancel a queued or running job (a no-op for finished ones)."""
+        job = self._jobs.get(job_id)
+        if job is not None and job._task is not None:
+            job._task.cancel()
+        return job
+
+    async def shutdown(self) -> None:
+        tasks = [job._task for job in self._jobs.values() if job._task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        finished = sorted(
+            ((job.finished_at, job) for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda item: item[0],
+        )
+        excess = len(finished) - self.max_finished
+        for i, (finished_at, job) in enumerate(finished):
+            if i < excess or finished_at < cutoff:
+                del self._jobs[job.id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,113 @@
+import codecs
+import json
+import re
+from typing import Any
+
+# Structural characters / end of string (or escape) inside a string, used to locate the array
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class ArrayStreamDecoder:
+    """
+    Incrementally decode the elements of one top-level array (JD's "data") from a byte stream.
+
+    Once the array is located, each element is parsed on its own with the C-accelerated
+    JSON scanner as soon as its bytes have arrived. Only the unparsed tail of the stream is
+    buffered, so the full body and the full parsed tree are never held at the same time.
+    Elements must be objects or arrays, which is what JD's query endpoints return.
+    """
+
+    def __init__(self, key: str = "data"):
+        self._key = key
+        self._text = ""
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        # State of the scan for the array ("key": [...) at the top level
+        self._depth = 0
+        self._in_string = False
+        self._string_start = -1
+        self._last_string: str | None = None
+        self._in_array = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Consume a chunk and return the elements completed by it."""
+        if self.done:
+            return []
+        text = self._text + self._utf8.decode(chunk)
+        pos = 0 if self._in_array else self._find_array(text)
+        out = []
+
+        if self._in_array:
+            while True:
+                m = _SEPARATORS.match(text, pos)
+                if m is None:
+                    raise ValueError(f"Malformed JSON stream: no separator in '{self._key}' array at {pos}")
+                pos = m.end()
+                if pos >= len(text):
+                    break
+                if text[pos] == "]":
+                    self.done = True
+                    break
+                if text[pos] not in "{[":
+                    # Not the start of an element: waiting for more bytes would never help
+                    raise ValueError(f"Malformed JSON stream: unexpected {text[pos]!r} in '{self._key}' array")
+                try:
+                    element, pos = self._json.raw_decode(text, pos)
+                except json.JSONDecodeError:
+                    # Element not complete yet
+                    break
+                out.append(element)
+
+        self._text = "" if self.done else text[pos:]
+        return out
+
+    def close(self) -> None:
+        """Call at end of stream; a missing array simply yields no elements."""
+        if self._in_array and not self.done:
+            raise ValueError(f"Incomplete JSON stream: '{self._key}' array not terminated")
+
+    def _find_array(self, text: str) -> int:
+        """Scan for the top-level key's array; return the position to continue from."""
+        pos = 0
+        while True:
+            if self._in_string:
+                m = _STRING_END.search(text, pos)
+                if m is None:
+                    break
+                if m.group() == "\\":
+                    if m.end() >= len(text):
+                        break
+                    pos = m.end() + 1
+                    continue
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_string = text[self._string_start:m.start()]
+                pos = m.end()
+                continue
+
+            m = _STRUCTURAL.search(text, pos)
+            if m is None:
+                pos = len(text)
+                break
+            c = m.group()
+            pos = m.end()
+            if c == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif c == "[" and self._depth == 1 and self._last_string == self._key:
+                self._in_array = True
+                return pos
+            elif c in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+
+        # Keep a partially received top-level string (it may be the key)
+        if self._in_string:
+            keep = min(pos, self._string_start)
+            self._string_start -= keep
+            return keep
+        return pos
@@ -0,0 +1,219 @@
+"""Duplicate-link detection: normalized URLs already in JD or waiting in the offline buffer."""
+import asyncio
+import json
+import time
+from collections import Counter
+from collections.abc import Iterable
+from hashlib import blake2b
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.core import metrics
+from src.core.config import settings
+from src.core.log import get_logger
+from src.domain.snapshot import LIST_KINDS, Snapshot
+from src.domain.store import NO_STRING
+from src.infrastructure.api_interface import JDownloaderAPI
+from src.infrastructure.snapshot_service import snapshot_service
+
+logger = get_logger("api")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only track where a link was clicked
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a link for duplicate detection.
+
+    Scheme and host are lower-cased and http/https, "www." and default ports are treated
+    alike; tracking parameters and trailing slashes are dropped. The fragment is kept, as
+    some hosters put the file key there. Anything that isn't an absolute URL is only stripped.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+    host = parts.hostname.lower().removeprefix("www.")
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    if parts.username:
+        host = f"{parts.username}@{host}"
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ])
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, parts.fragment))
+
+
+def link_key(url: str) -> int:
+    """64-bit hash of the normalized URL (what the index stores instead of the string)."""
+    return int.from_bytes(blake2b(normalize_url(url).encode(), digest_size=8).digest(), "big")
+
+
+def buffered_links(entries: list) -> Iterable[str]:
+    """Links of offline buffer entries (package objects or legacy plain strings)."""
+    for entry in entries:
+        if isinstance(entry, dict):
+            for link in entry.get("links", []):
+                if isinstance(link, dict):
+                    link = link.get("url")
+                if isinstance(link, str):
+                    yield link
+        elif isinstance(entry, str):
+            yield entry
+
+
+class ListLinks:
+    """
+    Links of one list's snapshot by their url ids in its string pool. Delta refreshes share
+    the previous snapshot's pool, so a newer snapshot is applied from the url ids that
+    appeared or went away; only links not seen before are hashed.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.pool = snapshot.store.pool
+        # url id -> link key, and how many current url ids share each key (normalized alike)
+        self._keys: dict[int, int] = {}
+        self._counts: Counter[int] = Counter()
+        self.update(snapshot)
+
+    def update(self, snapshot: Snapshot) -> None:
+        """Apply a newer snapshot of the list (sharing this pool)."""
+        current = set(snapshot.store.url)
+        current.discard(NO_STRING)
+        for sid in self._keys.keys() - current:
+            key = self._keys.pop(sid)
+            self._counts[key] -= 1
+            if not self._counts[key]:
+                del self._counts[key]
+        strings = self.pool.strings
+        for sid in current - self._keys.keys():
+            key = self._keys[sid] = link_key(strings[sid])
+            self._counts[key] += 1
+
+    def has_key(self, key: int) -> bool:
+        return key in self._counts
+
+
+class DuplicateIndex:
+    """
+    Links JD already has (from the latest list snapshots, plus links submitted since) and
+    links waiting in the offline buffer. Each side is updated only when its source changed.
+    """
+
+    def __init__(self):
+        self._lists: dict[str, ListLinks] = {}
+        self._tags: dict[str, str] = {}
+        self._lock = asyncio.Lock()
+        # Links handed to JD (key -> when), kept until a snapshot shows them or they age out
+        self._submitted: dict[int, float] = {}
+        self._buffer: set[int] = set()
+        self._buffer_key: tuple | None = None
+
+    async def _sync_list(self, snapshot: Snapshot) -> None:
+        if self._tags.get(snapshot.kind) == snapshot.tag:
+            return
+        links = self._lists.get(snapshot.kind)
+        if links is not None and links.pool is snapshot.store.pool:
+            links.update(snapshot)
+        else:
+            # A new pool (full resync, another JD instance): every link is hashed, off the event loop
+            links = await asyncio.to_thread(ListLinks, snapshot)
+        self._lists[snapshot.kind] = links
+        self._tags[snapshot.kind] = snapshot.tag
+
+    def _in_jd(self, key: int) -> bool:
+        return any(links.has_key(key) for links in self._lists.values())
+
+    async def sync(self, api: JDownloaderAPI, buffer_file: Path | None = None) -> None:
+        """
+        Catch up with the cached list snapshots of `api` and the buffer file. JD is never
+        queried here (an unreachable one would hold up adds that are about to be buffered);
+        lists are kept fresh by the snapshot refresher from the first sync on.
+        """
+        async with self._lock:
+            for kind in LIST_KINDS:
+                snapshot = snapshot_service.cached(api, kind)
+                if snapshot is None:
+                    self._lists.pop(kind, None)
+                    self._tags.pop(kind, None)
+                else:
+                    await self._sync_list(snapshot)
+        cutoff = time.monotonic() - settings.DUPLICATE_SUBMITTED_MAX_AGE
+        self._submitted = {
+            key: submitted_at for key, submitted_at in self._submitted.items()
+            if submitted_at >= cutoff and not self._in_jd(key)
+        }
+        if buffer_file is not None:
+            self._sync_buffer(buffer_file)
+
+    def _sync_buffer(self, buffer_file: Path) -> None:
+        try:
+            stat = buffer_file.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key == self._buffer_key:
+            return
+        entries = []
+        if key is not None:
+            try:
+                with open(buffer_file) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = []
+        self._buffer = {link_key(link) for link in buffered_links(entries)}
+        self._buffer_key = key
+
+    def remember(self, links: Iterable[str]) -> None:
+        """Record links just handed to JD (the list snapshots may not show them yet)."""
+        now = time.monotonic()
+        for link in links:
+            self._submitted[link_key(link)] = now
+
+    def split(self, links: list[str], include_buffer: bool = True) -> tuple[list[str], list[str]]:
+        """
+        (new links, duplicates) in their original order. Duplicates are links JD already has,
+        links waiting in the buffer (unless include_buffer=False, as for replays of that
+        buffer) and repeats within `links` itself.
+        """
+        fresh, duplicates = [], []
+        seen: set[int] = set()
+        for link in links:
+            key = link_key(link)
+            if key in seen or key in self._submitted or self._in_jd(key) or (include_buffer and key in self._buffer):
+                duplicates.append(link)
+            else:
+                seen.add(key)
+                fresh.append(link)
+        return fresh, duplicates
+
+
+duplicate_index = DuplicateIndex()
+
+
+async def filter_duplicates(
+    api: JDownloaderAPI,
+    links: list[str],
+    buffer_file: Path | None = None,
+    via: str = "api",
+) -> tuple[list[str], list[str]]:
+    """
+    Drop links JD (or, given `buffer_file`, the offline buffer) already has. Returns
+    (new links, duplicates); with DUPLICATE_LINKS_FILTER off every link is new.
+    """
+    if not settings.DUPLICATE_LINKS_FILTER:
+        return links, []
+    await duplicate_index.sync(api, buffer_file)
+    fresh, duplicates = duplicate_index.split(links, include_buffer=buffer_file is not None)
+    if duplicates:
+        metrics.DUPLICATE_LINKS.labels(via).inc(len(duplicates))
+        logger.info("Duplicate links dropped", via=via, duplicates=len(duplicates), new=len(fresh))
+    return fresh, duplicates
@@ -1,348 +1,740 @@
 
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+
 import httpx
+from opentelemetry import trace
+
+from src.core import metrics
+from src.core.config import settings
+from src.core.log import get_logger
+from src.core.telemetry import child_span, traced
+from src.domain.models import DownloadStatus, Package
+from src.domain.snapshot import DOWNLOADS, LINKGRABBER, LIST_KINDS, Snapshot
+from src.domain.store import PackageStore
+from src.infrastructure.api_interface import AddLinksError, JDownloaderAPI
+from src.infrastructure.delta_sync import DeltaSyncEngine
+from src.infrastructure.jd_dialect import Dialect, DialectCache
+from src.infrastructure.json_stream import ArrayStreamDecoder
+
+logger = get_logger("jd")
+tracer = trace.get_tracer(__name__)
+
+
+def _log_response(event: str, resp: httpx.Response, **fields) -> None:
+    """Status at info; the body only at debug level, and only decoded when that is enabled."""
+    if logging.getLogger("jd").isEnabledFor(logging.DEBUG):
+        logger.debug(event, status=resp.status_code, body=resp.text, **fields)
+    else:
+        logger.info(event, status=resp.status_code, **fields)
+
+
+# Failures that mean an addLinks request never reached JD, so sending it again is safe
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+def _add_links_query(links: list[str], package_name: str | None) -> dict:
+    return {"json": {
+        "links": "\n".join(links),
+        "autostart": False,  # User requested no autostart
+        "deepDecrypt": True,
+        "packageName": package_name,  # Optional package name for grouping
+    }}
+
+
+def _add_links_params(links: list[str], package_name: str | None) -> dict:
+    params = {"links": ",".join(links), "autostart": False, "deepDecrypt": True}
+    if package_name:
+        params["packageName"] = package_name
+    return {"params": params}
+
+
+# Payload shapes accepted by different JD builds, in the order they are probed. Which one
+# works is cached per instance and version (see DialectCache), so later calls use it directly.
+DIALECTS = {
+    "add_links": [
+        Dialect("linkgrabberv2", "/linkgrabberv2/addLinks", _add_links_query),
+        Dialect("linkcollector", "/linkcollector/addLinks", _add_links_params),
+    ],
+    # moveToDownloadlist(long[] linkIds, long[] packageIds)
+    "move_to_dl": [
+        Dialect("rpc-params", "/linkgrabberv2/moveToDownloadlist", lambda ids: {"json": {"params": [[], ids]}}),
+        Dialect("package-ids", "/linkgrabberv2/moveToDownloadlist",
+                lambda ids: {"json": {"packageIds": ids, "startDownloads": True}}),
+        Dialect("package-and-link-ids", "/linkgrabberv2/moveToDownloadlist",
+                lambda ids: {"json": {"packageIds": ids, "linkIds": [], "startDownloads": True}}),
+    ],
+}
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Records every JD call (per endpoint path) in the metrics and as a client span, so
+    traces show each HTTP round trip below the API method that issued it.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = request.url.path
+        start = time.perf_counter()
+        with child_span(
+            tracer, f"JD {request.method} {endpoint}",
+            {"http.request.method": request.method, "url.path": endpoint}, kind=trace.SpanKind.CLIENT,
+        ):
+            try:
+                response = await self._transport.handle_async_request(request)
+            except Exception as e:
+                metrics.JD_REQUESTS.labels(endpoint, "error").inc()
+                metrics.JD_REQUEST_ERRORS.labels(endpoint, type(e).__name__).inc()
+                raise
+            trace.get_current_span().set_attribute("http.response.status_code", response.status_code)
+        metrics.JD_REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        metrics.JD_REQUESTS.labels(endpoint, str(response.status_code)).inc()
+        return response
 
+    async def aclose(self) -> None:
+        await self._transport.aclose()
 
-from src.domain.models import DownloadStatus, Link, Package
-from src.infrastructure.api_interface import JDownloaderAPI
+
+def build_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create the pooled keep-alive client used for all calls to the local JD API."""
+    if transport is None:
+        http2 = settings.JD_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("JD_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        # The pool lives in the transport, which is wrapped for metrics below
+        transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.JD_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.JD_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.JD_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    return httpx.AsyncClient(
+        transport=InstrumentedTransport(transport),
+        timeout=httpx.Timeout(settings.JD_HTTP_TIMEOUT, connect=settings.JD_HTTP_CONNECT_TIMEOUT),
+    )
+
+
+# QueryDicts for the package/link list queries. Only fields that build_store() reads are
+# requested, so JD does not compute (and we do not decode) anything that is never shown.
+PACKAGE_QUERY = {
+    "saveTo": True,
+    "childCount": True,
+    "status": True,
+    "bytesTotal": True,
+    "bytesLoaded": True,
+    "speed": True
+}
+
+LINK_QUERY = {
+    "packageUUIDs": [],
+    "host": True,
+    "finished": True,
+    "bytesTotal": True,
+    "bytesLoaded": True,
+    "url": True,
+    "eta": True,
+    "speed": True
+}
+
+# kind -> (queryPackages endpoint, queryLinks endpoint)
+LIST_ENDPOINTS = {
+    DOWNLOADS: ("downloadsV2/queryPackages", "downloadsV2/queryLinks"),
+    LINKGRABBER: ("linkgrabberv2/queryPackages", "linkgrabberv2/queryLinks"),
+}
+
+
+def build_store(
+    pkg_data: list[dict],
+    raw_links_by_pkg: dict[str, list[dict]],
+    scope: list[str] | None = None,
+    previous: PackageStore | None = None,
+) -> PackageStore:
+    """
+    Build the array-backed package store from package rows and link rows grouped by packageUUID.
+
+    With a delta `scope`, only packages in it take their links from `raw_links_by_pkg`; the
+    links of all other packages are copied unchanged from the `previous` store.
+    """
+    reuse = previous is not None and scope is not None
+    in_scope = set(scope) if reuse else None
+    store = PackageStore(pool=previous.pool if reuse else None)
+    for p in pkg_data:
+        uuid = str(p.get("uuid", "0"))
+        store.add_package(
+            uuid=uuid,
+            name=p.get("name", "Unknown"),
+            save_to=p.get("saveTo", "/downloads"),
+            total_bytes=p.get("bytesTotal", 0),
+            loaded_bytes=p.get("bytesLoaded", 0),
+            child_count=p.get("childCount", 0),
+            status_text=p.get("status"),
+            speed=p.get("speed", 0),
+        )
+        if reuse and uuid not in in_scope:
+            prev_index = previous.index_of(uuid)
+            if prev_index is not None:
+                store.copy_links(previous, prev_index)
+            continue
+
+        for link in raw_links_by_pkg.get(uuid, ()):
+            store.add_link(
+                uuid=str(link.get("uuid", "0")),
+                name=link.get("name", "Unknown"),
+                url=link.get("url", ""),
+                host=link.get("host", ""),
+                bytes_total=link.get("bytesTotal", 0),
+                bytes_loaded=link.get("bytesLoaded", 0),
+                status=DownloadStatus.FINISHED if link.get("finished", False) else DownloadStatus.RUNNING, # Simplified
+                speed=link.get("speed", 0),
+                eta=link.get("eta", None),
+            )
+    return store
 
 
 class LocalJDownloaderAPI(JDownloaderAPI):
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, transport: httpx.AsyncBaseTransport | None = None):
         self.base_url = base_url
-
-    async def _query_links(self, endpoint: str) -> list[dict]:
-        async with httpx.AsyncClient() as client:
-            try:
-                params = {
-                    "packageUUIDs": [], 
-                    "metaInfo": True,
-                    "status": True,
-                    "bytesTotal": True,
-                    "bytesLoaded": True,
-                    "url": True,
-                    "priority": True,
-                    "eta": True,
-                    "speed": True
-                }
-                resp = await client.post(f"{self.base_url}/{endpoint}", json=params)
+        # One long-lived pool per instance; reused by every call instead of a client per request
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        # Incremental link sync state per package list
+        self._sync = {kind: DeltaSyncEngine() for kind in LIST_KINDS}
+        self._snapshots: dict[str, Snapshot] = {}
+        # Working payload dialect per operation, for this instance's JD version
+        self._dialects = DialectCache(settings.JD_DIALECT_RECHECK_INTERVAL)
+        self._dialect_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = build_http_client(self._transport)
+        return self._client
+
+    def open(self) -> None:
+        """Eagerly create the connection pool (otherwise it is created on first use)."""
+        self._get_client()
+
+    async def aclose(self) -> None:
+        """Close the connection pool. A later call transparently opens a new one."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _jd_version(self) -> str | None:
+        try:
+            resp = await self._get_client().post(f"{self.base_url}/jd/version")
+            if resp.status_code != 200:
+                return None
+            data = resp.json()
+        except Exception:
+            logger.debug("Reading the JD version failed", exc_info=True)
+            return None
+        if isinstance(data, dict):
+            data = data.get("data")
+        return None if data is None else str(data)
+
+    async def _negotiate(self) -> None:
+        """Re-read the JD version now and then; a new version (or a first call) re-parses /help."""
+        if not self._dialects.needs_check():
+            return
+        async with self._dialect_lock:
+            if not self._dialects.needs_check():
+                return
+            version = await self._jd_version()
+            if version is None:
+                # Unreachable or no /jd/version: keep what we know rather than dropping it
+                version = self._dialects.version
+            help_text = None
+            if version != self._dialects.version or not self._dialects.checked_once:
+                try:
+                    help_text = await self.get_help()
+                except Exception as e:
+                    logger.warning("Reading JD /help failed, probing all dialects", error=str(e), exc_info=True)
+            if version != self._dialects.version:
+                logger.info("JD version changed, dialects reset", previous=self._dialects.version, version=version)
+            self._dialects.checked(version, help_text)
+
+    async def _call_dialect(self, operation: str, *args) -> httpx.Response | None:
+        """
+        POST `operation` in the first dialect JD accepts: the cached one if there is one,
+        else each dialect the instance supports in turn. Returns the last response.
+        """
+        await self._negotiate()
+        client = self._get_client()
+        resp = None
+        for dialect in self._dialects.candidates(operation, DIALECTS[operation]):
+            resp = await client.post(f"{self.base_url}{dialect.endpoint}", **dialect.build(*args))
+            _log_response("JD dialect response", resp, operation=operation, dialect=dialect.name)
+            if resp.status_code == 200:
+                self._dialects.remember(operation, dialect)
+                return resp
+            if resp.status_code >= 500:
+                # A server error says nothing about the payload shape, and JD may have acted on
+                # the request: trying another dialect could apply it twice
+                return resp
+            if self._dialects.chosen(operation) == dialect.name:
+                self._dialects.forget(operation)
+        return resp
+
+    async def _query_page(self, endpoint: str, params: dict) -> list[dict]:
+        # The span covers streaming and decoding the body, the HTTP span below it only the round trip
+        with child_span(tracer, "jd.query_page", {"jd.endpoint": endpoint, "jd.start_at": params.get("startAt", 0)}):
+            # Rows are decoded one by one while the body streams in (no full resp.json() tree)
+            async with self._get_client().stream("POST", f"{self.base_url}/{endpoint}", json=params) as resp:
                 if resp.status_code != 200:
-                    return []
-                return resp.json().get("data", [])
-            except:
-                return []
-
-    async def _query_packages(self, endpoint: str) -> list[Package]:
-        # Determine link endpoint based on package endpoint
-        link_endpoint = "downloadsV2/queryLinks" if "downloads" in endpoint else "linkgrabberv2/queryLinks"
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                # 1. Fetch Packages
-                pkg_params = {
-                    "saveTo": True,
-                    "childCount": True,
-                    "hosts": True,
-                    "status": True,
-                    "bytesTotal": True,
-                    "bytesLoaded": True,
-                    "speed": True
-                }
-                pkg_resp = await client.post(f"{self.base_url}/{endpoint}", json=pkg_params)
-                if pkg_resp.status_code != 200:
-                    raise Exception(f"JD API Status {pkg_resp.status_code}")
-                
-                pkg_data = pkg_resp.json().get("data", [])
-
-                # 2. Fetch Links (to populate children)
-                raw_links = await self._query_links(link_endpoint)
-                
-                # Group links by packageUUID
-                links_by_pkg = {}
-                for link in raw_links:
-                    pid = str(link.get("packageUUID", "0"))
-                    if pid not in links_by_pkg:
-                        links_by_pkg[pid] = []
-                    
-                    links_by_pkg[pid].append(Link(
-                        uuid=str(link.get("uuid", "0")),
-                        name=link.get("name", "Unknown"),
-                        url=link.get("url", ""),
-                        host=link.get("host", ""),
-                        bytes_total=link.get("bytesTotal", 0),
-                        bytes_loaded=link.get("bytesLoaded", 0),
-                        status=DownloadStatus.FINISHED if link.get("finished", False) else DownloadStatus.RUNNING, # Simplified
-                        speed=link.get("speed", 0),
-                        eta=link.get("eta", None)
-                    ))
-
-                packages = []
-                for p in pkg_data:
-                    uuid = str(p.get("uuid", "0"))
-                    pkg_links = links_by_pkg.get(uuid, [])
-                    # Calculate total speed from all links in package
-                    pkg_speed = sum(link.speed for link in pkg_links)
-                    pk = Package(
-                        uuid=uuid,
-                        name=p.get("name", "Unknown"),
-                        status=DownloadStatus.RUNNING if p.get("enabled", True) else DownloadStatus.STOPPED,
-                        total_bytes=p.get("bytesTotal", 0),
-                        loaded_bytes=p.get("bytesLoaded", 0),
-                        child_count=p.get("childCount", 0),
-                        links=pkg_links,
-                        speed=pkg_speed,
-                        status_text=p.get("status")
-                    )
-                    packages.append(pk)
-                return packages
-            except httpx.RequestError as e:
-                print(f"JD API Connection Error ({endpoint}): {e!s}")
-                raise Exception(f"Connection Failed: {e!s}")
-            except Exception as e:
-                print(f"JD API Unexpected Error ({endpoint}): {e!s}")
-                raise
+                    raise Exception(f"JD API Status {resp.status_code}")
+                decoder = ArrayStreamDecoder("data")
+                rows = []
+                async for chunk in resp.aiter_bytes():
+                    rows.extend(decoder.feed(chunk))
+                decoder.close()
+            trace.get_current_span().set_attribute("jd.rows", len(rows))
+        return rows
+
+    async def _iter_pages(self, endpoint: str, params: dict, expected_total: int | None = None) -> AsyncIterator[list[dict]]:
+        """
+        Yield the rows of a query page by page using JD's startAt/maxResults.
+
+        Up to JD_QUERY_MAX_CONCURRENT_PAGES pages are fetched at a time, so neither the
+        longest single JD call nor the rows held in flight grow with the list size. Paging
+        stops at the first short page; `expected_total` only caps the fan-out, as the list
+        may have changed since it was counted.
+        """
+        page_size = settings.JD_QUERY_PAGE_SIZE
+        if page_size <= 0:
+            yield await self._query_page(endpoint, params)
+            return
+
+        concurrency = max(1, settings.JD_QUERY_MAX_CONCURRENT_PAGES)
+        start = 0
+        while True:
+            width = concurrency
+            if expected_total is None and start == 0:
+                # Unknown size: probe with a single page before fanning out
+                width = 1
+            elif expected_total is not None:
+                if start < expected_total:
+                    # Don't request pages beyond the expected total
+                    width = min(width, -(-(expected_total - start) // page_size))
+                else:
+                    # The list grew past the expected total (or it was 0): go on one page at a time
+                    width = 1
+            offsets = [start + i * page_size for i in range(width)]
+            pages = await asyncio.gather(*(
+                self._query_page(endpoint, {**params, "startAt": offset, "maxResults": page_size})
+                for offset in offsets
+            ))
+            for rows in pages:
+                if rows:
+                    yield rows
+                if len(rows) < page_size:
+                    return
+            start = offsets[-1] + page_size
+
+    async def _query_links(
+        self, endpoint: str, package_uuids: list[str] | None = None, expected_total: int | None = None
+    ) -> dict[str, list[dict]] | None:
+        """Query link rows (optionally scoped to some packages) grouped by packageUUID; None if the query failed."""
+        params = LINK_QUERY
+        if package_uuids is not None:
+            int_ids = [int(u) for u in package_uuids if u.isdigit()]
+            if not int_ids:
+                # An empty packageUUIDs filter would match every link
+                return {}
+            params = {**LINK_QUERY, "packageUUIDs": int_ids}
+        try:
+            links_by_pkg: dict[str, list[dict]] = {}
+            async for page in self._iter_pages(endpoint, params, expected_total):
+                for link in page:
+                    links_by_pkg.setdefault(str(link.get("packageUUID", "0")), []).append(link)
+            return links_by_pkg
+        except Exception as e:
+            logger.warning("JD link query failed", endpoint=endpoint, error=str(e), exc_info=True)
+            return None
+
+    async def _query_package_rows(self, endpoint: str) -> list[dict]:
+        try:
+            rows = []
+            async for page in self._iter_pages(endpoint, PACKAGE_QUERY):
+                rows.extend(page)
+            return rows
+        except httpx.RequestError as e:
+            logger.warning("JD API connection error", endpoint=endpoint, error=str(e))
+            raise Exception(f"Connection Failed: {e!s}")
+        except Exception as e:
+            logger.error("JD API unexpected error", endpoint=endpoint, error=str(e))
+            raise
+
+    @traced(tracer, "jd.get_snapshot")
+    async def get_snapshot(self, kind: str, include_links: bool = True) -> Snapshot:
+        pkg_endpoint, link_endpoint = LIST_ENDPOINTS[kind]
+        engine = self._sync[kind]
+        span = trace.get_current_span()
+        span.set_attribute("jd.list", kind)
+        span.set_attribute("jd.include_links", include_links)
+
+        if not include_links:
+            # Package-level view: a single queryPackages call, no link fan-out
+            pkg_data = await self._query_package_rows(pkg_endpoint)
+            if engine.unchanged(pkg_data) and kind in self._snapshots:
+                # The last full snapshot is still exact, and already encoded
+                return self._snapshots[kind]
+            return Snapshot(kind=kind, store=build_store(pkg_data, {}), include_links=False)
+
+        if not engine.primed:
+            # Cold start: packages and links are requested concurrently
+            pkg_data, raw_links = await asyncio.gather(
+                self._query_package_rows(pkg_endpoint),
+                self._query_links(link_endpoint),
+            )
+            scope = None
+        else:
+            # Delta sync: only re-query links of packages whose fingerprint changed
+            pkg_data = await self._query_package_rows(pkg_endpoint)
+            scope = engine.plan(pkg_data)
+            if scope == [] and engine.unchanged(pkg_data) and kind in self._snapshots:
+                # Nothing changed: keep the previous snapshot (same version, cached encoding)
+                return self._snapshots[kind]
+            if scope == []:
+                raw_links = {}
+            else:
+                # childCount tells us exactly how many link pages to request
+                in_scope = set(scope) if scope is not None else None
+                expected = sum(
+                    p.get("childCount", 0) for p in pkg_data
+                    if in_scope is None or str(p.get("uuid", "0")) in in_scope
+                )
+                raw_links = await self._query_links(link_endpoint, scope, expected)
+
+        if raw_links is None:
+            # Link query failed; serve packages without children and resync from scratch next time
+            engine.reset()
+            self._snapshots.pop(kind, None)
+            return Snapshot(kind=kind, store=build_store(pkg_data, {}))
+
+        span.set_attribute("jd.sync", "full" if scope is None else "delta")
+        with child_span(tracer, "jd.build_store", {"jd.packages": len(pkg_data)}):
+            store = build_store(pkg_data, raw_links, scope, engine.store)
+        engine.commit(pkg_data, store, scope)
+        snapshot = self._snapshots[kind] = Snapshot(kind=kind, store=store)
+        return snapshot
 
     async def get_packages(self) -> list[Package]:
-        return await self._query_packages("downloadsV2/queryPackages")
+        return (await self.get_snapshot(DOWNLOADS)).packages
 
     async def get_linkgrabber_packages(self) -> list[Package]:
-        return await self._query_packages("linkgrabberv2/queryPackages")
-
-    async def add_links(self, links: list[str], package_name: str | None = None) -> str:
-        async with httpx.AsyncClient() as client:
-            endpoint = "/linkgrabberv2/addLinks"
-            # Ensure all links are strings to prevent TypeError
-            # Ensure all links are strings to prevent TypeError
-            safe_links = []
-            for link_item in links:
-                if isinstance(link_item, dict) and "url" in link_item:
-                    safe_links.append(str(link_item["url"]))
-                else:
-                    safe_links.append(str(link_item))
-
-            payload = {
-                "links": "\n".join(safe_links),
-                "autostart": False, # User requested no autostart
-                "deepDecrypt": True,
-                "packageName": package_name  # Optional package name for grouping
-            }
-            try:
-                print(f"[JD-API] Adding Links: {self.base_url}{endpoint} | Package: {package_name}")
-                resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
-                print(f"[JD-API] Add Links Response: {resp.status_code} | {resp.text}")
-                
-                if resp.status_code != 200:
-                     print(f"[JD-API] Error {resp.status_code}, trying fallback to linkcollector/addLinks")
-                     # Fallback params
-                     fb_params = {
-                        "links": ",".join(safe_links),
-                        "autostart": False,
-                        "deepDecrypt": True
-                     }
-                     if package_name:
-                         fb_params["packageName"] = package_name
-                         
-                     resp = await client.post(f"{self.base_url}/linkcollector/addLinks", params=fb_params)
-                     print(f"[JD-API] Fallback Response: {resp.status_code} | {resp.text}")
-
-                return "ok" if resp.status_code == 200 else f"error: {resp.text}"
-            except Exception as e:
-                print(f"[JD-API] Add Links Exception: {e}")
-                raise e
-
+        return (await self.get_snapshot(LINKGRABBER)).packages
+
+    @traced(tracer, "jd.get_linkgrabber_save_to")
+    async def get_linkgrabber_save_to(self, package_ids: list[str]) -> dict[str, str | None]:
+        int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
+        if not int_ids:
+            # An empty packageUUIDs filter would match every package
+            return {}
+        params = {"packageUUIDs": int_ids, "saveTo": True, "startAt": 0, "maxResults": len(int_ids)}
+        rows = await self._query_page("linkgrabberv2/queryPackages", params)
+        return {str(row.get("uuid")): row.get("saveTo") for row in rows}
+
+    async def _add_links_chunk(self, index: int, chunk: list[str], package_name: str | None) -> httpx.Response:
+        """
+        One addLinks call, retried with backoff only when the request never reached JD
+        (connection errors). Any other failure, a server error included, may have happened
+        after JD's crawler took the links, so it is returned or raised at once rather than
+        risking a second copy.
+        """
+        attempts = 1 + max(0, settings.JD_ADD_LINKS_RETRIES)
+        attempt = 1
+        with child_span(tracer, "jd.add_links_chunk", {"jd.chunk": index, "jd.links": len(chunk)}):
+            while True:
+                try:
+                    return await self._call_dialect("add_links", chunk, package_name)
+                except NOT_SENT_ERRORS as e:
+                    if attempt >= attempts:
+                        raise
+                    logger.warning("Add links chunk failed, retrying", chunk=index, attempt=attempt, error=str(e))
+                await asyncio.sleep(settings.JD_ADD_LINKS_RETRY_DELAY * 2 ** (attempt - 1))
+                attempt += 1
+
+    @traced(tracer, "jd.add_links")
+    async def add_links(
+        self,
+        links: list[str],
+        package_name: str | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> str:
+        """
+        Add links in chunks of JD_ADD_LINKS_CHUNK_SIZE, up to JD_ADD_LINKS_MAX_CONCURRENT at a
+        time, all under the same package name (one is generated when several chunks have
+        none). `progress(accepted, total)` is called after each accepted chunk. Returns "ok";
+        if any chunk failed, AddLinksError tells which links are pending, uncertain or rejected.
+        """
+        # Ensure all links are strings to prevent TypeError
+        safe_links = []
+        for link_item in links:
+            if isinstance(link_item, dict) and "url" in link_item:
+                safe_links.append(str(link_item["url"]))
+            else:
+                safe_links.append(str(link_item))
+
+        size = max(1, settings.JD_ADD_LINKS_CHUNK_SIZE)
+        chunks = [safe_links[i:i + size] for i in range(0, len(safe_links), size)] or [[]]
+        if package_name is None and len(chunks) > 1:
+            # Unnamed, JD would group each chunk's links on their own
+            package_name = f"Links {time.strftime('%Y-%m-%d %H:%M:%S')}"
+        semaphore = asyncio.Semaphore(max(1, settings.JD_ADD_LINKS_MAX_CONCURRENT))
+        accepted = 0
+
+        async def submit(index: int) -> httpx.Response:
+            nonlocal accepted
+            async with semaphore:
+                resp = await self._add_links_chunk(index, chunks[index], package_name)
+            if resp.status_code == 200:
+                accepted += len(chunks[index])
+                if progress is not None:
+                    progress(accepted, len(safe_links))
+            return resp
+
+        logger.info("Adding links", package=package_name, links=len(safe_links), chunks=len(chunks))
+        # The first chunk goes alone so the endpoint dialect is settled before the rest fan out
+        results: list = await asyncio.gather(submit(0), return_exceptions=True)
+        if isinstance(results[0], NOT_SENT_ERRORS):
+            # JD is unreachable: the other chunks are not tried either
+            results += results * (len(chunks) - 1)
+        else:
+            results += await asyncio.gather(*(submit(i) for i in range(1, len(chunks))), return_exceptions=True)
+
+        pending, uncertain, rejected = [], [], []
+        error = None
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, httpx.Response):
+                if result.status_code == 200:
+                    continue
+                # JD may have taken the links before failing: a server error is not safe to resend
+                (uncertain if result.status_code >= 500 else rejected).extend(chunk)
+                reason = f"status {result.status_code}: {result.text}"
+            elif isinstance(result, Exception):
+                (pending if isinstance(result, NOT_SENT_ERRORS) else uncertain).extend(chunk)
+                reason = str(result) or type(result).__name__
+            else:
+                # Cancellation (or another BaseException) is not a failed chunk
+                raise result
+            error = error or reason
+        if error is None:
+            return "ok"
+        logger.error(
+            "Add links failed", package=package_name, accepted=accepted, pending=len(pending),
+            uncertain=len(uncertain), rejected=len(rejected), error=error,
+        )
+        raise AddLinksError(error, pending, uncertain, rejected)
+
+    @traced(tracer, "jd.start_downloads")
     async def start_downloads(self) -> None:
-        async with httpx.AsyncClient() as client:
-            print(f"[JD-API] Starting Downloads: {self.base_url}/downloadcontroller/start")
-            resp = await client.post(f"{self.base_url}/downloadcontroller/start")
-            print(f"[JD-API] Start Response: {resp.status_code} | {resp.text}")
-            return resp.json()
+        client = self._get_client()
+        logger.info("Starting downloads")
+        resp = await client.post(f"{self.base_url}/downloadcontroller/start")
+        _log_response("Start downloads response", resp)
+        return resp.json()
 
+    @traced(tracer, "jd.stop_downloads")
     async def stop_downloads(self) -> None:
-        async with httpx.AsyncClient() as client:
-            print(f"[JD-API] Stopping Downloads: {self.base_url}/downloadcontroller/stop")
-            resp = await client.post(f"{self.base_url}/downloadcontroller/stop")
-            print(f"[JD-API] Stop Response: {resp.status_code} | {resp.text}")
-
-    async def move_to_dl(self, package_ids: list[str]) -> None:
-        async with httpx.AsyncClient() as client:
-            current_pkgs = await self.get_linkgrabber_packages()
-            print(f"[JD-API] Debug - Available LinkGrabber IDs: {[p.uuid for p in current_pkgs]}")
-            
-            # Convert to ints
-            try:
-                int_ids = [int(pid) for pid in package_ids]
-            except:
-                int_ids = []
-
-            # Trial 1: Standard RPC params (linkIds, packageIds)
-            # Reference: moveToDownloadlist(long[] linkIds, long[] packageIds)
-            payloads = [
-                {"params": [[], int_ids]},           # Standard RPC
-                {"packageIds": int_ids, "startDownloads": True}, # Legacy/Alternative
-                {"packageIds": int_ids, "linkIds": [], "startDownloads": True},
-            ]
-
-            success = False
-            for i, p in enumerate(payloads):
-                print(f"[JD-API] Move Trial {i+1}: {p}")
-                # Note: Some endpoints might need 'action' query param or just simple POST
-                resp = await client.post(f"{self.base_url}/linkgrabberv2/moveToDownloadlist", json=p)
-                print(f"[JD-API] Response {i+1}: {resp.status_code} | {resp.text!r}")
-                if resp.status_code == 200:
-                    success = True
-                    break
-            
-            if success:
-                print("[JD-API] Move successful. Triggering Start Downloads...")
-                await self.start_downloads()
-                return
-
-            print("[JD-API] All Move trials failed.")
-
+        client = self._get_client()
+        logger.info("Stopping downloads")
+        resp = await client.post(f"{self.base_url}/downloadcontroller/stop")
+        _log_response("Stop downloads response", resp)
+
+    @traced(tracer, "jd.move_to_dl")
+    async def move_to_dl(self, package_ids: list[str]) -> bool:
+        """Move LinkGrabber packages to the download list and start downloading; False if JD refused."""
+        # Convert to ints
+        try:
+            int_ids = [int(pid) for pid in package_ids]
+        except:
+            int_ids = []
+        logger.debug("Move to download list", package_ids=int_ids)
+
+        resp = await self._call_dialect("move_to_dl", int_ids)
+        if resp.status_code == 200:
+            logger.info("Moved to download list, starting downloads", packages=len(int_ids))
+            await self.start_downloads()
+            return True
+
+        logger.error("Move to download list failed", packages=len(int_ids))
+        return False
+
+    @traced(tracer, "jd.confirm_all_linkgrabber")
     async def confirm_all_linkgrabber(self) -> None:
-        async with httpx.AsyncClient():
-            pkgs = await self.get_linkgrabber_packages()
-            ids = [p.uuid for p in pkgs]
-            if ids:
-                await self.move_to_dl(ids)
+        # Package ids are all that's needed: no link queries
+        ids = list((await self.get_snapshot(LINKGRABBER, include_links=False)).store.pkg_uuid)
+        if ids:
+            await self.move_to_dl(ids)
 
+    @traced(tracer, "jd.get_help")
     async def get_help(self) -> str:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/help")
-            if resp.status_code != 200:
-                raise Exception(f"JD Help Status {resp.status_code}")
-            return resp.text
+        client = self._get_client()
+        resp = await client.get(f"{self.base_url}/help")
+        if resp.status_code != 200:
+            raise Exception(f"JD Help Status {resp.status_code}")
+        return resp.text
 
+    @traced(tracer, "jd.remove_linkgrabber_packages")
     async def remove_linkgrabber_packages(self, package_ids: list[str]) -> None:
-         async with httpx.AsyncClient() as client:
-            try:
-                int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
-            except:
-                int_ids = []
+        client = self._get_client()
+        try:
+            int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
+        except:
+            int_ids = []
             
-            # JD API uses RPC style with "params" array matching method signature
-            # removeLinks signature: (long[] linkIds, long[] packageIds)
-            endpoint = "/linkgrabberv2/removeLinks"
-            payload = {"params": [ [], int_ids ]}
+        # JD API uses RPC style with "params" array matching method signature
+        # removeLinks signature: (long[] linkIds, long[] packageIds)
+        endpoint = "/linkgrabberv2/removeLinks"
+        payload = {"params": [ [], int_ids ]}
 
-            await client.post(f"{self.base_url}{endpoint}", json=payload)
+        await client.post(f"{self.base_url}{endpoint}", json=payload)
 
+    @traced(tracer, "jd.remove_download_packages")
     async def remove_download_packages(self, package_ids: list[str]) -> None:
-         async with httpx.AsyncClient() as client:
-            try:
-                int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
-            except:
-                int_ids = []
-
-            # downloadsV2/removeLinks(long[] linkIds, long[] packageIds)
-            endpoint = "/downloadsV2/removeLinks"
-            payload = {"params": [ [], int_ids ]}
-
-            await client.post(f"{self.base_url}{endpoint}", json=payload)
-
-    async def set_download_directory(self, package_ids: list[str], directory: str) -> None:
-        async with httpx.AsyncClient() as client:
-            try:
-                int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
-            except:
-                int_ids = []
-
-            # setDownloadDirectory(String directory, long[] packageIds)
-            endpoint = "/linkgrabberv2/setDownloadDirectory"
-            payload = {"params": [ directory, int_ids ]}
-
-            await client.post(f"{self.base_url}{endpoint}", json=payload)
-
+        client = self._get_client()
+        try:
+            int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
+        except:
+            int_ids = []
+
+        # downloadsV2/removeLinks(long[] linkIds, long[] packageIds)
+        endpoint = "/downloadsV2/removeLinks"
+        payload = {"params": [ [], int_ids ]}
+
+        await client.post(f"{self.base_url}{endpoint}", json=payload)
+
+    @traced(tracer, "jd.set_download_directory")
+    async def set_download_directory(self, package_ids: list[str], directory: str) -> bool:
+        client = self._get_client()
+        try:
+            int_ids = [int(pid) for pid in package_ids if pid.isdigit()]
+        except:
+            int_ids = []
+
+        # setDownloadDirectory(String directory, long[] packageIds)
+        endpoint = "/linkgrabberv2/setDownloadDirectory"
+        payload = {"params": [ directory, int_ids ]}
+
+        resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
+        _log_response("Set download directory response", resp)
+        if resp.status_code != 200:
+            logger.error("Setting download directory failed", status=resp.status_code, packages=len(int_ids))
+            return False
+        return True
+
+    @traced(tracer, "jd.add_dlc")
     async def add_dlc(self, file_content: bytes) -> str:
-        async with httpx.AsyncClient() as client:
-            # /linkgrabberv2/addContainer usually takes the raw string content of the DLC if valid
-            # Or mapped as "content" param. 
-            # Reference: https://my.jdownloader.org/developers/#tag_linkgrabberv2
-            # It seems addContainer accepts "String type, String content".
-            # "type" is usually "DLC".
+        client = self._get_client()
+        # /linkgrabberv2/addContainer usually takes the raw string content of the DLC if valid
+        # Or mapped as "content" param. 
+        # Reference: https://my.jdownloader.org/developers/#tag_linkgrabberv2
+        # It seems addContainer accepts "String type, String content".
+        # "type" is usually "DLC".
             
-            # However some JD APIs accept base64. Let's try raw text first as DLC is ASCII/XML-ish but often binary.
-            # Actually DLC is encrypted binary. It should be passed as a string (Base64 is safest).
+        # However some JD APIs accept base64. Let's try raw text first as DLC is ASCII/XML-ish but often binary.
+        # Actually DLC is encrypted binary. It should be passed as a string (Base64 is safest).
             
-            import base64
-            b64_content = base64.b64encode(file_content).decode('ascii')
+        import base64
+        b64_content = base64.b64encode(file_content).decode('ascii')
             
-            endpoint = "/linkgrabberv2/addContainer"
-            # Signature: addContainer(String type, String content)
-            payload = {"params": ["DLC", b64_content]}
+        endpoint = "/linkgrabberv2/addContainer"
+        # Signature: addContainer(String type, String content)
+        payload = {"params": ["DLC", b64_content]}
             
-            print(f"[JD-API] Adding DLC: {endpoint}")
-            resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
-            print(f"[JD-API] Add DLC Response: {resp.status_code} | {resp.text}")
+        logger.info("Adding DLC", endpoint=endpoint, size=len(file_content))
+        resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
+        _log_response("Add DLC response", resp)
             
-            if resp.status_code == 200:
-                return "ok"
-            else:
-                 # Fallback trial: LinkCollector logic?
-                 return f"error: {resp.text}"
+        if resp.status_code == 200:
+            return "ok"
+        else:
+             # Fallback trial: LinkCollector logic?
+             return f"error: {resp.text}"
 
+    @traced(tracer, "jd.restart_jd")
     async def restart_jd(self) -> None:
-        async with httpx.AsyncClient() as client:
-            print(f"[JD-API] Restarting JDownloader: {self.base_url}/system/restartJD")
-            # /system/restartJD
-            await client.post(f"{self.base_url}/system/restartJD")
-
+        client = self._get_client()
+        logger.info("Restarting JDownloader", url=self.base_url)
+        # /system/restartJD
+        await client.post(f"{self.base_url}/system/restartJD")
+        # The next call re-discovers the (possibly updated) instance's dialects
+        self._dialects.reset()
+
+    @traced(tracer, "jd.shutdown_jd")
     async def shutdown_jd(self) -> None:
-        async with httpx.AsyncClient() as client:
-            print(f"[JD-API] Shutting down JDownloader: {self.base_url}/system/exitJD")
-            # /system/exitJD
-            await client.post(f"{self.base_url}/system/exitJD")
+        client = self._get_client()
+        logger.info("Shutting down JDownloader", url=self.base_url)
+        # /system/exitJD
+        await client.post(f"{self.base_url}/system/exitJD")
+        # The next call re-discovers the (possibly updated) instance's dialects
+        self._dialects.reset()
 
     # _check_tcp_sync removed (deprecated/unused in favor of Smart Status logic)
 
+    @traced(tracer, "jd.get_myjd_connection_status")
     async def get_myjd_connection_status(self) -> dict:
-        async with httpx.AsyncClient() as client:
-            # Helper to make RPC calls
-            async def call_rpc(endpoint: str, params: list = None):
-                payload = {"params": params} if params is not None else {}
-                resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
-                resp.raise_for_status()
-                return resp.json()
-
-            # Helper to get config value
-            async def get_jd_config(iface: str, storage: str, key: str):
-                payload = {"params": [iface, storage, key]}
-                resp = await client.post(f"{self.base_url}/config/get", json=payload)
-                resp.raise_for_status()
-                return resp.json().get("data")
+        client = self._get_client()
+        # Helper to make RPC calls
+        async def call_rpc(endpoint: str, params: list = None):
+            payload = {"params": params} if params is not None else {}
+            resp = await client.post(f"{self.base_url}{endpoint}", json=payload)
+            resp.raise_for_status()
+            return resp.json()
 
-            try:
-                iface = "org.jdownloader.api.myjdownloader.MyJDownloaderSettings"
+        # Helper to get config value
+        async def get_jd_config(iface: str, storage: str, key: str):
+            payload = {"params": [iface, storage, key]}
+            resp = await client.post(f"{self.base_url}/config/get", json=payload)
+            resp.raise_for_status()
+            return resp.json().get("data")
+
+        try:
+            iface = "org.jdownloader.api.myjdownloader.MyJDownloaderSettings"
                 
-                # 1. Check AutoConnect
-                auto_connect = await get_jd_config(iface, None, "AutoConnectEnabledV2")
-                if auto_connect is False: # Explicit False check
-                    return {"online": False, "status": "MyJD Disabled (AutoConnect Off)"}
-
-                # 2. Check Device Name
-                device_name = await get_jd_config(iface, None, "DeviceName")
-                if not device_name:
-                    return {"online": False, "status": "Not Configured (No Device Name)"}
-
-                # 3. Check Latest Error
-                latest_error = await get_jd_config(iface, None, "LatestError")
-                if latest_error and str(latest_error) not in ["{}", "NONE", "null", "None"]:
-                     return {"online": False, "status": f"Error: {latest_error}"}
-
-                # 4. Check Direct Connection
-                # This helps distinguish "Online" from "Relay" or "Offline" better than just DeviceName
-                try:
-                    direct_resp = await call_rpc("/device/getDirectConnectionInfos")
-                    direct_mode = direct_resp.get("data", {}).get("mode", "NONE")
+            # 1. Check AutoConnect
+            auto_connect = await get_jd_config(iface, None, "AutoConnectEnabledV2")
+            if auto_connect is False: # Explicit False check
+                return {"online": False, "status": "MyJD Disabled (AutoConnect Off)"}
+
+            # 2. Check Device Name
+            device_name = await get_jd_config(iface, None, "DeviceName")
+            if not device_name:
+                return {"online": False, "status": "Not Configured (No Device Name)"}
+
+            # 3. Check Latest Error
+            latest_error = await get_jd_config(iface, None, "LatestError")
+            if latest_error and str(latest_error) not in ["{}", "NONE", "null", "None"]:
+                 return {"online": False, "status": f"Error: {latest_error}"}
+
+            # 4. Check Direct Connection
+            # This helps distinguish "Online" from "Relay" or "Offline" better than just DeviceName
+            try:
+                direct_resp = await call_rpc("/device/getDirectConnectionInfos")
+                direct_mode = direct_resp.get("data", {}).get("mode", "NONE")
                     
-                    if direct_mode != "NONE":
-                        return {"online": True, "status": f"Connected (Direct: {direct_mode})"}
-                except Exception:
-                    pass
-
-                # Fallback: We have a device name and no error, but no direct connection.
-                # It could be Relay (Connected) or Offline (but no error reported yet).
-                # We return "Online" to be optimistic like the user wanted, but clarify status.
-                return {"online": True, "status": f"Device: {device_name}"}
-
-            except Exception as e:
-                return {"online": False, "status": f"Disconnected ({str(e)})"}
+                if direct_mode != "NONE":
+                    return {"online": True, "status": f"Connected (Direct: {direct_mode})"}
+            except Exception:
+                pass
+
+            # Fallback: We have a device name and no error, but no direct connection.
+            # It could be Relay (Connected) or Offline (but no error reported yet).
+            # We return "Online" to be optimistic like the user wanted, but clarify status.
+            return {"online": True, "status": f"Device: {device_name}"}
+
+        except Exception as e:
+            return {"online": False, "status": f"Disconnected ({str(e)})"}
@@ -2,9 +2,12 @@ import asyncio
 import random
 from uuid import uuid4
 
+from src.core.log import get_logger
 from src.domain.models import DownloadStatus, Link, Package
 from src.infrastructure.api_interface import JDownloaderAPI
 
+logger = get_logger("jd")
+
 
 class MockJDownloaderAPI(JDownloaderAPI):
     def __init__(self):
@@ -51,7 +54,7 @@ class MockJDownloaderAPI(JDownloaderAPI):
             )
         ]
 
-    async def add_links(self, links: list[str], package_name: str = "New Package"):
+    async def add_links(self, links: list[str], package_name: str = "New Package", progress=None):
         await asyncio.sleep(0.2)
         pkg_id = str(uuid4())
         new_links = []
@@ -59,6 +62,8 @@ class MockJDownloaderAPI(JDownloaderAPI):
             new_links.append(Link(uuid=str(uuid4()), name=url.split("/")[-1] or "file", url=url, host="unknown", bytes_total=random.randint(1000000, 100000000)))
             
         self._packages[pkg_id] = Package(uuid=pkg_id, name=package_name, links=new_links)
+        if progress is not None:
+            progress(len(links), len(links))
         return pkg_id
 
     async def start_downloads(self):
@@ -78,9 +83,9 @@ class MockJDownloaderAPI(JDownloaderAPI):
         # For simplicity, we just clear the list in mock or log it
         pass
 
-    async def move_to_dl(self, package_ids: list[str]) -> None:
+    async def move_to_dl(self, package_ids: list[str]) -> bool:
         # Mock move
-        pass
+        return True
 
     async def get_help(self) -> str:
         return """
@@ -101,18 +106,18 @@ class MockJDownloaderAPI(JDownloaderAPI):
         # Mock remove
         pass
 
-    async def set_download_directory(self, package_ids: list[str], directory: str) -> None:
-        pass
+    async def set_download_directory(self, package_ids: list[str], directory: str) -> bool:
+        return True
 
     async def add_dlc(self, file_content: bytes) -> str:
         return "ok"
 
     async def restart_jd(self) -> None:
-        print("[Mock] Restarting JD")
+        logger.info("Restarting JDownloader (mock)")
         pass
 
     async def shutdown_jd(self) -> None:
-        print("[MockJD] Shutting down...")
+        logger.info("Shutting down JDownloader (mock)")
 
     async def get_myjd_connection_status(self) -> dict:
         return {"online": True, "status": "Connected (Mock)"}
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from array import array
+
+from src.domain.snapshot import Snapshot
+from src.domain.store import NO_STRING, StringPool
+
+# Relevance of a match by field, multiplied by how well the term matches the text
+FIELD_WEIGHTS = {"package": 4.0, "name": 3.0, "host": 2.0, "url": 1.0}
+EXACT, PREFIX, SUBSTRING = 2.0, 1.5, 1.0
+
+# Matched links returned per package
+MAX_LINKS_PER_RESULT = 20
+
+
+class TrigramIndex:
+    """
+    Grow-only trigram index over distinct strings (package names, link names, urls, hosts).
+
+    Each string is indexed once, when it is first seen; unchanged lists therefore cost
+    nothing to keep indexed. Postings are compact int arrays of string ids.
+    """
+
+    def __init__(self):
+        self.folded: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._postings: dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.folded)
+
+    def add(self, text: str) -> int:
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = len(self.folded)
+            folded = text.casefold()
+            self._ids[text] = sid
+            self.folded.append(folded)
+            postings = self._postings
+            for gram in {folded[i:i + 3] for i in range(len(folded) - 2)}:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("i")
+                posting.append(sid)
+        return sid
+
+    def matching(self, term: str) -> list[int]:
+        """Ids of all indexed strings containing `term` (case-insensitive)."""
+        term = term.casefold()
+        if len(term) < 3:
+            candidates = range(len(self.folded))
+        else:
+            # Verify the rarest trigram's posting list instead of intersecting all of them
+            candidates = None
+            for i in range(len(term) - 2):
+                posting = self._postings.get(term[i:i + 3])
+                if posting is None:
+                    return []
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+        folded = self.folded
+        return [sid for sid in candidates if term in folded[sid]]
+
+
+class SearchView:
+    """Which packages and links of one snapshot use each indexed string."""
+
+    def __init__(self, index: SearchIndex, snapshot: Snapshot):
+        self.generation = index.generation
+        store = snapshot.store
+        trigrams = index.trigrams
+        # string id -> [(package index, link index or -1, field)]
+        postings: dict[int, list[tuple[int, int, str]]] = {}
+
+        for p, name in enumerate(store.pkg_name):
+            postings.setdefault(trigrams.add(name), []).append((p, -1, "package"))
+
+        pool_ids = index.pool_ids(store.pool)
+        strings = store.pool.strings
+        for field in ("name", "url", "host"):
+            for i, psid in enumerate(getattr(store, field)):
+                if psid == NO_STRING:
+                    continue
+                sid = pool_ids.get(psid)
+                if sid is None:
+                    sid = pool_ids[psid] = trigrams.add(strings[psid])
+                postings.setdefault(sid, []).append((store.package[i], i, field))
+        self.postings = postings
+
+
+class SearchIndex:
+    """
+    Ranked substring search over package names, link names, urls and hosts.
+
+    Every term must match some field of a package; packages are ranked by the sum of
+    their best match per term (field weight x exact/prefix/substring).
+    """
+
+    def __init__(self, max_strings: int = 1_000_000):
+        self.max_strings = max_strings
+        self.generation = 0
+        self.trigrams = TrigramIndex()
+        # Store pool id -> index string id, per pool (delta snapshots share their pool)
+        self._pool_ids: weakref.WeakKeyDictionary[StringPool, dict[int, int]] = weakref.WeakKeyDictionary()
+        self._lock = asyncio.Lock()
+
+    def pool_ids(self, pool: StringPool) -> dict[int, int]:
+        ids = self._pool_ids.get(pool)
+        if ids is None:
+            ids = self._pool_ids[pool] = {}
+        return ids
+
+    def has_view(self, snapshot: Snapshot) -> bool:
+        return "search" in snapshot._query_cache
+
+    async def view(self, snapshot: Snapshot) -> SearchView:
+        """The snapshot's search view, built once (off the event loop) and cached on the snapshot."""
+        view = snapshot._query_cache.get("search")
+        if view is not None and view.generation == self.generation:
+            return view
+        async with self._lock:
+            view = snapshot._query_cache.get("search")
+            if view is not None and view.generation == self.generation:
+                return view
+            if len(self.trigrams) > self.max_strings:
+                # Strings of removed links are never dropped; start over once the index outgrows its bound
+                self.generation += 1
+                self.trigrams = TrigramIndex()
+                self._pool_ids = weakref.WeakKeyDictionary()
+            view = await asyncio.to_thread(SearchView, self, snapshot)
+            snapshot._query_cache["search"] = view
+            return view
+
+    async def search(self, snapshots: list[Snapshot], query: str, limit: int = 50) -> tuple[int, list[dict]]:
+        """Return (number of matching packages, top `limit` results) across the given lists."""
+        terms = query.split()
+        if not terms:
+            return 0, []
+        views = [(snapshot, await self.view(snapshot)) for snapshot in snapshots]
+        async with self._lock:
+            # No view is being built (in a thread) while the postings are read
+            matches = [m for snapshot, view in views for m in self._match(snapshot, view, terms)]
+
+        matches.sort(key=lambda m: (-m[0], m[1].store.pkg_name[m[2]].casefold()))
+        results = []
+        for score, snapshot, package, links in matches[:limit]:
+            store = snapshot.store
+            data = store.package_dict(package, include_links=False)
+            data["links"] = [store.link_dict(i) for i in sorted(links)[:MAX_LINKS_PER_RESULT]]
+            results.append({"kind": snapshot.kind, "score": round(score, 3), "package": data})
+        return len(matches), results
+
+    def _match(self, snapshot: Snapshot, view: SearchView, terms: list[str]) -> list[tuple]:
+        folded = self.trigrams.folded
+        # package index -> (score, matched link indices)
+        found: dict[int, tuple[float, set[int]]] | None = None
+        for term in terms:
+            term_folded = term.casefold()
+            term_found: dict[int, tuple[float, set[int]]] = {}
+            for sid in self.trigrams.matching(term):
+                postings = view.postings.get(sid)
+                if not postings:
+                    continue
+                text = folded[sid]
+                quality = EXACT if text == term_folded else PREFIX if text.startswith(term_folded) else SUBSTRING
+                for package, link, field in postings:
+                    score, links = term_found.get(package, (0.0, set()))
+                    if link >= 0:
+                        links.add(link)
+                    term_found[package] = (max(score, FIELD_WEIGHTS[field] * quality), links)
+            if found is None:
+                found = term_found
+            else:
+                found = {
+                    p: (score + term_found[p][0], links | term_found[p][1])
+                    for p, (score, links) in found.items() if p in term_found
+                }
+            if not found:
+                break
+        return [(score, snapshot, package, links) for package, (score, links) in (found or {}).items()]
@@ -0,0 +1,301 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+from opentelemetry import trace
+
+from src.core import metrics
+from src.core.config import settings
+from src.core.log import get_logger
+from src.domain.eta import EtaEstimator
+from src.domain.snapshot import DOWNLOADS, LIST_KINDS, Snapshot
+from src.domain.timeseries import TimeSeriesStore, samples_from_stats
+from src.infrastructure.api_interface import JDownloaderAPI
+from src.infrastructure.change_stream import Subscription, diff_snapshots
+from src.infrastructure.search_index import SearchIndex
+
+logger = get_logger("snapshot")
+tracer = trace.get_tracer(__name__)
+
+
+class SnapshotService:
+    """
+    In-memory cache of the latest downloads/LinkGrabber snapshots.
+
+    A single background task refreshes the lists that are being read, so JD load stays
+    the same no matter how many dashboards poll. Reads never see data older than
+    max_staleness, and mutating calls invalidate a list so the next read is fresh.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = settings.JD_SNAPSHOT_REFRESH_INTERVAL,
+        max_staleness: float = settings.JD_SNAPSHOT_MAX_STALENESS,
+        idle_timeout: float = settings.JD_SNAPSHOT_IDLE_TIMEOUT,
+    ):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.idle_timeout = idle_timeout
+
+        self._api: JDownloaderAPI | None = None
+        self._snapshots: dict[str, Snapshot] = {}
+        # The snapshot the API last returned per list (it returns the same one while JD's rows
+        # are unchanged, which the served snapshot replaces when only the ETAs moved on)
+        self._upstream: dict[str, Snapshot] = {}
+        # When each list was last checked against JD (an unchanged list keeps its old snapshot)
+        self._fetched_at: dict[str, float] = {}
+        self._dirty: set[str] = set()
+        # Package-level views (include_links=False) with the time they were fetched
+        self._summaries: dict[str, tuple[Snapshot, float]] = {}
+        self._last_read: dict[str, float] = {}
+        self._locks = {kind: asyncio.Lock() for kind in LIST_KINDS}
+        self._wakeup = asyncio.Event()
+
+        # JD online / MyJD status, cached for one refresh interval
+        self._status: dict | None = None
+        self._status_at = 0.0
+        self._status_lock = asyncio.Lock()
+
+        # Live change streams (SSE clients)
+        self._subscribers: set[Subscription] = set()
+        self._published_status: dict | None = None
+
+        # Full-text search over the cached lists
+        self.search_index = SearchIndex(max_strings=settings.SEARCH_INDEX_MAX_STRINGS)
+
+        # Throughput history, sampled from every downloads refresh
+        self.history = TimeSeriesStore(max_series=settings.STATS_HISTORY_MAX_SERIES)
+        self.history_interval = settings.STATS_HISTORY_INTERVAL
+
+        # Smoothed ETAs, carried across downloads refreshes
+        self.eta = EtaEstimator(half_life=settings.ETA_HALF_LIFE, idle_timeout=settings.ETA_IDLE_TIMEOUT)
+        self._background: set[asyncio.Task] = set()
+
+    def _bind(self, api: JDownloaderAPI) -> None:
+        # Settings changes swap the API instance; never serve data from the old one
+        if api is not self._api:
+            self._api = api
+            self._snapshots.clear()
+            self._upstream.clear()
+            self._fetched_at.clear()
+            self._dirty.clear()
+            self._summaries.clear()
+            self._status = None
+            self.eta.reset()
+            for subscription in self._subscribers:
+                for kind in LIST_KINDS:
+                    subscription.request_resync(kind)
+
+    def _is_fresh(self, kind: str) -> bool:
+        snapshot = self._snapshots.get(kind)
+        return (
+            snapshot is not None
+            and kind not in self._dirty
+            and time.monotonic() - self._fetched_at.get(kind, float("-inf")) <= self.max_staleness
+        )
+
+    async def get(self, api: JDownloaderAPI, kind: str, include_links: bool = True) -> Snapshot:
+        """
+        Return the cached snapshot of a list, refreshing it first if it is stale or invalidated.
+
+        With include_links=False a fresh full snapshot is still preferred; otherwise a
+        package-level view is fetched (no link queries) and cached separately. Such reads
+        do not keep the full list warm in the background.
+        """
+        self._bind(api)
+        if include_links:
+            self._last_read[kind] = time.monotonic()
+        if self._is_fresh(kind):
+            return self._snapshots[kind]
+        if include_links:
+            return await self.refresh(api, kind, force=False)
+
+        async with self._locks[kind]:
+            cached = self._summaries.get(kind)
+            if cached is not None and time.monotonic() - cached[1] <= self.max_staleness:
+                return cached[0]
+            if self._is_fresh(kind):
+                return self._snapshots[kind]
+            snapshot = await api.get_snapshot(kind, include_links=False)
+            if self._api is api:
+                if kind == DOWNLOADS and not snapshot.include_links:
+                    self.eta.update_packages(snapshot.store, snapshot.taken_at)
+                self._summaries[kind] = (snapshot, time.monotonic())
+            return snapshot
+
+    def peek(self, kind: str) -> Snapshot | None:
+        """The cached snapshot of a list (however old), without touching JD."""
+        return self._snapshots.get(kind)
+
+    def cached(self, api: JDownloaderAPI, kind: str) -> Snapshot | None:
+        """
+        The cached snapshot of a list if it came from `api`, without touching JD. The list
+        counts as read, so the background refresher fetches it (if missing) and keeps it fresh.
+        """
+        self._last_read[kind] = time.monotonic()
+        snapshot = self._snapshots.get(kind) if api is self._api else None
+        if snapshot is None:
+            self._wakeup.set()
+        return snapshot
+
+    async def refresh(self, api: JDownloaderAPI, kind: str, force: bool = True) -> Snapshot:
+        # A trace of its own when run by the background refresher, part of the request otherwise
+        with tracer.start_as_current_span("snapshot.refresh", attributes={"jd.list": kind}):
+            return await self._refresh(api, kind, force)
+
+    async def _refresh(self, api: JDownloaderAPI, kind: str, force: bool) -> Snapshot:
+        self._bind(api)
+        async with self._locks[kind]:
+            # Concurrent readers wait for a single upstream fetch instead of each issuing one
+            if not force and self._is_fresh(kind):
+                return self._snapshots[kind]
+            self._dirty.discard(kind)
+            start = time.perf_counter()
+            try:
+                snapshot = await api.get_snapshot(kind)
+            except Exception:
+                self._dirty.add(kind)
+                metrics.SNAPSHOT_REFRESH_FAILURES.labels(kind).inc()
+                raise
+            metrics.SNAPSHOT_REFRESH_LATENCY.labels(kind).observe(time.perf_counter() - start)
+            if self._api is api:
+                previous = self._snapshots.get(kind)
+                unchanged = snapshot is self._upstream.get(kind)
+                self._upstream[kind] = snapshot
+                if unchanged and previous is not None:
+                    snapshot = previous
+                if kind == DOWNLOADS:
+                    snapshot = self._update_etas(snapshot, unchanged)
+                self._snapshots[kind] = snapshot
+                self._fetched_at[kind] = time.monotonic()
+                if kind == DOWNLOADS:
+                    self.history.record(time.time(), samples_from_stats(snapshot.stats()))
+                if previous is not None and previous is not snapshot:
+                    # Keep the sort orders clients use ready before they ask again
+                    snapshot.warm(previous)
+                    if self.search_index.has_view(previous):
+                        # Index the new snapshot in the background so searches stay fast
+                        task = asyncio.create_task(self.search_index.view(snapshot))
+                        self._background.add(task)
+                        task.add_done_callback(self._background.discard)
+                    self._publish(previous, snapshot)
+            return snapshot
+
+    def _update_etas(self, snapshot: Snapshot, unchanged: bool) -> Snapshot:
+        """
+        Fill in smoothed ETAs before anyone reads (or encodes) a new downloads snapshot. An
+        unchanged one is still advanced to the refresh time, so stalled downloads lose their
+        ETA; if that changes any ETA, a new version with its own ETA columns is served.
+        """
+        if not unchanged:
+            self.eta.update(snapshot.store, snapshot.taken_at)
+            return snapshot
+        if not self.eta.active:
+            return snapshot
+        now = time.time()
+        store = snapshot.store.copy_etas()
+        self.eta.update(store, now)
+        if store.same_etas(snapshot.store):
+            return snapshot
+        return Snapshot(kind=snapshot.kind, store=store, include_links=snapshot.include_links, taken_at=now)
+
+    def subscribe(self) -> Subscription:
+        """Register a live change stream; it receives package deltas and status transitions."""
+        subscription = Subscription(max_pending=settings.STREAM_MAX_PENDING_PACKAGES)
+        self._subscribers.add(subscription)
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _publish(self, previous: Snapshot, snapshot: Snapshot) -> None:
+        if not self._subscribers:
+            return
+        # Diff once per refresh, shared by all connections
+        upserts, removed, order = diff_snapshots(previous, snapshot)
+        if not upserts and not removed and order is None:
+            return
+        for subscription in self._subscribers:
+            subscription.push_delta(snapshot.kind, previous.version, snapshot.version, upserts, removed, order)
+
+    def invalidate(self, *kinds: str) -> None:
+        """Mark lists as changed (after a mutating JD call) and wake the refresher."""
+        kinds = kinds or LIST_KINDS
+        self._dirty.update(kinds)
+        for kind in kinds:
+            self._summaries.pop(kind, None)
+        self._wakeup.set()
+
+    async def get_jd_status(self, api: JDownloaderAPI) -> dict:
+        """JD reachability and MyJD connection status, shared by all status polls."""
+        self._bind(api)
+        async with self._status_lock:
+            if self._status is not None and time.monotonic() - self._status_at <= self.refresh_interval:
+                return self._status
+
+            jd_online = False
+            myjd_status = {"online": False, "status": "Unknown"}
+            try:
+                # Simple check, help or version
+                await api.get_help()
+                jd_online = True
+            except Exception:
+                logger.debug("JD unreachable", exc_info=True)
+                jd_online = False
+
+            if jd_online:
+                try:
+                    # Get detailed MyJD Status
+                    myjd_status = await api.get_myjd_connection_status()
+                except Exception:
+                    logger.debug("MyJD status unavailable", exc_info=True)
+                    myjd_status = {"online": False, "status": "Unknown (Error)"}
+
+            self._status = {"jd_online": jd_online, "myjd_connection": myjd_status}
+            self._status_at = time.monotonic()
+            return self._status
+
+    async def run(self, api_provider: Callable[[], JDownloaderAPI]) -> None:
+        """
+        Background refresh loop; only lists read within idle_timeout are kept warm, except that
+        downloads are sampled every history_interval for the throughput history.
+        """
+        logger.info("Snapshot refresher started", interval=self.refresh_interval)
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            now = time.monotonic()
+            for kind in LIST_KINDS:
+                history_due = (
+                    kind == DOWNLOADS and self.history_interval > 0
+                    and now - self._fetched_at.get(kind, float("-inf")) >= self.history_interval
+                )
+                idle = now - self._last_read.get(kind, float("-inf")) > self.idle_timeout
+                if idle and not self._subscribers and not history_due:
+                    continue
+                if kind not in self._dirty and now - self._fetched_at.get(kind, float("-inf")) < self.refresh_interval:
+                    # A reader refreshed it in the meantime
+                    continue
+                try:
+                    await self.refresh(api_provider(), kind)
+                except Exception as e:
+                    logger.debug("Snapshot refresh failed", list=kind, error=str(e), exc_info=True)
+
+            if self._subscribers:
+                try:
+                    status = await self.get_jd_status(api_provider())
+                except Exception as e:
+                    logger.debug("Status refresh failed", error=str(e), exc_info=True)
+                    continue
+                if status != self._published_status:
+                    self._published_status = status
+                    for subscription in self._subscribers:
+                        subscription.push_status(status)
+
+
+snapshot_service = SnapshotService()
@@ -1,30 +1,38 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from opentelemetry import trace
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
 
 from src.api.v1.router import router as api_router
 from src.core.config import settings
+from src.core.log import get_logger, setup_logging
+from src.core.telemetry import child_span, setup_tracing
 
-# Telemetry Setup
-trace.set_tracer_provider(TracerProvider())
-trace.get_tracer_provider().add_span_processor(
-    SimpleSpanProcessor(ConsoleSpanExporter())
-)
+# Logging Setup (structured, written by a background thread; see LOG_* settings)
+setup_logging()
+
+# Telemetry Setup (sampled, batched export; see OTEL_* settings)
+tracer_provider = setup_tracing()
+tracer = trace.get_tracer(__name__)
 
 import asyncio
 import json
-import logging
+import time
 
 
 
-from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+from src.api.deps import close_jd_apis, get_local_jd_api, resolve_jd_api
+from src.api.v1.router import read_buffer_details
+from src.core import metrics
+from src.domain.snapshot import LINKGRABBER
+from src.infrastructure.api_interface import add_failed
+from src.infrastructure.jobs import job_manager
+from src.infrastructure.link_index import duplicate_index, filter_duplicates
+from src.infrastructure.snapshot_service import snapshot_service
 
-logger = logging.getLogger(__name__)
+logger = get_logger("replay")
 
 
 
@@ -41,13 +49,7 @@ def get_data_dir() -> Path:
 async def check_and_replay_links():
     buffer_file = get_data_dir() / "link_buffer.json"
 
-    logger.info(f"CNL Replay Task Started. Buffer: {buffer_file}")
-    
-    # Use settings_manager to get current URL (including runtime changes)
-    from src.infrastructure.settings_manager import settings_manager
-    current_settings = settings_manager.load_settings()
-    api = LocalJDownloaderAPI(current_settings.api_url)
-    
+    logger.info("CNL replay task started", buffer=str(buffer_file))
     
     # DLC Buffer Setup
     buffer_dir = get_data_dir() / "buffer"
@@ -57,6 +59,9 @@ async def check_and_replay_links():
     while True:
         await asyncio.sleep(5)
         try:
+            # The API the rest of the app uses (picks up runtime settings changes)
+            api = resolve_jd_api()
+
             # Check if JD is online (local API reachable)
             is_online = False
             try:
@@ -72,7 +77,7 @@ async def check_and_replay_links():
                      elif "status" in status: # Fallback
                         is_online = True
             except Exception as e:
-                logger.debug(f"Replayer online check failed: {e}")
+                logger.debug("Replayer online check failed", error=str(e))
                 pass
                 
             if is_online:
@@ -86,78 +91,112 @@ async def check_and_replay_links():
                         pass
                     
                     if buffer_data:
-                        logger.info(f"JD Online. Replaying {len(buffer_data)} buffered packages...")
-                        all_success = True
-                        for entry in buffer_data:
-                            # Handle both old format (list of strings) and new format (package objects)
-                            if isinstance(entry, dict):
-                                pkg_name = entry.get("package", "CNL Package")
-                                links = entry.get("links", [])
-                            else:
-                                # Legacy: plain string (single link)
-                                pkg_name = None
-                                links = [entry] if isinstance(entry, str) else entry
+                        # Only replays that have work are traced (the idle loop would flood the exporter)
+                        with tracer.start_as_current_span("buffer.replay", attributes={"buffer.packages": len(buffer_data)}):
+                            logger.info("JD online, replaying buffered packages", packages=len(buffer_data))
+                            all_success = True
+                            for entry in buffer_data:
+                                # Handle both old format (list of strings) and new format (package objects)
+                                if isinstance(entry, dict):
+                                    pkg_name = entry.get("package", "CNL Package")
+                                    links = entry.get("links", [])
+                                else:
+                                    # Legacy: plain string (single link)
+                                    pkg_name = None
+                                    links = [entry] if isinstance(entry, str) else entry
                             
-                            if links:
-                                # Sanitize links to prevent TypeError if buffer contains objects
-                                # (e.g. from older bugs or malformed data)
-                                sanitized_links = []
-                                for link_item in links:
-                                    if isinstance(link_item, str):
-                                        sanitized_links.append(link_item)
-                                    elif isinstance(link_item, dict) and "url" in link_item:
-                                        sanitized_links.append(str(link_item["url"]))
-                                    # Ignore others
-                                links = sanitized_links
+                                if links:
+                                    # Sanitize links to prevent TypeError if buffer contains objects
+                                    # (e.g. from older bugs or malformed data)
+                                    sanitized_links = []
+                                    for link_item in links:
+                                        if isinstance(link_item, str):
+                                            sanitized_links.append(link_item)
+                                        elif isinstance(link_item, dict) and "url" in link_item:
+                                            sanitized_links.append(str(link_item["url"]))
+                                        # Ignore others
+                                    links = sanitized_links
                                 
-                                if not links:
-                                    # If no valid links left, mark as success so we don't retry empty forever
-                                    continue
-
-                                try:
-                                    res = await api.add_links(links, package_name=pkg_name)
-                                    if "ok" not in res and "success" not in res:
-                                        logger.error(f"Replay failed for {pkg_name}: {res}")
+                                    if not links:
+                                        # If no valid links left, mark as success so we don't retry empty forever
+                                        continue
+
+                                    # Links an earlier, partly failed replay already got into JD are not sent again
+                                    links, _ = await filter_duplicates(api, links, via="replay")
+                                    if not links:
+                                        continue
+
+                                    try:
+                                        res = await api.add_links(links, package_name=pkg_name)
+                                        if add_failed(res):
+                                            logger.error("Replay failed", package=pkg_name, result=res)
+                                            all_success = False
+                                            metrics.REPLAY_FAILURES.labels("packages", "auto").inc()
+                                        else:
+                                            duplicate_index.remember(links)
+                                            metrics.REPLAYED.labels("packages", "auto").inc()
+                                            metrics.REPLAYED.labels("links", "auto").inc(len(links))
+                                    except Exception as e:
+                                        logger.error("Failed to replay package", package=pkg_name, error=str(e))
                                         all_success = False
-                                except Exception as e:
-                                    logger.error(f"Failed to replay package {pkg_name}: {e}")
-                                    all_success = False
+                                        metrics.REPLAY_FAILURES.labels("packages", "auto").inc()
                         
-                        if all_success:
-                            with open(buffer_file, "w") as f:
-                                json.dump([], f)
-                            logger.info("Link Buffer cleared.")
+                            snapshot_service.invalidate(LINKGRABBER)
+                            if all_success:
+                                with child_span(tracer, "buffer.write"), open(buffer_file, "w") as f:
+                                    json.dump([], f)
+                                logger.info("Link buffer cleared")
 
                 # 2. Process DLC Buffer
                 if os.path.exists(buffer_dir):
                     for filename in os.listdir(buffer_dir):
                         if filename.endswith(".dlc"):
                             file_path = os.path.join(buffer_dir, filename)
-                            logger.info(f"Replaying buffered DLC: {filename}")
-                            try:
-                                with open(file_path, "rb") as f:
-                                    content = f.read()
-                                res = await api.add_dlc(content)
-                                if res == "ok":
-                                    os.remove(file_path)
-                                    logger.info(f"DLC {filename} replayed and removed.")
-                            except Exception as e:
-                                logger.error(f"Failed to replay DLC {filename}: {e}")
+                            logger.info("Replaying buffered DLC", file=filename)
+                            with tracer.start_as_current_span("buffer.replay_dlc", attributes={"buffer.file": filename}):
+                                try:
+                                    with child_span(tracer, "buffer.read"), open(file_path, "rb") as f:
+                                        content = f.read()
+                                    res = await api.add_dlc(content)
+                                    if res == "ok":
+                                        snapshot_service.invalidate(LINKGRABBER)
+                                        os.remove(file_path)
+                                        logger.info("DLC replayed and removed", file=filename)
+                                        metrics.REPLAYED.labels("dlc_files", "auto").inc()
+                                    else:
+                                        metrics.REPLAY_FAILURES.labels("dlc_files", "auto").inc()
+                                except Exception as e:
+                                    logger.error("Failed to replay DLC", file=filename, error=str(e))
+                                    metrics.REPLAY_FAILURES.labels("dlc_files", "auto").inc()
 
         except Exception as e:
-            logger.error(f"Replay Task Error: {e}")
+            logger.error("Replay task error", error=str(e))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    
+
+    # 0. Open the shared JD connection pool for the configured URL
+    get_local_jd_api().open()
+
     # 1. Start Replay Loop
     task = asyncio.create_task(check_and_replay_links())
     background_tasks.add(task)
     task.add_done_callback(background_tasks.discard)
+
+    # 2. Start Snapshot Refresher (single upstream poller for all dashboards)
+    task = asyncio.create_task(snapshot_service.run(resolve_jd_api))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
     
     yield
     # Shutdown
+    for task in list(background_tasks):
+        task.cancel()
+    await job_manager.shutdown()
+    await close_jd_apis()
+    # Flush the spans still waiting in the batch queue (queued log records are flushed at exit)
+    tracer_provider.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -173,8 +212,37 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Snapshot", "X-Snapshot-Taken-At", "X-Total-Count"],
     )
 
+def route_template(scope: dict) -> str:
+    """Route template of a handled request, e.g. /api/v1/buffer/package/{index}."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # Included routers keep their own relative paths: recover the (literal) prefix they were mounted under
+    path = scope["path"][len(scope.get("root_path", "")):]
+    start = 0
+    while start != -1 and not route.path_regex.match(path[start:]):
+        start = path.find("/", start + 1)
+    return scope.get("root_path", "") + (path[:start] if start > 0 else "") + template
+
+
+# Per-route latency (labelled by route template, so path parameters don't explode cardinality)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = route_template(request.scope)
+        metrics.HTTP_REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - start)
+        metrics.HTTP_REQUESTS.labels(request.method, route, str(status_code)).inc()
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # Mount CNL Receiver for Remote Extension Access
@@ -185,6 +253,19 @@ app.mount("/cnl", src.cnl.receiver.app)
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    # Buffer depth is read when scraped instead of tracked at every buffer write
+    details = read_buffer_details()
+    packages = details["packages"] if isinstance(details["packages"], list) else []
+    metrics.BUFFER_DEPTH.labels("packages").set(len(packages))
+    metrics.BUFFER_DEPTH.labels("links").set(
+        sum(len(entry.get("links", [])) if isinstance(entry, dict) else 1 for entry in packages)
+    )
+    metrics.BUFFER_DEPTH.labels("dlc_files").set(len(details["dlc_files"]))
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/ready")
 def readiness_check():
     return {"status": "ready"}
@@ -214,4 +295,10 @@ from fastapi.staticfiles import StaticFiles
 if os.path.exists("static"):
     app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
-FastAPIInstrumentor.instrument_app(app)
+# One server span per request (no per-chunk send/receive spans); probes and scrapes are not traced
+FastAPIInstrumentor.instrument_app(
+    app,
+    tracer_provider=tracer_provider,
+    excluded_urls="/health$,/ready$,/metrics$",
+    exclude_spans=["receive", "send"],
+)
@@ -0,0 +1,173 @@
+"""API tests against the mock JD backend."""
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import deps
+from src.domain.models import TokenData
+from src.infrastructure.mock_jd_api import MockJDownloaderAPI
+
+
+@pytest.fixture
+def client():
+    from src.infrastructure.snapshot_service import snapshot_service
+    from src.main import app
+
+    api = MockJDownloaderAPI()
+    app.dependency_overrides[deps.get_jd_api] = lambda: api
+    app.dependency_overrides[deps.get_current_user] = lambda: TokenData(username="admin")
+    snapshot_service.invalidate()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_downloads_conditional_get(client):
+    """A matching If-None-Match is answered with 304 and no body."""
+    first = client.get("/api/v1/downloads")
+    assert first.status_code == 200
+    assert first.json()[0]["name"] == "Ubuntu 24.04 ISO"
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/v1/downloads", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+
+def test_buffer_details_conditional_get(client):
+    first = client.get("/api/v1/buffer/details")
+    assert first.status_code == 200
+    second = client.get("/api/v1/buffer/details", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+
+
+def test_downloads_field_projection(client):
+    """fields= trims each package to the selected keys; links only when asked for."""
+    res = client.get("/api/v1/downloads", params={"fields": "uuid,name,loaded_bytes"})
+    assert res.status_code == 200
+    assert set(res.json()[0]) == {"uuid", "name", "loaded_bytes"}
+
+    res = client.get("/api/v1/downloads", params={"include_links": "false"})
+    assert all(p["links"] == [] for p in res.json())
+
+    full = client.get("/api/v1/downloads")
+    assert full.headers["ETag"] != res.headers["ETag"]
+
+    assert client.get("/api/v1/downloads", params={"fields": "uuid,bogus"}).status_code == 400
+
+
+def test_downloads_paging_and_sorting(client):
+    res = client.get("/api/v1/downloads", params={"sort": "-size", "limit": 1})
+    assert res.status_code == 200
+    assert len(res.json()) == 1
+    total = int(res.headers["X-Total-Count"])
+    sizes = sorted((p["total_bytes"] for p in client.get("/api/v1/downloads").json()), reverse=True)
+    assert total == len(sizes)
+    assert res.json()[0]["total_bytes"] == sizes[0]
+
+    assert client.get("/api/v1/downloads", params={"sort": "colour"}).status_code == 400
+    assert client.get("/api/v1/downloads", params={"status": "DANCING"}).status_code == 400
+
+
+def test_metrics_endpoint(client):
+    """/metrics exposes Prometheus text with per-route latency labelled by route template."""
+    client.get("/api/v1/downloads")
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'jdm_http_request_duration_seconds_count{method="GET",route="/api/v1/downloads"}' in body
+    assert 'jdm_buffer_depth{item="links"}' in body
+    assert "jdm_snapshot_refresh_duration_seconds_count" in body
+
+
+def test_batch_endpoint(client):
+    res = client.post("/api/v1/batch", json={"operations": [
+        {"op": "stop"}, {"op": "stop"}, {"op": "remove", "kind": "downloads", "package_ids": ["1", "2"]},
+    ]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["calls"] == 2
+    assert [r["status"] for r in body["results"]] == ["ok", "ok", "ok"]
+
+    assert client.post("/api/v1/batch", json={"operations": []}).status_code == 422
+    assert client.post("/api/v1/batch", json={"operations": [{"op": "move"}]}).status_code == 422
+
+
+def test_confirm_all_reports_steps(client):
+    res = client.post("/api/v1/linkgrabber/confirm-all")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == 1
+    assert body["steps"][-1]["step"] == "move"
+
+
+def test_background_job_is_polled_by_id(client):
+    res = client.post("/api/v1/linkgrabber/delete?background=true", json=["1"])
+    assert res.status_code == 202
+    job = res.json()
+    assert res.headers["Location"] == f"/api/v1/jobs/{job['id']}"
+    assert job["kind"] == "delete"
+
+    polled = client.get(f"/api/v1/jobs/{job['id']}")
+    assert polled.status_code == 200
+    assert polled.json()["id"] == job["id"]
+    assert client.get("/api/v1/jobs/unknown").status_code == 404
+
+
+def test_duplicate_links_are_dropped_unless_allowed(client):
+    ubuntu = "https://releases.ubuntu.com/24.04/ubuntu-24.04-desktop-amd64.iso"
+    # The duplicate check uses the cached lists, as kept warm for an open dashboard
+    client.get("/api/v1/downloads")
+    res = client.post("/api/v1/downloads/links", json=[ubuntu])
+    assert res.json() == "duplicate"
+    assert res.headers["X-Duplicate-Links"] == "1"
+
+    res = client.post("/api/v1/downloads/links?allow_duplicates=true", json=[ubuntu])
+    assert res.json() != "duplicate"
+    assert "X-Duplicate-Links" not in res.headers
+
+
+def test_stream_ticket_is_only_valid_for_the_stream(client):
+    from fastapi import HTTPException
+
+    from src.core.security import create_access_token
+
+    ticket = client.post("/api/v1/stream/ticket").json()["ticket"]
+    assert deps.decode_token(ticket, scope=deps.STREAM_SCOPE).username == "admin"
+    # Neither a login token as ticket nor a ticket as login token
+    login = create_access_token(data={"sub": "admin"})
+    for token, scope in ((ticket, None), (login, deps.STREAM_SCOPE)):
+        with pytest.raises(HTTPException):
+            deps.decode_token(token, scope=scope)
+
+
+def test_add_links_job_reports_progress():
+    import asyncio
+
+    from src.api.v1.router import add_or_buffer_links
+    from src.infrastructure.jobs import Job
+
+    job = Job(kind="add-links")
+    links = ["http://progress.example/1", "http://progress.example/2"]
+    asyncio.run(add_or_buffer_links(MockJDownloaderAPI(), links, job))
+    assert (job.done, job.total) == (2, 2)
+
+
+def test_bulk_delete_job_reports_progress_per_chunk(monkeypatch):
+    import asyncio
+
+    from src.api.v1.router import LINKGRABBER, remove_packages
+    from src.core.config import settings
+    from src.infrastructure.jobs import Job
+
+    calls = []
+
+    class RecordingAPI(MockJDownloaderAPI):
+        async def remove_linkgrabber_packages(self, package_ids):
+            calls.append((package_ids, job.done))
+
+    monkeypatch.setattr(settings, "JD_PACKAGE_CHUNK_SIZE", 2)
+    job = Job(kind="delete")
+    asyncio.run(remove_packages(RecordingAPI(), LINKGRABBER, ["1", "2", "3"], job))
+    assert calls == [(["1", "2"], 0), (["3"], 2)]
+    assert (job.done, job.total) == (3, 3)
@@ -0,0 +1,143 @@
+"""Tests for batched package operations (/batch)."""
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from src.domain.batch import BatchOperation, plan_batch
+from src.infrastructure.batch import run_batch
+from src.infrastructure.mock_jd_api import MockJDownloaderAPI
+
+
+def ops(*specs: dict) -> list[BatchOperation]:
+    return [BatchOperation(**spec) for spec in specs]
+
+
+class RecordingAPI(MockJDownloaderAPI):
+    def __init__(self, fail: str | None = None):
+        super().__init__()
+        self.calls = []
+        self.fail = fail
+
+    def _record(self, name, *args):
+        self.calls.append((name, *args))
+        if name == self.fail:
+            raise RuntimeError("JD unreachable")
+
+    async def remove_linkgrabber_packages(self, package_ids):
+        self._record("remove_linkgrabber", package_ids)
+
+    async def remove_download_packages(self, package_ids):
+        self._record("remove_downloads", package_ids)
+
+    async def set_download_directory(self, package_ids, directory):
+        self._record("set_directory", package_ids, directory)
+        return True
+
+    async def move_to_dl(self, package_ids):
+        self._record("move", package_ids)
+        return self.fail != "reject-move"
+
+    async def start_downloads(self):
+        self._record("start")
+
+    async def add_links(self, links, package_name="New Package"):
+        self._record("add", links, package_name)
+
+
+def test_consecutive_operations_are_merged():
+    groups = plan_batch(ops(
+        {"op": "set-directory", "package_ids": ["1"], "directory": "/a"},
+        {"op": "set-directory", "package_ids": ["2", "1"], "directory": "/a"},
+        {"op": "set-directory", "package_ids": ["3"], "directory": "/b"},
+        {"op": "move", "package_ids": ["1"]},
+        {"op": "move", "package_ids": ["2", "3"]},
+        {"op": "start"},
+        {"op": "start"},
+        {"op": "remove", "kind": "downloads", "package_ids": ["9"]},
+        {"op": "remove", "kind": "linkgrabber", "package_ids": ["8"]},
+    ))
+    assert [(g.op, g.indices, g.package_ids) for g in groups] == [
+        ("set-directory", [0, 1], ["1", "2"]),
+        ("set-directory", [2], ["3"]),
+        ("move", [3, 4], ["1", "2", "3"]),
+        ("start", [5, 6], []),
+        ("remove", [7], ["9"]),
+        ("remove", [8], ["8"]),
+    ]
+
+
+def test_invalid_operations_are_rejected():
+    with pytest.raises(ValidationError):
+        BatchOperation(op="move")
+    with pytest.raises(ValidationError):
+        BatchOperation(op="set-directory", package_ids=["1"])
+    with pytest.raises(ValidationError):
+        BatchOperation(op="explode")
+
+
+def test_run_batch_issues_one_call_per_group():
+    api = RecordingAPI()
+    results, changed = asyncio.run(run_batch(api, ops(
+        {"op": "add", "links": ["http://a/1"], "package_name": "p"},
+        {"op": "add", "links": ["http://a/2", "http://a/1"], "package_name": "p"},
+        {"op": "set-directory", "package_ids": ["1"], "directory": "/a"},
+        {"op": "move", "package_ids": ["1"]},
+        {"op": "move", "package_ids": ["2"]},
+        {"op": "start"},
+    ), default_directory="/default"))
+
+    assert api.calls == [
+        ("add", ["http://a/1", "http://a/2"], "p"),
+        ("set_directory", ["1"], "/a"),
+        # Only the package without an explicit directory gets the default path
+        ("set_directory", ["2"], "/default"),
+        ("move", ["1", "2"]),
+        ("start",),
+    ]
+    assert [r["call"] for r in results] == [0, 0, 1, 2, 2, 3]
+    assert all(r["status"] == "ok" for r in results)
+    assert changed == {"linkgrabber", "downloads"}
+
+
+def test_stop_on_error_skips_the_rest():
+    api = RecordingAPI(fail="move")
+    batch = ops({"op": "move", "package_ids": ["1"]}, {"op": "start"})
+    results, _ = asyncio.run(run_batch(api, batch))
+    assert [r["status"] for r in results] == ["error", "skipped"]
+    assert results[0]["error"] == "JD unreachable"
+    assert ("start",) not in api.calls
+
+    results, _ = asyncio.run(run_batch(RecordingAPI(fail="move"), batch, stop_on_error=False))
+    assert [r["status"] for r in results] == ["error", "ok"]
+
+
+def test_rejected_move_is_an_error():
+    results, _ = asyncio.run(run_batch(RecordingAPI(fail="reject-move"), ops({"op": "move", "package_ids": ["1"]})))
+    assert results[0]["status"] == "error"
+    assert results[0]["error"] == "JD rejected the move to the download list"
+
+
+def test_add_drops_links_jd_or_the_buffer_already_has(tmp_path):
+    buffer_file = tmp_path / "link_buffer.json"
+    buffer_file.write_text('["https://buffered/1"]')
+    ubuntu = "https://releases.ubuntu.com/24.04/ubuntu-24.04-desktop-amd64.iso"
+    api = RecordingAPI()
+    batch = ops({"op": "add", "links": [ubuntu, "https://buffered/1", "https://batch/new"]})
+
+    async def run():
+        from src.infrastructure.snapshot_service import snapshot_service
+
+        # The duplicate check uses the cached lists (as kept warm for an open dashboard)
+        await snapshot_service.refresh(api, "downloads")
+        return await run_batch(api, batch, buffer_file=buffer_file)
+
+    results, _ = asyncio.run(run())
+    assert api.calls == [("add", ["https://batch/new"], "New Package")]
+    assert results[0]["duplicates"] == 2
+
+    # Sent links count as duplicates from now on
+    api.calls.clear()
+    results, _ = asyncio.run(run_batch(api, ops({"op": "add", "links": ["https://batch/new"]}), buffer_file=buffer_file))
+    assert api.calls == []
+    assert results[0] == {"index": 0, "op": "add", "call": 0, "status": "ok", "duplicates": 1}
@@ -0,0 +1,66 @@
+"""Tests for the live change stream (snapshot diffs and per-client coalescing)."""
+import asyncio
+
+from src.domain.models import Link, Package
+from src.domain.snapshot import DOWNLOADS, Snapshot
+from src.infrastructure.change_stream import Subscription, diff_snapshots
+
+
+def make_package(uuid: str, loaded: int = 0) -> Package:
+    link = Link(uuid=f"{uuid}-l", name="file.bin", url="http://host/file.bin", host="host",
+                bytes_total=100, bytes_loaded=loaded)
+    return Package(uuid=uuid, name=f"pkg {uuid}", links=[link], total_bytes=100, loaded_bytes=loaded)
+
+
+def test_diff_reports_changed_added_and_removed_packages():
+    old = Snapshot.from_packages(DOWNLOADS, [make_package("a"), make_package("b"), make_package("c")])
+    new = Snapshot.from_packages(DOWNLOADS, [make_package("a"), make_package("b", loaded=50), make_package("d")])
+
+    upserts, removed, order = diff_snapshots(old, new)
+    assert set(upserts) == {"b", "d"}
+    assert upserts["b"]["links"][0]["bytes_loaded"] == 50
+    assert removed == ["c"]
+    assert order == ["a", "b", "d"]
+
+    upserts, removed, order = diff_snapshots(new, Snapshot.from_packages(DOWNLOADS, new.packages))
+    assert (upserts, removed, order) == ({}, [], None)
+
+
+def test_pending_deltas_are_coalesced():
+    """A slow client gets one merged delta holding only the latest state of each package."""
+    async def run():
+        sub = Subscription(max_pending=10)
+        sub.versions[DOWNLOADS] = 1
+        sub.push_delta(DOWNLOADS, 1, 2, {"a": {"v": 1}}, [], None)
+        sub.push_delta(DOWNLOADS, 2, 3, {"a": {"v": 2}, "b": {"v": 1}}, [], None)
+        sub.push_delta(DOWNLOADS, 3, 4, {}, ["b"], ["a"])
+        sub.push_status({"jd_online": False})
+        sub.push_status({"jd_online": True})
+
+        resync, deltas, status = await sub.drain(timeout=0)
+        assert resync == set()
+        assert deltas == [{
+            "kind": DOWNLOADS, "base": 1, "version": 4,
+            "upserts": [{"v": 2}], "removed": ["b"], "order": ["a"],
+        }]
+        assert status == {"jd_online": True}
+        assert sub.versions[DOWNLOADS] == 4
+
+    asyncio.run(run())
+
+
+def test_overflow_and_gaps_fall_back_to_resync():
+    async def run():
+        sub = Subscription(max_pending=2)
+        sub.versions[DOWNLOADS] = 1
+        sub.push_delta(DOWNLOADS, 1, 2, {"a": {}, "b": {}, "c": {}}, [], None)
+        resync, deltas, _ = await sub.drain(timeout=0)
+        assert resync == {DOWNLOADS} and deltas == []
+
+        # The client holds a version the delta does not start from
+        sub.versions[DOWNLOADS] = 5
+        sub.push_delta(DOWNLOADS, 6, 7, {"a": {}}, [], None)
+        resync, deltas, _ = await sub.drain(timeout=0)
+        assert resync == {DOWNLOADS} and deltas == []
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""Tests for the confirmed set-directory/move pipeline behind /linkgrabber/confirm-all and /move."""
+import asyncio
+
+from src.infrastructure.confirm import confirm_packages
+from src.infrastructure.mock_jd_api import MockJDownloaderAPI
+
+
+class LaggingAPI(MockJDownloaderAPI):
+    """LinkGrabber whose changes only show up in queries `lag` queries after the call."""
+
+    def __init__(self, lag: int = 0, accept: bool = True):
+        super().__init__()
+        self.lag = lag
+        self.accept = accept
+        self.grabber = {"1": "/old", "2": "/old"}
+        self.pending: list = []
+        self.calls: list[str] = []
+
+    async def get_linkgrabber_save_to(self, package_ids):
+        self.calls.append("query")
+        for change in list(self.pending):
+            change[0] -= 1
+            if change[0] < 0:
+                change[1]()
+                self.pending.remove(change)
+        return {pid: self.grabber[pid] for pid in package_ids if pid in self.grabber}
+
+    async def set_download_directory(self, package_ids, directory):
+        self.calls.append("set_directory")
+        self.pending.append([self.lag, lambda: self.grabber.update({pid: directory for pid in package_ids})])
+        return True
+
+    async def move_to_dl(self, package_ids):
+        self.calls.append("move")
+        if not self.accept:
+            return False
+        self.pending.append([self.lag, lambda: [self.grabber.pop(pid, None) for pid in package_ids]])
+        return True
+
+
+def test_applied_steps_cost_one_query_each():
+    api = LaggingAPI()
+    steps = asyncio.run(confirm_packages(api, ["1", "2"], "/new/", timeout=1))
+    assert api.calls == ["set_directory", "query", "move", "query"]
+    assert [(s["step"], s["ok"]) for s in steps] == [
+        ("set-directory", True), ("verify-directory", True), ("move", True), ("verify-move", True),
+    ]
+    assert all(s["ms"] >= 0 for s in steps)
+
+
+def test_next_step_waits_for_confirmation():
+    api = LaggingAPI(lag=2)
+    steps = asyncio.run(confirm_packages(api, ["1"], "/new", timeout=1))
+    # The move is only sent once the directory change is visible
+    assert api.calls == ["set_directory", "query", "query", "query", "move", "query", "query", "query"]
+    assert all(s["ok"] for s in steps)
+
+
+def test_unconfirmed_step_times_out_and_unverifiable_apis_skip_checks():
+    api = LaggingAPI(lag=1000)
+    steps = asyncio.run(confirm_packages(api, ["1"], timeout=0.05))
+    assert [(s["step"], s["ok"]) for s in steps] == [("move", True), ("verify-move", False)]
+
+    # The mock API has no targeted query: only the JD calls themselves are made and timed
+    steps = asyncio.run(confirm_packages(MockJDownloaderAPI(), ["1"], "/new"))
+    assert [s["step"] for s in steps] == ["set-directory", "move"]
+
+
+def test_rejected_step_is_recorded_and_not_verified():
+    api = LaggingAPI(accept=False)
+    steps = asyncio.run(confirm_packages(api, ["1"], timeout=1))
+    assert api.calls == ["move"]
+    assert [(s["step"], s["ok"]) for s in steps] == [("move", False)]
@@ -0,0 +1,64 @@
+"""Tests for the smoothed ETA estimator."""
+from src.domain.eta import EtaEstimator
+from src.domain.models import DownloadStatus
+from src.domain.store import NO_ETA, PackageStore
+
+
+def make_store(speed: int, loaded: int = 0) -> PackageStore:
+    store = PackageStore()
+    store.add_package("p", "pkg", total_bytes=10_000, loaded_bytes=loaded)
+    store.add_link("a", "a.bin", "u", "h", 10_000, loaded, DownloadStatus.RUNNING, speed)
+    store.add_package("idle", "idle", total_bytes=500)
+    store.add_link("b", "b.bin", "u", "h", 500, 0, DownloadStatus.STOPPED, 0)
+    return store
+
+
+def test_speed_spikes_are_smoothed():
+    estimator = EtaEstimator(half_life=10)
+    store = make_store(speed=100)
+    estimator.update(store, t=0)
+    assert store.pkg_eta[0] == 100
+    assert store.pkg_eta[1] == NO_ETA
+    assert store.queue_eta == 100
+
+    # A momentary 10x spike after one half-life only moves the average half way
+    store = make_store(speed=1000)
+    estimator.update(store, t=10)
+    assert store.pkg_eta[0] == 19  # 10_000 / 550
+    assert store.eta[0] == 19
+
+    # The estimate keeps no state for links that stopped a long time ago
+    store = make_store(speed=0, loaded=10_000)
+    estimator.update(store, t=1000)
+    assert store.pkg_eta[0] == NO_ETA
+    assert store.queue_eta is None
+    assert estimator._links.speeds == {}
+
+
+def test_stalled_links_lose_their_eta_after_the_idle_timeout():
+    estimator = EtaEstimator(half_life=600, idle_timeout=60)
+    estimator.update(make_store(speed=100), t=0)
+
+    # The average decays slowly, so the ETA is kept (and grows) while the stall is short...
+    store = make_store(speed=0)
+    estimator.update(store, t=30)
+    assert store.pkg_eta[0] != NO_ETA
+    store = make_store(speed=0)
+    estimator.update(store, t=60)
+    assert store.pkg_eta[0] != NO_ETA
+    # ...but not for longer than the idle timeout
+    store = make_store(speed=0)
+    estimator.update(store, t=90)
+    assert store.pkg_eta[0] == NO_ETA
+    assert store.queue_eta is None
+
+
+def test_package_views_get_etas_from_package_speeds():
+    estimator = EtaEstimator(half_life=10)
+    store = PackageStore()
+    store.add_package("p", "pkg", total_bytes=10_000, speed=100)
+    store.add_package("idle", "idle", total_bytes=500)
+    estimator.update_packages(store, t=0)
+    assert store.pkg_eta[0] == 100
+    assert store.pkg_eta[1] == NO_ETA
+    assert store.queue_eta == 100
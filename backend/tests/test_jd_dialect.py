@@ -0,0 +1,102 @@
+"""Tests for JD endpoint dialect discovery: /help parsing and the per-instance cache."""
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+
+from src.infrastructure.jd_dialect import parse_help
+
+HELP_DUMP = Path(__file__).resolve().parents[1] / "jd_help_dump.txt"
+
+
+def test_parse_help_reads_endpoints_and_parameters():
+    endpoints = parse_help(HELP_DUMP.read_text(encoding="utf-8"))
+    assert endpoints["/linkgrabberv2/moveToDownloadlist"] == {2: ("linkIds", "packageIds")}
+    assert endpoints["/linkgrabberv2/addLinks"] == {1: ("query",)}
+    assert set(endpoints["/linkcollector/addLinks"]) == {4, 5}
+    assert endpoints["/jd/version"] == {0: ()}
+    # Not the documentation page: nothing is known, so nothing is ruled out
+    assert parse_help("help") == {}
+
+
+class FakeJD:
+    """JD that only accepts the third moveToDownloadlist payload and only linkcollector/addLinks."""
+
+    def __init__(self):
+        self.version = 100
+        self.calls: list[str] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append(path)
+        if path == "/jd/version":
+            return httpx.Response(200, json={"data": self.version})
+        if path == "/help":
+            return httpx.Response(200, text="help")
+        if path == "/linkgrabberv2/moveToDownloadlist":
+            body = json.loads(request.content)
+            return httpx.Response(200 if "linkIds" in body else 400)
+        if path == "/linkgrabberv2/addLinks":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"data": None})
+
+
+def test_working_dialect_is_cached_until_version_change_or_restart():
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    jd = FakeJD()
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(jd.handler))
+        await api.move_to_dl(["1"])
+        assert jd.calls.count("/linkgrabberv2/moveToDownloadlist") == 3
+        assert jd.calls.count("/help") == 1
+
+        # Later calls go straight to the working payload, without re-checking the version
+        jd.calls.clear()
+        await api.move_to_dl(["2"])
+        assert jd.calls == ["/linkgrabberv2/moveToDownloadlist", "/downloadcontroller/start"]
+
+        assert await api.add_links(["http://a"]) == "ok"
+        jd.calls.clear()
+        assert await api.add_links(["http://b"]) == "ok"
+        assert jd.calls == ["/linkcollector/addLinks"]
+
+        # A new JD version is noticed at the next re-check and the dialects are probed again
+        jd.version = 101
+        api._dialects.recheck_interval = 0
+        jd.calls.clear()
+        await api.move_to_dl(["3"])
+        assert jd.calls[:2] == ["/jd/version", "/help"]
+        assert jd.calls.count("/linkgrabberv2/moveToDownloadlist") == 3
+
+        api._dialects.recheck_interval = 300
+        await api.restart_jd()
+        assert api._dialects.chosen("move_to_dl") is None
+        jd.calls.clear()
+        await api.move_to_dl(["4"])
+        assert jd.calls.count("/linkgrabberv2/moveToDownloadlist") == 3
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_help_rules_out_missing_endpoints():
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/help":
+            return httpx.Response(200, text=HELP_DUMP.read_text(encoding="utf-8"))
+        return httpx.Response(200, json={"data": "2.0"})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        assert await api.add_links(["http://a"]) == "ok"
+        await api.aclose()
+
+    asyncio.run(run())
+    assert calls == ["/jd/version", "/help", "/linkgrabberv2/addLinks"]
@@ -0,0 +1,93 @@
+"""Tests for the background job manager behind /jobs."""
+import asyncio
+
+from src.infrastructure.jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager
+
+
+def test_jobs_run_on_bounded_workers_with_progress():
+    async def run():
+        manager = JobManager(max_workers=2)
+        release = asyncio.Event()
+        running = []
+
+        async def work(job):
+            running.append(job.id)
+            job.report(1, 2)
+            await release.wait()
+            job.report(2)
+            return {"ok": job.id}
+
+        jobs = [manager.submit("test", work) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert [job.status for job in jobs] == [RUNNING, RUNNING, QUEUED]
+        assert jobs[0].to_dict()["progress"] == {"done": 1, "total": 2}
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert [job.status for job in jobs] == [SUCCEEDED] * 3
+        assert jobs[2].result == {"ok": jobs[2].id}
+        assert manager.get(jobs[2].id).finished_at >= jobs[2].started_at
+        assert next(iter(manager.list())).id == jobs[2].id
+
+    asyncio.run(run())
+
+
+def test_cancel_and_failure():
+    async def run():
+        manager = JobManager(max_workers=1)
+
+        async def forever(job):
+            await asyncio.Event().wait()
+
+        async def broken(job):
+            raise RuntimeError("JD unreachable")
+
+        running = manager.submit("test", forever)
+        queued = manager.submit("test", forever)
+        failing = manager.submit("test", broken)
+        await asyncio.sleep(0.01)
+        manager.cancel(running.id)
+        manager.cancel(queued.id)
+        await asyncio.sleep(0.01)
+        assert running.status == queued.status == CANCELLED
+        assert failing.status == FAILED
+        assert failing.error == "JD unreachable"
+        assert manager.cancel("missing") is None
+
+    asyncio.run(run())
+
+
+def test_finished_jobs_are_pruned():
+    async def run():
+        manager = JobManager(max_workers=1, retention=60, max_finished=2)
+
+        async def noop(job):
+            return None
+
+        jobs = [manager.submit("test", noop) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # Only the newest max_finished finished jobs are kept
+        assert manager.get(jobs[0].id) is None
+        assert manager.get(jobs[2].id) is not None
+
+        manager.retention = 0
+        assert manager.list() == []
+
+    asyncio.run(run())
+
+
+def test_job_cancelled_before_it_starts_is_finished():
+    async def run():
+        manager = JobManager(max_workers=1)
+
+        async def noop(job):
+            return None
+
+        # Cancelled before the task ever ran, so _run never got to record anything
+        job = manager.submit("test", noop)
+        manager.cancel(job.id)
+        await asyncio.sleep(0.01)
+        assert job.status == CANCELLED
+        assert job.finished_at is not None
+
+    asyncio.run(run())
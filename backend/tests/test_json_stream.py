@@ -0,0 +1,41 @@
+"""Tests for the incremental JD response decoder."""
+import json
+
+import pytest
+
+from src.infrastructure.json_stream import ArrayStreamDecoder
+
+
+def test_decodes_data_array_across_chunk_boundaries():
+    """Elements are emitted as soon as they are complete, whatever the chunking."""
+    body = {
+        "rid": "data",
+        "other": [{"x": "]"}],
+        "data": [{"uuid": i, "name": f'tricky "{i}" }}]{{[ \\ ü'} for i in range(50)],
+    }
+    raw = json.dumps(body, ensure_ascii=False).encode()
+
+    for size in (1, 7, 64, len(raw)):
+        decoder = ArrayStreamDecoder("data")
+        rows = []
+        for i in range(0, len(raw), size):
+            rows.extend(decoder.feed(raw[i:i + size]))
+        decoder.close()
+        assert rows == body["data"]
+
+
+def test_missing_array_yields_nothing():
+    decoder = ArrayStreamDecoder("data")
+    assert decoder.feed(b'{"error": "x"}') == []
+    decoder.close()
+
+
+def test_malformed_or_truncated_input_is_a_decode_error():
+    decoder = ArrayStreamDecoder("data")
+    with pytest.raises(ValueError, match="Malformed"):
+        decoder.feed(b'{"data": [{"uuid": 1}, nonsense]}')
+
+    decoder = ArrayStreamDecoder("data")
+    assert decoder.feed(b'{"data": [{"uuid": 1}, {"uu') == [{"uuid": 1}]
+    with pytest.raises(ValueError, match="not terminated"):
+        decoder.close()
@@ -0,0 +1,108 @@
+"""Tests for duplicate-link detection: URL normalization, the index and its sources."""
+import asyncio
+import json
+
+from src.domain.snapshot import LIST_KINDS
+from src.infrastructure.link_index import DuplicateIndex, normalize_url
+from src.infrastructure.mock_jd_api import MockJDownloaderAPI
+
+UBUNTU = "https://releases.ubuntu.com/24.04/ubuntu-24.04-desktop-amd64.iso"
+
+
+def test_normalize_url():
+    assert normalize_url(" HTTP://WWW.Example.com:80/file/?utm_source=x&id=1 ") == "https://example.com/file?id=1"
+    assert normalize_url("https://example.com:8443/a") == "https://example.com:8443/a"
+    # The fragment can be the file key (e.g. mega.nz) and is kept
+    assert normalize_url("https://mega.nz/file/abc#key1") != normalize_url("https://mega.nz/file/abc#key2")
+    assert normalize_url("magnet:?xt=urn:btih:abc") == "magnet:?xt=urn:btih:abc"
+
+
+async def refresh_lists(api):
+    from src.infrastructure.snapshot_service import snapshot_service
+
+    for kind in LIST_KINDS:
+        await snapshot_service.refresh(api, kind)
+
+
+def test_sync_never_queries_jd():
+    """Only cached lists are used, so an unreachable JD does not hold up adds."""
+    class UnreachableAPI(MockJDownloaderAPI):
+        async def get_snapshot(self, kind, include_links=True):
+            raise AssertionError("JD was queried")
+
+    index = DuplicateIndex()
+    asyncio.run(index.sync(UnreachableAPI()))
+    assert index.split([UBUNTU]) == ([UBUNTU], [])
+
+
+def test_duplicates_from_jd_buffer_and_recent_submissions(tmp_path):
+    buffer_file = tmp_path / "link_buffer.json"
+    buffer_file.write_text(json.dumps([{"package": "p", "links": ["https://buffered/1"]}, "https://buffered/2"]))
+    index = DuplicateIndex()
+
+    async def run():
+        api = MockJDownloaderAPI()
+        await refresh_lists(api)
+        await index.sync(api, buffer_file)
+
+    asyncio.run(run())
+    links = [UBUNTU, "https://buffered/1", "https://buffered/2", "https://new/1", "https://new/1/"]
+    fresh, duplicates = index.split(links)
+    assert fresh == ["https://new/1"]
+    assert duplicates == [UBUNTU, "https://buffered/1", "https://buffered/2", "https://new/1/"]
+
+    # Replays of the buffer only check against JD
+    assert index.split(["https://buffered/1"], include_buffer=False) == (["https://buffered/1"], [])
+
+    index.remember(["https://new/1"])
+    assert index.split(["https://new/1"]) == ([], ["https://new/1"])
+
+
+def test_list_links_follow_snapshots_sharing_a_pool():
+    from src.domain.snapshot import LINKGRABBER, Snapshot
+    from src.domain.store import PackageStore
+    from src.infrastructure.link_index import ListLinks, link_key
+
+    def snapshot(urls, pool=None):
+        store = PackageStore(pool=pool)
+        store.add_package("p", "Package")
+        for i, url in enumerate(urls):
+            store.add_link(str(i), url.rsplit("/", 1)[-1], url, "host")
+        return Snapshot(kind=LINKGRABBER, store=store)
+
+    first = snapshot(["https://host/a", "http://host/b", "https://host/b/"])
+    links = ListLinks(first)
+    assert links.has_key(link_key("https://host/b"))
+
+    # A delta refresh: one of the two spellings of b and all of a are gone, c is new
+    links.update(snapshot(["https://host/b/", "https://host/c"], pool=first.store.pool))
+    assert links.has_key(link_key("https://host/b"))
+    assert links.has_key(link_key("https://host/c"))
+    assert not links.has_key(link_key("https://host/a"))
+
+
+def test_submitted_links_are_kept_until_a_snapshot_shows_them(monkeypatch):
+    from src.core.config import settings
+    from src.infrastructure.link_index import link_key
+
+    api = MockJDownloaderAPI()
+    index = DuplicateIndex()
+
+    async def sync():
+        await refresh_lists(api)
+        await index.sync(api)
+
+    async def run():
+        await sync()
+        index.remember(["https://submitted/1", "https://submitted/2"])
+        await api.add_links(["https://submitted/1"])
+        # Newer snapshots: JD shows the first link, the second one is still on its way
+        await sync()
+        assert list(index._submitted) == [link_key("https://submitted/2")]
+        assert index.split(["https://submitted/1", "https://submitted/2"])[0] == []
+
+        monkeypatch.setattr(settings, "DUPLICATE_SUBMITTED_MAX_AGE", 0)
+        await sync()
+        assert index.split(["https://submitted/2"]) == (["https://submitted/2"], [])
+
+    asyncio.run(run())
@@ -0,0 +1,375 @@
+"""Tests for the LocalJDownloaderAPI client against a mocked JD transport."""
+import asyncio
+
+import httpx
+
+
+def test_client_pool_is_reused():
+    """All calls go through one pooled client until it is closed."""
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text="help")
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        await api.get_help()
+        first = api._client
+        await api.get_help()
+        assert api._client is first
+
+        await api.aclose()
+        assert first.is_closed
+        assert api._client is None
+
+        # A closed API reopens transparently
+        assert await api.get_help() == "help"
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_jd_calls_are_recorded_in_metrics():
+    """Every call's status and latency is counted per JD endpoint; failures by exception type."""
+    from src.core import metrics
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/system/restartJD":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, text="help")
+
+    def count(metric, *labels) -> float:
+        return metric.labels(*labels)._value.get()
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        ok = count(metrics.JD_REQUESTS, "/help", "200")
+        failed = count(metrics.JD_REQUEST_ERRORS, "/system/restartJD", "ConnectError")
+        await api.get_help()
+        try:
+            await api.restart_jd()
+        except httpx.ConnectError:
+            pass
+        assert count(metrics.JD_REQUESTS, "/help", "200") == ok + 1
+        assert count(metrics.JD_REQUEST_ERRORS, "/system/restartJD", "ConnectError") == failed + 1
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_snapshot_merges_packages_and_links():
+    """Packages and links from one fan-out are merged into a single versioned snapshot."""
+    from src.domain.snapshot import DOWNLOADS
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("queryPackages"):
+            return httpx.Response(200, json={"data": [{"uuid": 1, "name": "pkg", "childCount": 2}]})
+        return httpx.Response(200, json={"data": [
+            {"uuid": 10, "packageUUID": 1, "name": "a", "speed": 100},
+            {"uuid": 11, "packageUUID": 1, "name": "b", "speed": 50},
+        ]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        first = await api.get_snapshot(DOWNLOADS)
+        second = await api.get_snapshot(DOWNLOADS)
+        await api.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [link.uuid for link in first.packages[0].links] == ["10", "11"]
+    assert first.packages[0].speed == 150
+    assert first.tag == f"downloads:{first.version}"
+    # Unchanged JD state keeps the same snapshot (and its cached encoding)
+    assert second is first
+
+
+def test_delta_sync_queries_only_changed_packages():
+    """After the first full sync, links are only re-queried for packages whose fingerprint changed."""
+    import json
+
+    from src.domain.snapshot import DOWNLOADS
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    packages = [
+        {"uuid": 1, "name": "idle", "childCount": 1, "bytesLoaded": 10, "speed": 0},
+        {"uuid": 2, "name": "active", "childCount": 1, "bytesLoaded": 10, "speed": 5},
+    ]
+    links = [
+        {"uuid": 10, "packageUUID": 1, "name": "idle.bin"},
+        {"uuid": 20, "packageUUID": 2, "name": "active.bin"},
+    ]
+    link_queries = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("queryPackages"):
+            return httpx.Response(200, json={"data": packages})
+        scope = json.loads(request.content)["packageUUIDs"]
+        link_queries.append(scope)
+        return httpx.Response(200, json={"data": [l for l in links if not scope or l["packageUUID"] in scope]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        await api.get_snapshot(DOWNLOADS)
+        # Nothing changed: no link query at all
+        unchanged = await api.get_snapshot(DOWNLOADS)
+        packages[1]["bytesLoaded"] = 20
+        changed = await api.get_snapshot(DOWNLOADS)
+        await api.aclose()
+        return unchanged, changed
+
+    unchanged, changed = asyncio.run(run())
+    assert link_queries == [[], [2]]
+    assert [p.links[0].name for p in unchanged.packages] == ["idle.bin", "active.bin"]
+    assert [p.links[0].name for p in changed.packages] == ["idle.bin", "active.bin"]
+
+
+def test_online_check_results_are_picked_up():
+    """A package whose total changes (same link count, progress and status) has its links re-queried."""
+    from src.domain.snapshot import LINKGRABBER
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    packages = [{"uuid": 1, "name": "crawled", "childCount": 1, "bytesTotal": -1}]
+    links = [{"uuid": 10, "packageUUID": 1, "name": "unchecked.bin", "bytesTotal": -1}]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("queryPackages"):
+            return httpx.Response(200, json={"data": packages})
+        return httpx.Response(200, json={"data": links})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        await api.get_snapshot(LINKGRABBER)
+        packages[0]["bytesTotal"] = links[0]["bytesTotal"] = 123456
+        links[0]["name"] = "checked.bin"
+        snapshot = await api.get_snapshot(LINKGRABBER)
+        await api.aclose()
+        return snapshot
+
+    link = asyncio.run(run()).packages[0].links[0]
+    assert (link.name, link.bytes_total) == ("checked.bin", 123456)
+
+
+def test_scoped_link_query_without_ids_is_empty():
+    """A scope with no usable package ids must not turn into an unfiltered query of every link."""
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"data": [{"uuid": 10, "packageUUID": 1}]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        assert await api._query_links("downloadsV2/queryLinks", ["x"]) == {}
+        assert await api._query_links("downloadsV2/queryLinks", []) == {}
+        await api.aclose()
+
+    asyncio.run(run())
+    assert calls == []
+
+
+def test_paged_queries_assemble_all_rows(monkeypatch):
+    """Large lists are fetched in startAt/maxResults pages and assembled in order."""
+    import json
+
+    from src.core.config import settings
+    from src.domain.snapshot import DOWNLOADS
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    monkeypatch.setattr(settings, "JD_QUERY_PAGE_SIZE", 3)
+    monkeypatch.setattr(settings, "JD_QUERY_MAX_CONCURRENT_PAGES", 2)
+    packages = [{"uuid": 1, "name": "big", "childCount": 10}]
+    links = [{"uuid": 100 + i, "packageUUID": 1, "name": f"part{i}"} for i in range(10)]
+    pages = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        rows = packages if request.url.path.endswith("queryPackages") else links
+        start, size = params["startAt"], params["maxResults"]
+        pages.append((request.url.path, start))
+        return httpx.Response(200, json={"data": rows[start:start + size]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        snapshot = await api.get_snapshot(DOWNLOADS)
+        await api.aclose()
+        return snapshot
+
+    snapshot = asyncio.run(run())
+    assert [link.name for link in snapshot.packages[0].links] == [f"part{i}" for i in range(10)]
+    # Single probe page, then waves of two; the last wave overshoots the unknown end by one page
+    assert sorted(start for path, start in pages if path.endswith("queryLinks")) == [0, 3, 6, 9, 12]
+
+
+def test_paging_continues_past_a_stale_expected_total(monkeypatch):
+    """The expected total only limits the fan-out: a full last page is always followed up."""
+    import json
+
+    from src.core.config import settings
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    monkeypatch.setattr(settings, "JD_QUERY_PAGE_SIZE", 3)
+    monkeypatch.setattr(settings, "JD_QUERY_MAX_CONCURRENT_PAGES", 4)
+    links = [{"uuid": 100 + i, "packageUUID": 1} for i in range(7)]
+    starts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        starts.append(params["startAt"])
+        return httpx.Response(200, json={"data": links[params["startAt"]:params["startAt"] + params["maxResults"]]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        grown = await api._query_links("downloadsV2/queryLinks", ["1"], expected_total=3)
+        starts.clear()
+        counted_empty = await api._query_links("downloadsV2/queryLinks", ["1"], expected_total=0)
+        await api.aclose()
+        return grown, counted_empty
+
+    grown, counted_empty = asyncio.run(run())
+    assert len(grown["1"]) == 7
+    # Expected 0: a single probe page, no fan-out, then page by page
+    assert len(counted_empty["1"]) == 7
+    assert starts == [0, 3, 6]
+
+
+def test_package_view_skips_link_queries():
+    """include_links=False costs a single queryPackages call and yields link-less packages."""
+    from src.domain.snapshot import DOWNLOADS
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path.endswith("queryPackages"):
+            return httpx.Response(200, json={"data": [{"uuid": 1, "name": "pkg", "childCount": 2, "speed": 70}]})
+        return httpx.Response(200, json={"data": []})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        snapshot = await api.get_snapshot(DOWNLOADS, include_links=False)
+        await api.aclose()
+        return snapshot
+
+    snapshot = asyncio.run(run())
+    assert paths == ["/downloadsV2/queryPackages"]
+    assert not snapshot.include_links
+    assert snapshot.packages[0].child_count == 2
+    assert snapshot.packages[0].speed == 70
+
+
+def test_linkgrabber_save_to_queries_only_given_packages():
+    import json
+
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"data": [{"uuid": 7, "saveTo": "/dl"}]})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        assert await api.get_linkgrabber_save_to(["7", "8"]) == {"7": "/dl"}
+        # No ids: answered without asking JD (an empty filter would match everything)
+        assert await api.get_linkgrabber_save_to([]) == {}
+        await api.aclose()
+
+    asyncio.run(run())
+    assert len(bodies) == 1
+    assert bodies[0]["packageUUIDs"] == [7, 8]
+
+
+def test_add_links_in_chunks_with_retry_and_progress(monkeypatch):
+    """Large adds are split into chunks under one package name; unsent chunks are retried, failed ones reported."""
+    import json
+
+    from src.core.config import settings
+    from src.infrastructure.api_interface import AddLinksError
+    from src.infrastructure.local_jd_api import LocalJDownloaderAPI
+
+    monkeypatch.setattr(settings, "JD_ADD_LINKS_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "JD_ADD_LINKS_MAX_CONCURRENT", 2)
+    monkeypatch.setattr(settings, "JD_ADD_LINKS_RETRY_DELAY", 0)
+    bodies = []
+    connect_failures = {"http://3": 1}
+    read_timeouts = []
+    server_errors = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/linkgrabberv2/addLinks":
+            return httpx.Response(404)
+        body = json.loads(request.content)
+        first = body["links"].split("\n")[0]
+        if first == "http://5":
+            raise httpx.ConnectError("refused")
+        if first == "http://7":
+            read_timeouts.append(first)
+            raise httpx.ReadTimeout("no answer")
+        if first == "http://9":
+            return httpx.Response(400, text="bad links")
+        if first == "http://11":
+            server_errors.append(first)
+            return httpx.Response(503)
+        if connect_failures.get(first):
+            connect_failures[first] -= 1
+            raise httpx.ConnectError("refused")
+        bodies.append(body)
+        return httpx.Response(200, json={"data": None})
+
+    async def run():
+        api = LocalJDownloaderAPI("http://jd", transport=httpx.MockTransport(handler))
+        progress = []
+        links = [f"http://{i}" for i in range(1, 5)]
+        assert await api.add_links(links, package_name="Big", progress=lambda *p: progress.append(p)) == "ok"
+        assert sorted(b["links"] for b in bodies) == ["http://1\nhttp://2", "http://3\nhttp://4"]
+        assert {b["packageName"] for b in bodies} == {"Big"}
+        assert progress == [(2, 4), (4, 4)]
+
+        # Failed chunks are reported by kind: only the unreachable one is pending (for buffering),
+        # the ones that may have reached JD (read timeout, server error) are neither retried nor pending
+        bodies.clear()
+        links = [f"http://{i}" for i in range(1, 13)]
+        try:
+            await api.add_links(links)
+        except AddLinksError as e:
+            assert e.pending == ["http://5", "http://6"]
+            assert e.uncertain == ["http://7", "http://8", "http://11", "http://12"]
+            assert e.rejected == ["http://9", "http://10"]
+            assert e.sent(links) == [f"http://{i}" for i in (1, 2, 3, 4, 7, 8, 11, 12)]
+        else:
+            raise AssertionError("expected AddLinksError")
+        assert read_timeouts == ["http://7"]
+        assert server_errors == ["http://11"]
+        # Unnamed multi-chunk adds still land in one package
+        names = {b["packageName"] for b in bodies}
+        assert len(names) == 1 and None not in names
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_replaced_api_pool_is_closed(monkeypatch):
+    """Changing the JD URL retires the previous shared API and closes its pool."""
+    from src.api import deps
+    from src.core.config import settings
+
+    monkeypatch.setattr(settings, "JD_HTTP_TIMEOUT", 0)
+
+    async def run():
+        old = deps.get_local_jd_api("http://old-jd")
+        old.open()
+        new = deps.get_local_jd_api("http://new-jd")
+        assert new is not old
+        assert "http://old-jd" not in deps._local_apis
+        await asyncio.sleep(0.01)
+        assert old._client is None
+        await deps.close_jd_apis()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+"""Tests for the structured, queue-based logging setup."""
+import logging
+import queue
+
+import httpx
+
+from src.core.log import DroppingQueueHandler, configure_logging, parse_levels, shutdown_logging, truncate_values
+
+
+def test_parse_levels():
+    assert parse_levels("jd=debug, cnl=WARNING,bogus,") == {"jd": "DEBUG", "cnl": "WARNING"}
+    assert parse_levels("") == {}
+
+
+def test_long_values_are_truncated():
+    event = truncate_values(10)(None, "info", {"event": "Add links", "body": "x" * 25, "status": 200})
+    assert event["body"] == "xxxxxxxxxx... (15 more)"
+    assert event["event"] == "Add links"
+    assert event["status"] == 200
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("jd", logging.INFO, __file__, 1, "msg", None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_jd_bodies_are_only_read_at_debug_level():
+    """With debug disabled, a response body is never decoded; with it enabled it is logged (truncated)."""
+    from src.infrastructure import local_jd_api
+
+    class Body(httpx.Response):
+        reads = 0
+
+        @property
+        def text(self):
+            Body.reads += 1
+            return "x" * 10_000
+
+    records = []
+    handler = configure_logging("INFO", {"jd": "INFO"})
+    handler.enqueue = records.append
+    try:
+        local_jd_api._log_response("Start downloads response", Body(200))
+        assert Body.reads == 0
+        assert records[-1].msg["status"] == 200 and "body" not in records[-1].msg
+
+        logging.getLogger("jd").setLevel(logging.DEBUG)
+        local_jd_api._log_response("Start downloads response", Body(200))
+        assert Body.reads == 1
+        assert records[-1].msg["body"].startswith("x")
+    finally:
+        logging.getLogger("jd").setLevel(logging.NOTSET)
+        shutdown_logging()
@@ -0,0 +1,57 @@
+"""Tests for server-side paging, sorting and filtering of package lists."""
+import random
+
+from src.domain.models import DownloadStatus
+from src.domain.query import PackageQuery
+from src.domain.store import PackageStore
+
+
+def make_store(n: int = 200) -> PackageStore:
+    rng = random.Random(7)
+    store = PackageStore()
+    for i in range(n):
+        total = rng.randrange(1, 50) * 1000
+        store.add_package(f"p{i}", f"Package {i:03d}", total_bytes=total, loaded_bytes=total // 2)
+        status = DownloadStatus.RUNNING if i % 3 == 0 else DownloadStatus.STOPPED
+        speed = rng.randrange(1, 100) if status is DownloadStatus.RUNNING else 0
+        store.add_link(f"l{i}", "file", "http://x", "host-a" if i % 2 else "host-b", total, total // 2, status, speed)
+    return store
+
+
+def names(store: PackageStore, indices: list[int]) -> list[str]:
+    return [store.pkg_name[i] for i in indices]
+
+
+def test_top_n_matches_full_sort():
+    """A small page via the top-N heap equals the same page of the cached full sort order."""
+    store = make_store()
+    for sort, descending in (("size", True), ("speed", False), ("eta", False), ("name", True)):
+        query = PackageQuery(limit=5, sort=sort, descending=descending)
+        heap_page, total = query.select(store, {})
+        full_page, _ = PackageQuery(limit=150, sort=sort, descending=descending).select(store, {})
+        assert total == 200
+        assert heap_page == full_page[:5]
+
+
+def test_unknown_values_sort_last():
+    store = make_store()
+    cache = {}
+    page, _ = PackageQuery(sort="eta").select(store, cache)
+    etas = cache[("values", "eta")]
+    known = [etas[i] for i in page if etas[i] is not None]
+    assert known == sorted(known)
+    assert all(etas[i] is None for i in page[len(known):])
+
+
+def test_filters_and_paging():
+    store = make_store()
+    query = PackageQuery(offset=10, limit=10, statuses=frozenset({"RUNNING"}), host="HOST-A", sort="name")
+    page, total = query.select(store, {})
+    # RUNNING: every third package; host-a: odd packages
+    expected = [f"Package {i:03d}" for i in range(200) if i % 3 == 0 and i % 2]
+    assert total == len(expected)
+    assert names(store, page) == expected[10:20]
+
+    page, total = PackageQuery(name="package 00", max_size=10_000).select(store, {})
+    assert all(store.pkg_total_bytes[i] <= 10_000 and store.pkg_name[i].startswith("Package 00") for i in page)
+    assert PackageQuery(offset=500, limit=10).select(store, {}) == ([], 200)
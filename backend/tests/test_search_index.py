@@ -0,0 +1,51 @@
+"""Tests for the trigram search index."""
+import asyncio
+
+from src.domain.models import Link, Package
+from src.domain.snapshot import DOWNLOADS, LINKGRABBER, Snapshot
+from src.infrastructure.search_index import SearchIndex, TrigramIndex
+
+
+def make_snapshot(kind: str, packages: list[tuple[str, list[tuple[str, str]]]]) -> Snapshot:
+    return Snapshot.from_packages(kind, [
+        Package(uuid=name, name=name, links=[
+            Link(uuid=f"{name}/{file}", name=file, url=f"https://{host}/{file}", host=host) for file, host in links
+        ])
+        for name, links in packages
+    ])
+
+
+def test_trigram_matching_is_case_insensitive_substring():
+    index = TrigramIndex()
+    ids = [index.add(text) for text in ("Ubuntu 24.04 ISO", "debian.iso", "ubuntu-server.img", "Ubuntu 24.04 ISO")]
+    assert ids[0] == ids[3]
+    assert sorted(index.matching("UBUNTU")) == [ids[0], ids[2]]
+    assert index.matching("iso") == [ids[0], ids[1]]
+    assert index.matching("xyz") == []
+
+
+def test_search_ranks_and_filters_terms():
+    downloads = make_snapshot(DOWNLOADS, [
+        ("Ubuntu", [("ubuntu.iso", "mirror.example.com")]),
+        ("Backups", [("ubuntu-notes.txt", "files.example.com"), ("photos.zip", "files.example.com")]),
+    ])
+    linkgrabber = make_snapshot(LINKGRABBER, [("Misc", [("readme.md", "mirror.example.com")])])
+
+    async def run():
+        index = SearchIndex()
+        total, results = await index.search([downloads, linkgrabber], "ubuntu")
+        assert total == 2
+        # An exact package name beats a link-name prefix
+        assert [r["package"]["name"] for r in results] == ["Ubuntu", "Backups"]
+        assert [link["name"] for link in results[1]["package"]["links"]] == ["ubuntu-notes.txt"]
+
+        total, results = await index.search([downloads, linkgrabber], "mirror readme")
+        assert total == 1
+        assert results[0]["kind"] == LINKGRABBER
+
+        # Views are built once per snapshot
+        assert index.has_view(downloads)
+        view = await index.view(downloads)
+        assert await index.view(downloads) is view
+
+    asyncio.run(run())
@@ -0,0 +1,97 @@
+"""Tests for the server-side snapshot cache."""
+import asyncio
+
+from src.domain.snapshot import DOWNLOADS
+from src.infrastructure.mock_jd_api import MockJDownloaderAPI
+from src.infrastructure.snapshot_service import SnapshotService
+
+
+class CountingAPI(MockJDownloaderAPI):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def get_packages(self):
+        self.calls += 1
+        return await super().get_packages()
+
+
+def test_concurrent_reads_share_one_fetch():
+    """Many simultaneous readers cause a single upstream query."""
+    async def run():
+        api = CountingAPI()
+        service = SnapshotService(refresh_interval=1, max_staleness=60, idle_timeout=60)
+        snapshots = await asyncio.gather(*(service.get(api, DOWNLOADS) for _ in range(10)))
+        assert len({s.version for s in snapshots}) == 1
+        assert api.calls == 1
+
+        # Cached until invalidated
+        await service.get(api, DOWNLOADS)
+        assert api.calls == 1
+        service.invalidate(DOWNLOADS)
+        await service.get(api, DOWNLOADS)
+        assert api.calls == 2
+
+    asyncio.run(run())
+
+
+def test_stale_snapshot_is_refreshed():
+    """A snapshot older than max_staleness is never served."""
+    async def run():
+        api = CountingAPI()
+        service = SnapshotService(refresh_interval=1, max_staleness=0, idle_timeout=60)
+        first = await service.get(api, DOWNLOADS)
+        await asyncio.sleep(0.01)
+        second = await service.get(api, DOWNLOADS)
+        assert second.version > first.version
+
+    asyncio.run(run())
+
+
+def test_stalled_download_loses_its_eta(monkeypatch):
+    """JD returns the same snapshot while a download is stalled; its ETA still moves on."""
+    import time
+
+    from src.domain.eta import EtaEstimator
+    from src.domain.models import DownloadStatus
+    from src.domain.snapshot import Snapshot
+    from src.domain.store import NO_ETA, PackageStore
+
+    def snapshot(speed, t):
+        store = PackageStore()
+        store.add_package("p", "pkg", total_bytes=10_000)
+        store.add_link("a", "a.bin", "u", "h", 10_000, 0, DownloadStatus.RUNNING, speed)
+        return Snapshot(kind=DOWNLOADS, store=store, taken_at=t)
+
+    class StallingAPI(MockJDownloaderAPI):
+        async def get_snapshot(self, kind, include_links=True):
+            return self.snapshot
+
+    now = 0.0
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    async def run():
+        nonlocal now
+        api = StallingAPI()
+        service = SnapshotService()
+        service.eta = EtaEstimator(half_life=30, idle_timeout=60)
+        api.snapshot = snapshot(100, 0)
+        assert (await service.refresh(api, DOWNLOADS)).store.pkg_eta[0] == 100
+        api.snapshot = snapshot(0, 10)
+        stalled = await service.refresh(api, DOWNLOADS)
+
+        # Within the idle timeout the ETA grows, as a new version
+        now = 40
+        later = await service.refresh(api, DOWNLOADS)
+        assert later.version > stalled.version
+        assert later.store.eta[0] > stalled.store.eta[0]
+        assert stalled.store.eta[0] != NO_ETA
+
+        # Past it the download has no ETA, and nothing changes after that
+        now = 400
+        idle = await service.refresh(api, DOWNLOADS)
+        assert (idle.store.eta[0], idle.store.pkg_eta[0], idle.store.queue_eta) == (NO_ETA, NO_ETA, None)
+        now = 410
+        assert await service.refresh(api, DOWNLOADS) is idle
+
+    asyncio.run(run())
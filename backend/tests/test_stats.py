@@ -0,0 +1,36 @@
+"""Tests for the package list rollups."""
+from src.domain import stats
+from src.domain.models import DownloadStatus
+from src.domain.store import PackageStore
+
+
+def make_store() -> PackageStore:
+    store = PackageStore()
+    store.add_package("p1", "one")
+    store.add_link("a", "a.bin", "u", "host-a", 100, 40, DownloadStatus.RUNNING, 10)
+    store.add_link("b", "b.bin", "u", "host-b", 50, 50, DownloadStatus.FINISHED, 0)
+    store.add_package("p2", "empty")
+    store.add_package("p3", "three")
+    store.add_link("c", "c.bin", "u", "host-a", 30, 0, DownloadStatus.RUNNING, 5)
+    return store
+
+
+def test_rollups():
+    result = stats.compute_stats(make_store())
+    assert result["totals"] == {
+        "packages": 3, "links": 3, "active_links": 2,
+        "bytes_total": 180, "bytes_loaded": 90, "bytes_remaining": 90, "speed": 15, "eta": None,
+    }
+    assert result["by_host"]["host-a"]["bytes_remaining"] == 90
+    assert result["by_status"]["FINISHED"]["links"] == 1
+    assert "STOPPED" not in result["by_status"]
+    assert [p["links"] for p in result["by_package"]] == [2, 0, 1]
+    assert list(result["by_host"]) == ["host-a", "host-b"]
+
+
+def test_python_fallback_matches(monkeypatch):
+    store = make_store()
+    expected = stats.compute_stats(store)
+    monkeypatch.setattr(stats, "np", None)
+    assert stats.compute_stats(store) == expected
+    assert stats.compute_stats(PackageStore())["totals"]["links"] == 0
@@ -0,0 +1,65 @@
+"""Tests for the array-backed package store."""
+from src.domain.models import DownloadStatus, Link, Package
+from src.domain.store import PackageStore
+
+
+def make_packages() -> list[Package]:
+    return [
+        Package(uuid="1", name="a", links=[
+            Link(uuid="10", name="a1", url="http://h/a1", host="h", bytes_total=10, speed=3, eta=5),
+            Link(uuid="11", name="a2", url="http://h/a2", host="h", status=DownloadStatus.FINISHED),
+        ]),
+        Package(uuid="2", name="empty"),
+        Package(uuid="3", name="b", links=[Link(uuid="30", name="b1", url="http://o/b1", host="o", speed=4)]),
+    ]
+
+
+def test_round_trip_to_models():
+    """Models built at the boundary match the originals; package speed is summed from the columns."""
+    packages = make_packages()
+    store = PackageStore.from_packages(packages)
+
+    assert len(store) == 3
+    assert store.link_count == 3
+    rebuilt = store.to_packages()
+    assert [p.model_dump(exclude={"speed"}) for p in rebuilt] == [p.model_dump(exclude={"speed"}) for p in packages]
+    assert [p.speed for p in rebuilt] == [3, 0, 4]
+    # Hosts are interned once
+    assert store.host[0] == store.host[1]
+
+
+def test_copy_links_between_stores():
+    previous = PackageStore.from_packages(make_packages())
+    store = PackageStore(pool=previous.pool)
+    store.add_package("3", "b")
+    store.copy_links(previous, previous.index_of("3"))
+
+    assert [link.name for link in store.to_package(0).links] == ["b1"]
+    assert list(store.package) == [0]
+
+
+def test_fast_encoding_matches_models():
+    """The fast path emits exactly what the response_model serialization would."""
+    import json
+
+    from src.domain.snapshot import Snapshot
+
+    packages = make_packages()
+    snapshot = Snapshot.from_packages("downloads", packages)
+
+    expected = [p.model_dump(mode="json") for p in snapshot.packages]
+    assert json.loads(snapshot.encoded()) == expected
+    # Encoded once per snapshot
+    assert snapshot.encoded() is snapshot.encoded()
+
+
+def test_missing_strings_encode_as_none():
+    """A link without a host/url must not pick up the last interned string."""
+    store = PackageStore()
+    store.add_package("1", "a")
+    store.add_link(uuid="10", name="a1", url=None, host=None)
+    store.pool.intern("unrelated")
+
+    assert store.link_dicts(0, 1)[0]["url"] is None
+    assert store.link_dicts(0, 1)[0]["host"] is None
+    assert store.link_dicts(0, 1) == [store.link_dict(0)]
@@ -0,0 +1,42 @@
+"""Tests for the tiered throughput history."""
+from src.domain.timeseries import TimeSeriesStore
+
+
+def test_consolidation_and_tier_choice():
+    store = TimeSeriesStore(tiers=((10, 6), (60, 10)))
+    for t in range(0, 120, 5):
+        store.record(t, {"global": (t, t * 100)})
+
+    # 10 s tier keeps the last minute: each bucket averages two samples, keeps the last bytes_loaded
+    step, points = store.query("global", 60, 119)
+    assert step == 10
+    assert points[0] == [60, 62, 6500]
+    assert len(points) == 6
+
+    # A longer window falls back to the coarser tier
+    step, points = store.query("global", 0, 119)
+    assert step == 60
+    assert points == [[0, 28, 5500], [60, 88, 11500]]
+
+
+def test_ring_reuses_slots_and_series_are_bounded():
+    store = TimeSeriesStore(tiers=((1, 4),), max_series=2)
+    for t in range(100):
+        store.record(t, {"a": (1, t), "b": (2, t)})
+    assert store.query("a", 0, 99)[1] == [[96, 1, 96], [97, 1, 97], [98, 1, 98], [99, 1, 99]]
+
+    store.record(100, {"c": (3, 0)})
+    assert store.keys() == ["b", "c"]
+    assert "a" not in store
+
+
+def test_package_series_are_evicted_before_hosts_and_global():
+    store = TimeSeriesStore(tiers=((1, 4),), max_series=3)
+    store.record(0, {"global": (1, 0), "host:h": (1, 0), "package:1": (1, 0)})
+    store.record(1, {"package:2": (1, 0)})
+    assert store.keys() == ["global", "host:h", "package:2"]
+
+    # Without package series left, hosts go next; the global series stays
+    store.record(2, {"global": (1, 0), "host:h": (1, 0)})
+    store.record(3, {"host:a": (1, 0), "host:b": (1, 0)})
+    assert store.keys() == ["global", "host:a", "host:b"]
@@ -14,6 +14,40 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Conditional GETs: remember the ETag and body of each polled resource and send the tag back.
+// Unchanged resources are answered with 304 and the cached body is returned instead.
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
+const cacheKey = (config: { url?: string; params?: unknown }) =>
+    `${config.url}?${config.params ? JSON.stringify(config.params) : ''}`;
+
+api.interceptors.request.use((config) => {
+    if ((config.method ?? 'get').toLowerCase() === 'get') {
+        const cached = etagCache.get(cacheKey(config));
+        if (cached) {
+            config.headers['If-None-Match'] = cached.etag;
+        }
+        config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+    }
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    if ((response.config.method ?? 'get').toLowerCase() !== 'get') {
+        return response;
+    }
+    const key = cacheKey(response.config);
+    if (response.status === 304) {
+        const cached = etagCache.get(key);
+        if (cached) {
+            response.data = cached.data;
+        }
+    } else if (response.headers['etag']) {
+        etagCache.set(key, { etag: response.headers['etag'], data: response.data });
+    }
+    return response;
+});
+
 // Add response interceptor to handle 401s (Token Expiry)
 api.interceptors.response.use(
     (response) => response,
@@ -30,6 +64,42 @@ api.interceptors.response.use(
     }
 );
 
+// Live change stream (Server-Sent Events). EventSource cannot send headers, so a short-lived
+// stream-only ticket goes in the query instead of the login token.
+export const openChangeStream = async (): Promise<EventSource | null> => {
+    if (typeof EventSource === 'undefined') {
+        return null;
+    }
+    const { data } = await api.post<{ ticket: string }>('/stream/ticket');
+    return new EventSource(`${API_URL}/stream?ticket=${encodeURIComponent(data.ticket)}`);
+};
+
+export interface PackageDelta {
+    kind: 'downloads' | 'linkgrabber';
+    base: number;
+    version: number;
+    upserts: Package[];
+    removed: string[];
+    order: string[] | null;
+}
+
+// Apply a stream delta to a package list: replace/insert upserts by uuid, drop removed ones, re-order if needed.
+export const applyPackageDelta = (current: Package[], delta: PackageDelta): Package[] => {
+    const byUuid = new Map(current.map((pkg) => [pkg.uuid, pkg]));
+    for (const uuid of delta.removed) {
+        byUuid.delete(uuid);
+    }
+    for (const pkg of delta.upserts) {
+        byUuid.set(pkg.uuid, pkg);
+    }
+    if (delta.order) {
+        return delta.order.map((uuid) => byUuid.get(uuid)).filter((pkg): pkg is Package => pkg !== undefined);
+    }
+    const result = current.filter((pkg) => byUuid.has(pkg.uuid)).map((pkg) => byUuid.get(pkg.uuid) as Package);
+    const known = new Set(current.map((pkg) => pkg.uuid));
+    return result.concat(delta.upserts.filter((pkg) => !known.has(pkg.uuid)));
+};
+
 export interface Package {
     uuid: string;
     name: string;
@@ -39,6 +109,7 @@ export interface Package {
     status: string;
     speed?: number;  // Current download speed in bytes/sec
     status_text?: string; // Raw status text from JD API
+    eta?: number | null;  // Seconds until done, from the server-side smoothed speed
 }
 
 export interface Link {
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { api, type Package } from '../api/client';
+import { api, applyPackageDelta, openChangeStream, type Package, type PackageDelta } from '../api/client';
 import { Play, Pause, Plus, Download, Settings, LogOut, FolderInput, FileUp, Power, RefreshCw, Info, X, Server, Globe, Clock } from 'lucide-react';
 import { SettingsModal } from './SettingsModal';
 
@@ -15,6 +15,10 @@ interface DlcFile {
     timestamp: number;
 }
 
+// Change stream: consecutive failures before polling takes over, and the base delay between reopen attempts
+const STREAM_MAX_FAILURES = 5;
+const STREAM_RETRY_DELAY_MS = 1000;
+
 // Helper for type-safe error handling
 const getErrorMessage = (error: unknown): string => {
     if (error && typeof error === 'object' && 'response' in error) {
@@ -219,11 +223,93 @@ export const Dashboard: React.FC = () => {
     useEffect(() => {
         fetchData();
         fetchBufferDetails();
-        const interval = setInterval(() => {
-            fetchData();
-            fetchBufferDetails();
-        }, 2000);
-        return () => clearInterval(interval);
+
+        // Prefer the live change stream. It reconnects after drops; only after repeated
+        // failures in a row (or without EventSource support) does the dashboard fall back to polling.
+        let interval: ReturnType<typeof setInterval> | null = null;
+        let stream: EventSource | null = null;
+        let retry: ReturnType<typeof setTimeout> | null = null;
+        let failures = 0;
+        let stopped = false;
+
+        const startPolling = () => {
+            if (interval) return;
+            interval = setInterval(() => {
+                fetchData();
+                fetchBufferDetails();
+            }, 2000);
+        };
+        const stopPolling = () => {
+            if (interval) clearInterval(interval);
+            interval = null;
+        };
+
+        const setList = (kind: string) => (kind === 'linkgrabber' ? setLinkGrabberPackages : setPackages);
+        const onFailure = () => {
+            failures += 1;
+            if (failures >= STREAM_MAX_FAILURES) {
+                stream?.close();
+                startPolling();
+            } else if (!stream || stream.readyState === EventSource.CLOSED) {
+                // Closed for good (e.g. the ticket expired): reopen with a fresh ticket
+                retry = setTimeout(connect, STREAM_RETRY_DELAY_MS * failures);
+            }
+            // Otherwise the browser is already reconnecting by itself
+        };
+
+        const connect = async () => {
+            let source: EventSource | null;
+            try {
+                source = await openChangeStream();
+            } catch (error) {
+                console.error("Opening change stream failed", error);
+                stream = null;
+                if (!stopped) onFailure();
+                return;
+            }
+            if (stopped) {
+                source?.close();
+                return;
+            }
+            stream = source;
+            if (!source) {
+                startPolling();
+                return;
+            }
+
+            source.onopen = () => {
+                failures = 0;
+                stopPolling();
+            };
+            source.addEventListener('packages', (e) => {
+                const data = JSON.parse((e as MessageEvent).data);
+                setList(data.kind)(data.packages);
+            });
+            source.addEventListener('delta', (e) => {
+                const delta: PackageDelta = JSON.parse((e as MessageEvent).data);
+                setList(delta.kind)((current) => applyPackageDelta(current, delta));
+            });
+            source.addEventListener('status', (e) => {
+                const data = JSON.parse((e as MessageEvent).data);
+                setIsConnected(data.jd_online);
+                setBufferCount(data.buffer_count || 0);
+                if (data.myjd_connection) {
+                    setMyjdStatus(data.myjd_connection);
+                }
+            });
+            source.addEventListener('buffer', (e) => {
+                setBufferDetails(JSON.parse((e as MessageEvent).data));
+            });
+            source.onerror = onFailure;
+        };
+        connect();
+
+        return () => {
+            stopped = true;
+            stream?.close();
+            if (retry) clearTimeout(retry);
+            stopPolling();
+        };
     }, [activeTab]);
 
     const handleAddLinks = async () => {